@@ -0,0 +1,80 @@
+"""
+Online detection of sudden sentiment changes.
+Each company keeps an exponentially weighted mean and variance and a two-sided
+CUSUM of its scores, updated once per mention as db.add_mentions stores it.
+"""
+
+import math
+import os
+
+# Smoothing factor of the mean and variance (higher: faster to adapt)
+ANOMALY_ALPHA = float(os.getenv("ANOMALY_ALPHA", "0.05"))
+
+# Standard deviations from the mean for a single-mention spike
+ANOMALY_Z_THRESHOLD = float(os.getenv("ANOMALY_Z_THRESHOLD", "3"))
+
+# CUSUM slack (in standard deviations) and decision threshold for a shift
+ANOMALY_CUSUM_SLACK = float(os.getenv("ANOMALY_CUSUM_SLACK", "0.5"))
+ANOMALY_CUSUM_THRESHOLD = float(os.getenv("ANOMALY_CUSUM_THRESHOLD", "5"))
+
+# Mentions needed before events are reported
+ANOMALY_WARMUP = int(os.getenv("ANOMALY_WARMUP", "20"))
+
+# Lower bound of the standard deviation (scores of a very stable company)
+MIN_STD = 0.05
+
+class DetectorState:
+    """Running statistics of one company's sentiment scores."""
+
+    __slots__ = ("count", "mean", "variance", "cusum_pos", "cusum_neg")
+
+    def __init__(self, count=0, mean=0.0, variance=0.0, cusum_pos=0.0, cusum_neg=0.0):
+        self.count = count
+        self.mean = mean
+        self.variance = variance
+        self.cusum_pos = cusum_pos    # Evidence of an upward shift
+        self.cusum_neg = cusum_neg    # Evidence of a downward shift
+
+    def __repr__(self):
+        return f"<DetectorState(count={self.count}, mean={self.mean:.3f}, std={math.sqrt(self.variance):.3f})>"
+
+def update(state, score):
+    """Add one sentiment score to a detector state.
+
+    Args:
+        state: DetectorState, updated in place
+        score: Sentiment score of the new mention
+
+    Returns:
+        List of event dicts (kind "spike" or "shift", direction "up" or
+        "down", zscore, and the mean before the update), usually empty
+    """
+    events = []
+    if state.count == 0:
+        state.mean = score
+        state.count = 1
+        return events
+
+    std = max(math.sqrt(state.variance), MIN_STD)
+    zscore = (score - state.mean) / std
+    mean_before = state.mean
+    direction = "up" if zscore > 0 else "down"
+
+    if state.count >= ANOMALY_WARMUP:
+        if abs(zscore) >= ANOMALY_Z_THRESHOLD:
+            events.append({"kind": "spike", "direction": direction, "zscore": zscore, "mean": mean_before})
+
+        state.cusum_pos = max(0.0, state.cusum_pos + zscore - ANOMALY_CUSUM_SLACK)
+        state.cusum_neg = max(0.0, state.cusum_neg - zscore - ANOMALY_CUSUM_SLACK)
+        if state.cusum_pos >= ANOMALY_CUSUM_THRESHOLD or state.cusum_neg >= ANOMALY_CUSUM_THRESHOLD:
+            shift = "up" if state.cusum_pos >= ANOMALY_CUSUM_THRESHOLD else "down"
+            events.append({"kind": "shift", "direction": shift, "zscore": zscore, "mean": mean_before})
+            state.cusum_pos = state.cusum_neg = 0.0
+
+    # Exponentially weighted mean and variance
+    diff = score - state.mean
+    increment = ANOMALY_ALPHA * diff
+    state.mean += increment
+    state.variance = (1 - ANOMALY_ALPHA) * (state.variance + diff * increment)
+    state.count += 1
+    return events
@@ -1,11 +1,16 @@
 import requests
 import json
 import os
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from dotenv import load_dotenv
-from openai import OpenAI
 from logger import get_logger, log_function_call, log_info, log_error, log_warning
-from bs4 import BeautifulSoup
+from extraction import extract_many
+from records import MentionRecord
+from text_budget import SENTIMENT_TOKEN_BUDGET, build_sentiment_input, company_pattern, estimate_tokens, select_sentences
+from query_planner import (CompanyQuery, QuotaBudget, MAX_PAGE_SIZE, MAX_PAGES_PER_QUERY,
+                           build_query, demultiplex, fit_terms, plan_batches)
+from concurrent.futures import ThreadPoolExecutor
+import metrics
 import time
 import random
 
@@ -19,10 +24,18 @@ load_dotenv()
 NEWSAPI_KEY = os.getenv("NEWSAPI_KEY")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
+# API endpoints (overridable, e.g. to point at local stand-ins for benchmarks)
+NEWSAPI_URL = os.getenv("NEWSAPI_URL", "https://newsapi.org/v2/everything")
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL")  # None uses the OpenAI default
+
 # Configuration
-MAX_CONTENT_LENGTH = 3000  # Maximum content length to send to OpenAI
-REQUEST_DELAY_MIN = 0.5    # Minimum delay between requests
-REQUEST_DELAY_MAX = 1.5    # Maximum delay between requests
+MAX_CONTENT_LENGTH = 3000  # Maximum characters of article text extracted and stored
+REQUEST_DELAY_MIN = float(os.getenv("REQUEST_DELAY_MIN", "0.5"))    # Minimum delay between requests
+REQUEST_DELAY_MAX = float(os.getenv("REQUEST_DELAY_MAX", "1.5"))    # Maximum delay between requests
+DOWNLOAD_WORKERS = int(os.getenv("DOWNLOAD_WORKERS", "4"))          # Concurrent article downloads
+MAX_DOWNLOAD_BYTES = int(os.getenv("MAX_DOWNLOAD_BYTES", str(1024 * 1024)))  # Bytes read per article page
+DOWNLOAD_CHUNK_SIZE = 16 * 1024                                     # Bytes read from the socket per step
+HTML_CONTENT_TYPES = ('text/html', 'application/xhtml+xml', 'text/plain')
 
 # Initialize sentiment analysis with caching to avoid initializing multiple times
 _sentiment_analyzer = None
@@ -31,6 +44,7 @@ _sentiment_analyzer = None
 def get_sentiment_analyzer():
     """Get or initialize the OpenAI sentiment analysis."""
     global _sentiment_analyzer
+    metrics.record_cache("sentiment_analyzer", _sentiment_analyzer is not None)
     if _sentiment_analyzer is None:
         try:
             log_info("Initializing OpenAI for sentiment analysis...")
@@ -38,24 +52,23 @@ def get_sentiment_analyzer():
             # Configure the OpenAI client
             if not OPENAI_API_KEY:
                 raise ValueError("OPENAI_API_KEY is not set in .env file")
-                
-            client = OpenAI(api_key=OPENAI_API_KEY)
+            
+            # Imported here: the openai package is slow to import and only needed once there is text to score
+            from openai import OpenAI
+            client = OpenAI(api_key=OPENAI_API_KEY, base_url=OPENAI_BASE_URL)
             
             # Create a function to analyze sentiment using OpenAI
             def analyze_with_openai(text):
                 if not text or len(text.strip()) == 0:
                     return {"label": "NEUTRAL", "score": 0.0}
                 
-                # Truncate text to avoid token limits (max ~4000 chars for gpt-4o-mini)
-                truncated_text = text[:MAX_CONTENT_LENGTH] if len(text) > MAX_CONTENT_LENGTH else text
-                
                 # Prompt for sentiment analysis
                 try:
                     response = client.chat.completions.create(
                         model="gpt-4o-mini",
                         messages=[
                             {"role": "system", "content": "You are a sentiment analysis expert. Analyze the text and respond with ONLY a JSON object containing 'label' (either 'POSITIVE', 'NEGATIVE', or 'NEUTRAL') and 'score' (a number between -1.0 and 1.0)."},
-                            {"role": "user", "content": f"Analyze the sentiment of this text: {truncated_text}"}
+                            {"role": "user", "content": f"Analyze the sentiment of this text: {text}"}
                         ],
                         temperature=0,
                         max_tokens=100
@@ -98,7 +111,8 @@ def get_sentiment_analyzer():
                         
                 except Exception as e:
                     log_error(f"Error calling OpenAI API: {e}", exc_info=True)
-                    return {"label": "NEUTRAL", "score": 0.0}
+                    # No score: a failed call is not a neutral article
+                    return {"label": "NEUTRAL", "score": None}
             
             _sentiment_analyzer = analyze_with_openai
             log_info("OpenAI initialized successfully!")
@@ -157,152 +171,453 @@ def get_sentiment_analyzer():
     
     return _sentiment_analyzer
 
+class NewsApiError(requests.exceptions.RequestException):
+    """NewsAPI returned no results because the request failed (error status, request budget)."""
+
+def parse_published_at(value):
+    """Parse a NewsAPI publishedAt timestamp (UTC) into a naive datetime."""
+    if not value:
+        return None
+    for fmt in ('%Y-%m-%dT%H:%M:%SZ', '%Y-%m-%dT%H:%M:%S.%fZ'):
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            pass
+    return None
+
+def date_range(days, since=None):
+    """NewsAPI from/to parameters for the last `days` days, or from `since` if later.
+    
+    NewsAPI dates and watermarks (naive datetimes) are UTC, so the window is
+    computed on a UTC clock whatever the host's timezone.
+    """
+    now = datetime.now(timezone.utc)
+    to_date = now.strftime('%Y-%m-%d')
+    from_date = (now - timedelta(days=days)).strftime('%Y-%m-%d')
+    if since:
+        since = since.replace(tzinfo=timezone.utc) if since.tzinfo is None else since.astimezone(timezone.utc)
+        if since > now - timedelta(days=days):
+            from_date = since.strftime('%Y-%m-%dT%H:%M:%S')
+            to_date = None
+    return from_date, to_date
+
 class NewsClient:
     """Client for fetching news from NewsAPI."""
     
-    def __init__(self):
+    def __init__(self, budget=None):
         self.api_key = NEWSAPI_KEY
-        self.base_url = "https://newsapi.org/v2/everything"
+        self.base_url = NEWSAPI_URL
+        self.budget = budget or QuotaBudget()
+        # Reused across requests so connections stay open between calls
+        self.session = requests.Session()
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         }
     
-    @log_function_call
-    def fetch_article_content(self, url):
-        """Fetch and extract the main content from an article URL using BeautifulSoup."""
+    def download_article(self, url):
+        """Download an article page.
+        
+        Returns:
+            (content bytes, declared encoding or None), or None if the download failed
+        """
         if not url:
-            return ""
+            return None
             
         try:
             # Add a small delay to avoid overwhelming the server
-            time.sleep(random.uniform(REQUEST_DELAY_MIN, REQUEST_DELAY_MAX))
+            if REQUEST_DELAY_MAX > 0:
+                time.sleep(random.uniform(REQUEST_DELAY_MIN, REQUEST_DELAY_MAX))
             
-            # Make the request to the article URL
-            response = requests.get(url, headers=self.headers, timeout=10)
-            response.raise_for_status()
+            # Stream the article so non-HTML responses can be dropped after the
+            # headers and large pages are cut off at MAX_DOWNLOAD_BYTES
+            with metrics.timer("article_scrape"):
+                with self.session.get(url, headers=self.headers, timeout=10, stream=True) as response:
+                    response.raise_for_status()
+                    
+                    content_type = response.headers.get('Content-Type', '')
+                    mime_type = content_type.split(';', 1)[0].strip().lower()
+                    if mime_type and mime_type not in HTML_CONTENT_TYPES:
+                        metrics.increment("articles_skipped_content_type")
+                        log_warning(f"Skipping {url}: unsupported content type '{mime_type}'")
+                        return None
+                    
+                    # A declared length tells us up front whether the page will be cut off
+                    content_length = response.headers.get('Content-Length', '')
+                    truncated = content_length.isdigit() and int(content_length) > MAX_DOWNLOAD_BYTES
+                    
+                    buffer = bytearray()
+                    chunks = response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE)
+                    for chunk in chunks:
+                        buffer += chunk
+                        if len(buffer) >= MAX_DOWNLOAD_BYTES:
+                            # A page that fills the cap exactly is only cut off if data is left
+                            truncated = truncated or len(buffer) > MAX_DOWNLOAD_BYTES or bool(next(chunks, b''))
+                            del buffer[MAX_DOWNLOAD_BYTES:]
+                            break
+                    content = bytes(buffer)
+                    
+                    if truncated:
+                        metrics.increment("articles_truncated")
+                    
+                    # Only trust the encoding if the server declared one
+                    encoding = response.encoding if 'charset' in content_type.lower() else None
             
-            # Parse the HTML content
-            soup = BeautifulSoup(response.content, 'lxml')
+            metrics.increment("articles_scraped")
+            metrics.increment("article_bytes_fetched", len(content))
+            return content, encoding
             
-            # Remove script and style elements
-            for script in soup(["script", "style", "nav", "footer", "header"]):
-                script.decompose()
-                
-            # Get the text content
-            text = soup.get_text(separator=' ', strip=True)
+        except Exception as e:
+            log_error(f"Error downloading content from {url}: {e}", exc_info=True)
+            return None
+    
+    @log_function_call
+    def fetch_article_content(self, url):
+        """Fetch and extract the main content from an article URL."""
+        return self.fetch_article_contents([url])[0]
+    
+    @log_function_call
+    def fetch_article_contents(self, urls):
+        """Fetch and extract the main content of several article URLs.
+        
+        Pages are downloaded by a thread pool and the raw bytes are handed to
+        extraction.extract_many, which parses them in worker processes when the
+        batch is large enough.
+        
+        Returns:
+            List of extracted texts, in the same order as urls ("" on failure)
+        """
+        if not urls:
+            return []
+        
+        if DOWNLOAD_WORKERS > 1 and len(urls) > 1:
+            with ThreadPoolExecutor(max_workers=min(DOWNLOAD_WORKERS, len(urls))) as executor:
+                pages = list(executor.map(self.download_article, urls))
+        else:
+            pages = [self.download_article(url) for url in urls]
+        
+        texts = extract_many(pages, max_chars=MAX_CONTENT_LENGTH, urls=urls)
+        
+        for url, page, text in zip(urls, pages, texts):
+            if page:
+                log_info(f"Successfully extracted content from {url} ({len(text)} chars)")
+        return texts
+    
+    def search_articles(self, query, from_date, to_date, limit, enough=None):
+        """Page through NewsAPI results for a query (see search_pages)."""
+        return self.search_pages(query, from_date, to_date, limit, enough)[0]
+    
+    def search_pages(self, query, from_date, to_date, limit, enough=None):
+        """Page through NewsAPI results for a query, up to MAX_PAGES_PER_QUERY pages.
+        
+        Args:
+            query: NewsAPI `q` expression
+            from_date: Start date ('YYYY-MM-DD') or UTC timestamp ('YYYY-MM-DDTHH:MM:SS')
+            to_date: End date ('YYYY-MM-DD'), or None for "up to now"
+            limit: Number of articles to collect (sets the page size)
+            enough: Optional callback(articles) -> bool replacing the limit as the stop condition
             
-            # Clean up the text (remove extra whitespace)
-            text = ' '.join(text.split())
-                
-            log_info(f"Successfully extracted content from {url} ({len(text)} chars)")
-            return text
+        Returns:
+            (articles, truncated): the raw NewsAPI article dicts (deduplicated
+            by URL), and whether paging stopped at MAX_PAGES_PER_QUERY with
+            more results left
+        """
+        page_size = min(limit, MAX_PAGE_SIZE)  # NewsAPI limits to 100 max per request
+        articles = []
+        seen_urls = set()
+        
+        for page in range(1, MAX_PAGES_PER_QUERY + 1):
+            if not self.budget.consume():
+                log_warning(f"NewsAPI request budget of {self.budget.limit} exhausted, stopping at page {page}")
+                metrics.increment("newsapi_budget_exhausted")
+                if page == 1:
+                    raise NewsApiError(f"NewsAPI request budget of {self.budget.limit} exhausted")
+                break
             
-        except Exception as e:
-            log_error(f"Error extracting content from {url}: {e}", exc_info=True)
-            return ""
+            # Request parameters
+            params = {
+                'q': query,
+                'from': from_date,
+                'language': 'en',
+                'sortBy': 'publishedAt',
+                'pageSize': page_size,
+                'page': page,
+                'apiKey': self.api_key
+            }
+            if to_date:
+                params['to'] = to_date
+            
+            try:
+                # Make API request
+                with metrics.timer("newsapi_query"):
+                    response = self.session.get(self.base_url, params=params)
+                    response.raise_for_status()
+            except requests.exceptions.RequestException as e:
+                if page == 1:
+                    raise
+                # Later pages can fail on plan limits (e.g. maximumResultsReached); keep what we have
+                log_warning(f"Stopping NewsAPI paging at page {page}: {e}")
+                break
+            metrics.increment("newsapi_requests")
+            metrics.increment("newsapi_bytes_fetched", len(response.content))
+            
+            data = response.json()
+            
+            if data.get('status') != 'ok':
+                log_error(f"Error from NewsAPI: {data.get('message', 'Unknown error')}")
+                if page == 1:
+                    raise NewsApiError(f"Error from NewsAPI: {data.get('message', 'Unknown error')}")
+                break
+            
+            page_articles = data.get('articles', [])
+            for article in page_articles:
+                url = article.get('url', '')
+                if url in seen_urls:
+                    continue
+                seen_urls.add(url)
+                articles.append(article)
+            
+            done = enough(articles) if enough else len(articles) >= limit
+            if done or len(page_articles) < page_size or page * page_size >= data.get('totalResults', 0):
+                break
+        else:
+            return articles, True
+        
+        return articles, False
+    
+    def build_mentions(self, articles, contents=None):
+        """Turn NewsAPI articles into MentionRecords, scraping their content.
+        
+        Args:
+            articles: Raw NewsAPI article dicts
+            contents: Optional dict of URL -> already extracted text
+        """
+        if contents is None:
+            urls = [article.get('url', '') for article in articles]
+            contents = dict(zip(urls, self.fetch_article_contents(urls)))
+        
+        mentions = []
+        for article in articles:
+            published_at = parse_published_at(article.get('publishedAt'))
+            
+            # Get the article URL
+            url = article.get('url', '')
+            scraped_content = contents.get(url, "")
+            
+            # If extraction returns empty content, use NewsAPI content as fallback
+            if not scraped_content or scraped_content.strip() == "":
+                # Use description or content from NewsAPI as fallback
+                api_content = article.get('content', "")
+                api_description = article.get('description', "")
+                
+                # Prefer content over description if available
+                if api_content and len(api_content) > 10:  # Ensure it's not just a short snippet
+                    scraped_content = api_content
+                    log_info(f"Using NewsAPI content as fallback for {url}")
+                elif api_description and len(api_description) > 10:
+                    scraped_content = api_description
+                    log_info(f"Using NewsAPI description as fallback for {url}")
+                else:
+                    log_warning(f"No content available for {url} from either scraping or NewsAPI")
+        
+            mentions.append(MentionRecord(
+                title=article.get('title') or 'No title',
+                content=scraped_content,
+                url=url,
+                source=(article.get('source') or {}).get('name') or 'Unknown',
+                published_at=published_at
+            ))
+        
+        return mentions
+    
+    def select_new(self, articles, since=None, known_urls=None):
+        """Drop articles published before `since` or whose URL is already stored."""
+        selected = []
+        for article in articles:
+            if known_urls and article.get('url') in known_urls:
+                metrics.increment("articles_already_known")
+                continue
+            published_at = parse_published_at(article.get('publishedAt'))
+            if since and published_at and published_at < since:
+                continue
+            selected.append(article)
+        return selected
     
     @log_function_call
-    def fetch_mentions(self, company_name, aliases, days=7, limit=15):
+    def fetch_mentions(self, company_name, aliases, days=7, limit=15, since=None, known_urls=None):
         """Fetch mentions of a company from NewsAPI.
         
         Args:
             company_name: Name of the company
             aliases: List of company aliases
             days: Number of days to look back
-            limit: Maximum number of articles to return (default: 10)
+            limit: Maximum number of articles to return (default: 15)
+            since: Optional UTC datetime; only articles published after it are requested
+            known_urls: Optional set of URLs already stored, which are not fetched again
+        
+        Raises:
+            requests.exceptions.RequestException: The NewsAPI request failed (network
+                error, HTTP error such as 429, error status or exhausted request
+                budget), so an empty result always means there was nothing new
         """
         if not self.api_key:
             log_error("NewsAPI key is not set")
             raise ValueError("NewsAPI key is not set. Please set NEWSAPI_KEY in .env file.")
         
         # Combine company name and aliases for search
-        search_terms = [company_name] + [alias.strip() for alias in aliases if alias.strip()]
-        query = " OR ".join([f'"{term}"' for term in search_terms])
+        company = CompanyQuery(company_name, company_name, aliases)
+        query = build_query(fit_terms(company.terms))
         
         # Calculate date range
-        to_date = datetime.now().strftime('%Y-%m-%d')
-        from_date = (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d')
-        
-        # Request parameters
-        params = {
-            'q': query,
-            'from': from_date,
-            'to': to_date,
-            'language': 'en',
-            'sortBy': 'publishedAt',
-            'pageSize': min(limit, 100),  # NewsAPI limits to 100 max per request
-            'apiKey': self.api_key
-        }
+        from_date, to_date = date_range(days, since)
         
         try:
-            # Make API request
-            response = requests.get(self.base_url, params=params)
-            response.raise_for_status()
+            articles = self.search_articles(query, from_date, to_date, limit)
+        except requests.exceptions.RequestException as e:
+            log_error(f"Error fetching mentions: {e}", exc_info=True)
+            raise
+        
+        mentions = self.build_mentions(self.select_new(articles, since, known_urls)[:limit])
+        log_info(f"Found {len(mentions)} mentions for {company_name} (limited to {limit})")
+        return mentions
+    
+    @log_function_call
+    def fetch_mentions_batch(self, companies, days=7, limit=15, since=None, known_urls=None):
+        """Fetch mentions for several companies using combined NewsAPI queries.
+        
+        Companies are packed into OR-queries that fit NewsAPI's query length
+        limit, results are paged until every company in a batch has `limit`
+        articles (or results run out), and articles are routed back to the
+        companies whose name or aliases they mention. Pages shared by several
+        companies are downloaded once. See fetch_batch_articles for how the
+        page limit is shared.
+        
+        Args:
+            companies: List of (key, company_name, aliases) tuples
+            days: Number of days to look back
+            limit: Maximum number of articles per company
+            since: Optional dict of key -> UTC datetime watermark (see fetch_mentions)
+            known_urls: Optional dict of key -> set of URLs already stored
             
-            data = response.json()
+        Returns:
+            Dict of key -> list of mentions. Companies whose batch request
+            failed are left out so callers can fall back to fetch_mentions.
+        """
+        if not self.api_key:
+            log_error("NewsAPI key is not set")
+            raise ValueError("NewsAPI key is not set. Please set NEWSAPI_KEY in .env file.")
+        
+        since = since or {}
+        known_urls = known_urls or {}
+        
+        queries = [CompanyQuery(key, name, aliases) for key, name, aliases in companies]
+        batches = plan_batches(queries)
+        log_info(f"Planned {len(batches)} NewsAPI queries for {len(queries)} companies")
+        
+        results = {}
+        for batch in batches:
+            query = build_query([term for company in batch for term in company.terms])
             
-            if data.get('status') != 'ok':
-                log_error(f"Error from NewsAPI: {data.get('message', 'Unknown error')}")
-                return []
+            # The combined request starts at the oldest watermark in the batch;
+            # articles older than a company's own watermark are dropped below
+            batch_since = [since.get(company.key) for company in batch]
+            oldest = None if None in batch_since else min(batch_since)
+            from_date, to_date = date_range(days, oldest)
             
-            # Process and normalize results
-            mentions = []
-            for article in data.get('articles', [])[:limit]:  # Apply limit here too
-                published_at = None
-                if article.get('publishedAt'):
-                    try:
-                        published_at = datetime.strptime(article['publishedAt'], '%Y-%m-%dT%H:%M:%SZ')
-                    except ValueError:
-                        try:
-                            published_at = datetime.strptime(article['publishedAt'], '%Y-%m-%dT%H:%M:%S.%fZ')
-                        except ValueError:
-                            published_at = None
-                
-                # Get the article URL
-                url = article.get('url', '')
-                
-                # Extract the full content using BeautifulSoup
-                scraped_content = ""
-                
-                # Try to get content from the article URL using BeautifulSoup
-                scraped_content = self.fetch_article_content(url)
-                
-                # If BeautifulSoup returns empty content, use NewsAPI content as fallback
-                if not scraped_content or scraped_content.strip() == "":
-                    # Use description or content from NewsAPI as fallback
-                    api_content = article.get('content', "")
-                    api_description = article.get('description', "")
-                    
-                    # Prefer content over description if available
-                    if api_content and len(api_content) > 10:  # Ensure it's not just a short snippet
-                        scraped_content = api_content
-                        log_info(f"Using NewsAPI content as fallback for {url}")
-                    elif api_description and len(api_description) > 10:
-                        scraped_content = api_description
-                        log_info(f"Using NewsAPI description as fallback for {url}")
-                    else:
-                        log_warning(f"No content available for {url} from either scraping or NewsAPI")
+            try:
+                routed = self.fetch_batch_articles(batch, from_date, to_date, limit)
+            except requests.exceptions.RequestException as e:
+                log_error(f"Error fetching mentions for batch {[c.key for c in batch]}: {e}", exc_info=True)
+                continue
             
-                mention = {
-                    'title': article.get('title', 'No title'),
-                    'content': scraped_content,
-                    'url': url,
-                    'source': article.get('source', {}).get('name', 'Unknown'),
-                    'published_at': published_at
-                }
-                mentions.append(mention)
+            selected = {
+                key: self.select_new(found, since.get(key), known_urls.get(key))[:limit]
+                for key, found in routed.items()
+            }
             
-            log_info(f"Found {len(mentions)} mentions for {company_name} (limited to {limit})")
-            return mentions
+            # Download each distinct page once for the whole batch
+            unique = {}
+            for found in selected.values():
+                for article in found:
+                    unique.setdefault(article.get('url', ''), article)
+            urls = list(unique)
+            contents = dict(zip(urls, self.fetch_article_contents(urls)))
             
-        except requests.exceptions.RequestException as e:
-            log_error(f"Error fetching mentions: {e}", exc_info=True)
-            return []
-
+            for company in batch:
+                results[company.key] = self.build_mentions(selected[company.key], contents)
+                log_info(f"Found {len(results[company.key])} mentions for {company.terms[0]} (limited to {limit})")
+        
+        return results
+    
+    def fetch_batch_articles(self, batch, from_date, to_date, limit):
+        """Collect up to `limit` articles for each company of a batch.
+        
+        The combined query is paged until every company has `limit` articles.
+        If it stops at MAX_PAGES_PER_QUERY while some companies are still short
+        (typically quiet companies batched with a busy one), the companies that
+        are full are dropped and the others are queried again on their own
+        terms, so each company gets its own page allowance instead of sharing
+        one per batch. Articles that match no company's terms in the fields
+        NewsAPI returns (matched on the full text) are counted as
+        articles_unrouted.
+        
+        Returns:
+            Dict of company key -> list of routed articles
+        """
+        routed = {company.key: {} for company in batch}  # key -> {url: article}
+        seen = {}
+        pending = list(batch)
+        while pending:
+            query = build_query([term for company in pending for term in company.terms])
+            
+            def enough(articles, pending=pending):
+                found = demultiplex(articles, pending)
+                return all(len(routed[company.key].keys() | {a.get('url', '') for a in found[company.key]}) >= limit
+                           for company in pending)
+            
+            try:
+                articles, truncated = self.search_pages(query, from_date, to_date, limit * len(pending), enough=enough)
+            except requests.exceptions.RequestException as e:
+                if len(pending) == len(batch):
+                    raise
+                # A follow-up query failed: keep what the earlier ones found
+                log_warning(f"Stopping follow-up query for {[company.key for company in pending]}: {e}")
+                break
+            for article in articles:
+                seen.setdefault(article.get('url', ''), article)
+            for key, found in demultiplex(articles, pending).items():
+                for article in found:
+                    routed[key].setdefault(article.get('url', ''), article)
+            
+            short = [company for company in pending if len(routed[company.key]) < limit]
+            if not truncated or len(short) == len(pending) or self.budget.exhausted():
+                break
+            log_info(f"Querying {[company.key for company in short]} again without the companies already at {limit} articles")
+            pending = short
+        
+        routed_urls = set().union(*(found.keys() for found in routed.values()))
+        unrouted = len(seen.keys() - routed_urls)
+        if unrouted:
+            metrics.increment("articles_unrouted", unrouted)
+            log_info(f"{unrouted} articles matched no company in the title, description or snippet")
+        return {key: list(found.values()) for key, found in routed.items()}
 
 @log_function_call
-def analyze_sentiment(text):
-    """Analyze sentiment using OpenAI."""
+def analyze_sentiment(text, pattern=None, title=None):
+    """Analyze sentiment using OpenAI.
+    
+    Args:
+        text: Text to analyze (an article body if title is given); longer
+            texts are reduced to the token budget
+        pattern: Optional company pattern used to pick the relevant sentences
+        title: Optional article title, always kept in front of the sentences
+            selected from text
+    """
+    if title is not None:
+        # Sentences are selected once, from the full body, and the title always stays
+        text = build_sentiment_input(title, text, pattern)
+    elif text and estimate_tokens(text) > SENTIMENT_TOKEN_BUDGET:
+        text = select_sentences(text, pattern)
+    
     if not text:
         log_info("Empty text provided for sentiment analysis, returning NEUTRAL")
         return {"label": "NEUTRAL", "score": 0.0}
@@ -311,42 +626,47 @@ def analyze_sentiment(text):
         # Get or initialize the sentiment analyzer
         sentiment_analyzer = get_sentiment_analyzer()
         
-        # Use a reasonable text length to avoid issues with very long texts
-        truncated_text = text[:1000] if text else ""
+        metrics.increment("sentiment_input_tokens", estimate_tokens(text))
         
         # Analyze sentiment
-        result = sentiment_analyzer(truncated_text)
+        with metrics.timer("sentiment_call"):
+            result = sentiment_analyzer(text)
+        metrics.increment("sentiment_calls")
         
         return result
     except Exception as e:
         log_error(f"Error analyzing sentiment: {e}", exc_info=True)
-        return {"label": "NEUTRAL", "score": 0.0}
+        return {"label": "NEUTRAL", "score": None}
 
 
 @log_function_call
-def analyze_mentions(mentions):
-    """Analyze sentiment for a list of mentions."""
+def analyze_mentions(mentions, company_name=None, aliases=None, checkpoint=None):
+    """Analyze sentiment for a list of mentions, setting it on each record in place.
+    
+    Args:
+        mentions: MentionRecords with title and content
+        company_name: Company the mentions belong to; sentences naming it (or
+            one of its aliases) are preferred when the text is cut to the token budget
+        aliases: Optional company aliases
+        checkpoint: Optional callable(mention) called after each mention is scored
+    
+    Returns:
+        The same list of mentions
+    """
     log_info(f"Analyzing sentiment for {len(mentions)} mentions")
-    enriched_mentions = []
     
     # Load analyzer once for all mentions
     get_sentiment_analyzer()
+    pattern = company_pattern(company_name, aliases)
     
     for mention in mentions:
-        # Combine title and content for better analysis
-        text = f"{mention.get('title', '')} {mention.get('content', '')}"
-        
-        # Get sentiment
-        sentiment = analyze_sentiment(text)
-        
-        # Add sentiment to mention
-        enriched_mention = mention.copy()
-        enriched_mention['sentiment'] = sentiment["label"]
-        enriched_mention['sentiment_score'] = sentiment["score"]
-        
-        enriched_mentions.append(enriched_mention)
+        # Title plus the most relevant sentences of the content
+        sentiment = analyze_sentiment(mention.content, pattern, title=mention.title)
+        mention.set_sentiment(sentiment["label"], sentiment["score"])
+        if checkpoint:
+            checkpoint(mention)
     
-    return enriched_mentions
+    return mentions
 
 
 # Test functionality when run directly
@@ -362,15 +682,15 @@ if __name__ == "__main__":
     
     if test_mentions:
         # Test sentiment analysis
-        sentiment_result = analyze_sentiment(test_mentions[0]["title"])
+        sentiment_result = analyze_sentiment(test_mentions[0].title)
         log_info(f"Sentiment: {sentiment_result['label']}, Score: {sentiment_result['score']}")
         
         # Test batch sentiment analysis
-        enriched_mentions = analyze_mentions(test_mentions[:2])
+        enriched_mentions = analyze_mentions(test_mentions[:2], "Tesla", ["TSLA", "Tesla Inc."])
         log_info(f"Analyzed {len(enriched_mentions)} mentions")
         for mention in enriched_mentions:
-            log_info(f"Title: {mention['title'][:50]}...")
-            log_info(f"Sentiment: {mention['sentiment']}, Score: {mention['sentiment_score']}")
+            log_info(f"Title: {mention.title[:50]}...")
+            log_info(f"Sentiment: {mention.sentiment}, Score: {mention.sentiment_score}")
             log_info("---")
     
     # Log shutdown
@@ -383,15 +703,15 @@ if __name__ == "__main__":
     
     if test_mentions:
         # Test sentiment analysis
-        sentiment_result = analyze_sentiment(test_mentions[0]["title"])
+        sentiment_result = analyze_sentiment(test_mentions[0].title)
         log_info(f"Sentiment: {sentiment_result['label']}, Score: {sentiment_result['score']}")
         
         # Test batch sentiment analysis
-        enriched_mentions = analyze_mentions(test_mentions[:2])
+        enriched_mentions = analyze_mentions(test_mentions[:2], "Tesla", ["TSLA", "Tesla Inc."])
         log_info(f"Analyzed {len(enriched_mentions)} mentions")
         for mention in enriched_mentions:
-            log_info(f"Title: {mention['title'][:50]}...")
-            log_info(f"Sentiment: {mention['sentiment']}, Score: {mention['sentiment_score']}")
+            log_info(f"Title: {mention.title[:50]}...")
+            log_info(f"Sentiment: {mention.sentiment}, Score: {mention.sentiment_score}")
             log_info("---")
     
     # Log shutdown
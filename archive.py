@@ -0,0 +1,49 @@
+"""
+Compression of archived mention bodies.
+db.archive_old_mentions moves old bodies into mention_archive with these codecs.
+"""
+
+import os
+import zlib
+
+# Bodies of mentions older than this are archived (0: never)
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "90"))
+
+# zlib (standard library) or zstd (needs the zstandard package)
+ARCHIVE_CODEC = os.getenv("ARCHIVE_CODEC", "zlib")
+
+# VACUUM once this share of the database file is free pages or space freed by archiving
+VACUUM_FREE_RATIO = float(os.getenv("VACUUM_FREE_RATIO", "0.2"))
+
+ZLIB_LEVEL = 9
+ZSTD_LEVEL = 10
+
+def _zstd():
+    try:
+        import zstandard
+    except ImportError:
+        raise RuntimeError("ARCHIVE_CODEC=zstd requires the zstandard package (pip install zstandard)")
+    return zstandard
+
+def compress(text, codec=ARCHIVE_CODEC):
+    """Compress a body with `codec`.
+
+    Returns:
+        Compressed bytes
+    """
+    data = text.encode("utf-8")
+    if codec == "zlib":
+        return zlib.compress(data, ZLIB_LEVEL)
+    if codec == "zstd":
+        return _zstd().ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    raise ValueError(f"Unknown archive codec: {codec}")
+
+def decompress(blob, codec):
+    """Decompress a body stored with `codec`."""
+    if codec == "zlib":
+        data = zlib.decompress(blob)
+    elif codec == "zstd":
+        data = _zstd().ZstdDecompressor().decompress(blob)
+    else:
+        raise ValueError(f"Unknown archive codec: {codec}")
+    return data.decode("utf-8")
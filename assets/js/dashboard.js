@@ -4,6 +4,8 @@
 let dashboardData = null;
 let companiesList = null;
 let currentCompanyId = null;
+let dataGeneration = null;  // Export generation from manifest.json (null if there is none)
+let dataPath = '';  // Directory of that generation under assets/data
 
 // Initialize the dashboard when the page loads
 document.addEventListener('DOMContentLoaded', function() {
@@ -13,8 +15,9 @@ document.addEventListener('DOMContentLoaded', function() {
   const baseUrl = window.location.pathname.split('/').slice(0, -1).join('/') || '';
   console.log('Base URL:', baseUrl);
   
-  // First, load the companies list
-  loadCompaniesList()
+  // First, load the manifest and the companies list
+  loadManifest()
+    .then(() => loadCompaniesList())
     .then(() => {
       // Then load the default dashboard data
       return loadDashboardData();
@@ -33,19 +36,51 @@ document.addEventListener('DOMContentLoaded', function() {
     }
   });
   
-  // Handle window resize to make charts responsive
+  // Handle window resize to make charts responsive: resize (not rebuild) the
+  // charts and re-render the visible table rows, at most once per frame
+  let resizeTimer = null;
   window.addEventListener('resize', function() {
-    if (dashboardData) {
-      // Redraw charts on window resize
-      createSentimentChart(dashboardData.stats);
-      createTimelineChart(dashboardData.timeline);
-    }
+    clearTimeout(resizeTimer);
+    resizeTimer = setTimeout(() => {
+      if (dashboardData) {
+        scheduleRedraw('charts');
+        scheduleRedraw('mentions');
+      }
+    }, 100);
   });
 });
 
+// Load manifest.json, which the exporter writes last, to learn the directory
+// of the current export generation (older exports have no manifest)
+function loadManifest() {
+  return fetch('assets/data/manifest.json', {cache: 'no-store'})
+    .then(response => response.ok ? response.json() : null)
+    .then(manifest => {
+      dataGeneration = manifest ? manifest.generation : null;
+      dataPath = manifest && manifest.path ? manifest.path : '';
+    })
+    .catch(() => {
+      dataGeneration = null;
+      dataPath = '';
+    });
+}
+
+// URL of a file of the current generation (companies and company files).
+// Generation directories are never rewritten, so files of two exports are
+// never mixed
+function generationFileUrl(name) {
+  return `assets/data/${dataPath}${name}`;
+}
+
+// URL of a data file listed in a company file (mention pages, search index),
+// which already carries the directory of the company file's generation
+function dataFileUrl(path) {
+  return `assets/data/${path}`;
+}
+
 // Load companies list
 function loadCompaniesList() {
-  const companiesUrl = 'assets/data/companies.json';
+  const companiesUrl = generationFileUrl('companies.json');
   console.log('Fetching companies from:', companiesUrl);
   
   return fetch(companiesUrl)
@@ -91,31 +126,37 @@ function loadCompaniesList() {
 }
 
 // Load dashboard data for a specific company
-function loadDashboardData(companyId = null) {
+function loadDashboardData(companyId = null, reloaded = false) {
   // Show loading indicator
   document.getElementById('loading-indicator').style.display = 'block';
   document.getElementById('dashboard-content').style.display = 'none';
   
   // Determine which data file to load
-  const dataUrl = companyId 
-    ? `assets/data/company_${companyId}.json` 
-    : 'assets/data/dashboard_data.json';
+  const dataUrl = generationFileUrl(companyId ? `company_${companyId}.json` : 'dashboard_data.json');
   
   console.log('Fetching dashboard data from:', dataUrl);
   
   return fetch(dataUrl)
     .then(response => {
       console.log('Response status:', response.status);
+      // The generation was removed by newer exports since the manifest was
+      // read: load the current manifest and try once more
+      if (response.status === 404 && dataGeneration && !reloaded) {
+        console.log(`Data generation ${dataGeneration} is gone, reloading the manifest`);
+        return loadManifest().then(() => loadDashboardData(companyId, true)).then(() => null);
+      }
       if (!response.ok) {
         throw new Error(`Network response was not ok: ${response.status}`);
       }
       return response.json();
     })
     .then(data => {
+      if (data === null) return null;  // Already loaded by the retry
+      
       console.log('Data loaded successfully:', data);
       dashboardData = data;
       
-      if (!data || !data.stats || !data.mentions || !data.timeline) {
+      if (!data || !data.stats || !data.mentions_index || !data.timeline) {
         throw new Error('Invalid data structure received');
       }
       
@@ -137,10 +178,11 @@ function loadDashboardData(companyId = null) {
       
       // Create charts
       createSentimentChart(dashboardData.stats);
-      createTimelineChart(dashboardData.timeline);
+      createTimelineChart(dashboardData.timeline, dashboardData.timeline_rolling, dashboardData.timeline_trend,
+                          dashboardData.anomalies);
       
-      // Populate mentions table
-      populateMentionsTable(dashboardData.mentions);
+      // Populate mentions table (remaining pages load in the background)
+      populateMentionsTable(dashboardData.mentions_index);
       
       // Show the dashboard content
       showDashboard();
@@ -248,7 +290,10 @@ function createSentimentChart(stats) {
 }
 
 // Create the sentiment timeline chart
-function createTimelineChart(timelineData) {
+// The exporter ships the points already downsampled, plus the rolling average
+// and trend, so drawing costs the same whatever the number of mentions.
+// Detected sentiment spikes and shifts are marked on top of the points.
+function createTimelineChart(timelineData, rolling, trend, anomalies) {
   if (!timelineData || timelineData.length === 0) return;
   
   // Prepare data for the chart
@@ -276,22 +321,57 @@ function createTimelineChart(timelineData) {
     name: 'Sentiment'
   };
   
-  // Add trend line if we have enough data points
   let traces = [scatterTrace];
-  if (timelineData.length >= 2) {
-    // Simple linear trend line (in a real implementation, this would be more sophisticated)
-    const trendTrace = {
-      x: dates,
-      y: calculateTrendLine(dates, scores),
+  
+  // Rolling average
+  if (rolling && rolling.date && rolling.date.length >= 2) {
+    traces.push({
+      x: rolling.date,
+      y: rolling.score,
       mode: 'lines',
       type: 'scatter',
       line: {
-        color: 'rgba(100, 100, 100, 0.5)',
+        color: 'rgba(0, 123, 255, 0.7)',
         width: 2
       },
+      name: `${rolling.window_days}-day average`
+    });
+  }
+  
+  // Time-weighted linear trend
+  if (trend) {
+    traces.push({
+      x: trend.date,
+      y: trend.score,
+      mode: 'lines',
+      type: 'scatter',
+      line: {
+        color: 'rgba(100, 100, 100, 0.5)',
+        width: 2,
+        dash: 'dash'
+      },
       name: 'Trend'
-    };
-    traces.push(trendTrace);
+    });
+  }
+  
+  // Sentiment anomalies (spikes: one outlying mention, shifts: sustained change)
+  const dated = (anomalies || []).filter(item => item.published_at);
+  if (dated.length > 0) {
+    traces.push({
+      x: dated.map(item => item.published_at),
+      y: dated.map(item => item.score),
+      text: dated.map(item => `${item.kind === 'shift' ? 'Shift' : 'Spike'} ${item.direction}: ${item.title || ''}`),
+      hoverinfo: 'x+text',
+      mode: 'markers',
+      type: 'scatter',
+      marker: {
+        symbol: dated.map(item => item.kind === 'shift' ? 'diamond-open' : 'circle-open'),
+        color: '#fd7e14',
+        size: 18,
+        line: {width: 2}
+      },
+      name: 'Anomalies'
+    });
   }
   
   const layout = {
@@ -335,85 +415,360 @@ function createTimelineChart(timelineData) {
   Plotly.newPlot('timeline-chart', traces, layout, config);
 }
 
-// Simple linear regression for trend line
-function calculateTrendLine(dates, scores) {
-  // Convert dates to numeric values for calculation
-  const xValues = dates.map((_, i) => i);
-  const yValues = scores;
-  
-  // Calculate means
-  const xMean = xValues.reduce((sum, val) => sum + val, 0) / xValues.length;
-  const yMean = yValues.reduce((sum, val) => sum + val, 0) / yValues.length;
-  
-  // Calculate slope and intercept
-  let numerator = 0;
-  let denominator = 0;
-  
-  for (let i = 0; i < xValues.length; i++) {
-    numerator += (xValues[i] - xMean) * (yValues[i] - yMean);
-    denominator += Math.pow(xValues[i] - xMean, 2);
+// Mentions table: mentions arrive in paged column-store files and are kept in
+// typed arrays; only the rows inside the scroll viewport are in the DOM
+const MENTION_OVERSCAN = 6;
+const SENTIMENT_CODES = { NEGATIVE: 0, NEUTRAL: 1, POSITIVE: 2 };
+const SENTIMENT_LABELS = ['Negative', 'Neutral', 'Positive'];
+const SENTIMENT_ROW_CLASSES = ['table-danger', '', 'table-success'];
+const MENTION_COLUMNS_HTML = `
+  <colgroup>
+    <col style="width: 16%"><col style="width: 44%"><col style="width: 16%">
+    <col style="width: 10%"><col style="width: 7%"><col style="width: 7%">
+  </colgroup>`;
+
+let mentionStore = null;
+let mentionLoadToken = 0;
+let mentionRowHeight = 41;
+
+function createMentionStore(capacity) {
+  return {
+    length: 0,
+    date: [],                             // ISO strings as exported
+    time: new Float64Array(capacity),     // Epoch ms for sorting
+    title: [],
+    search: [],                           // Lower-cased title + source for filtering
+    source: [],
+    url: [],
+    sentiment: new Uint8Array(capacity),  // SENTIMENT_CODES
+    score: new Float32Array(capacity),
+    view: new Uint32Array(0),             // Row indices after filter and sort
+    sortKey: 'time',
+    sortDir: -1,
+    filterText: '',
+    filterSentiment: -1,
+    searchFile: null,                     // Prebuilt search index of the company, if exported
+    searchIndex: null,                    // Promise of the loaded index
+    searchRows: null                      // Uint8Array row mask for filterText, from the index
+  };
+}
+
+// Append one exported page ({column: [values]}) to the store
+function appendMentionPage(store, page) {
+  const count = page.url.length;
+  if (store.length + count > store.time.length) {
+    const capacity = Math.max(store.length + count, store.time.length * 2);
+    store.time = growTypedArray(store.time, capacity);
+    store.sentiment = growTypedArray(store.sentiment, capacity);
+    store.score = growTypedArray(store.score, capacity);
   }
-  
-  const slope = numerator / denominator;
-  const intercept = yMean - (slope * xMean);
-  
-  // Generate trend line values
-  return xValues.map(x => slope * x + intercept);
+  for (let i = 0; i < count; i++) {
+    const row = store.length + i;
+    const date = page.published_at[i] || '';
+    const title = page.title[i] || '';
+    const source = page.source[i] || '';
+    store.date.push(date);
+    store.time[row] = date ? Date.parse(date) : 0;
+    store.title.push(title);
+    store.source.push(source);
+    store.search.push(`${title} ${source}`.toLowerCase());
+    store.url.push(page.url[i]);
+    store.sentiment[row] = SENTIMENT_CODES[page.sentiment[i]] ?? SENTIMENT_CODES.NEUTRAL;
+    store.score[row] = page.sentiment_score[i] ?? NaN;  // NaN: not scored
+  }
+  store.length += count;
 }
 
-// Populate the mentions table
-function populateMentionsTable(mentions) {
-  const tableContainer = document.getElementById('mentions-table');
-  
-  if (mentions.length === 0) {
-    tableContainer.innerHTML = '<p>No mentions available.</p>';
-    return;
+function growTypedArray(array, capacity) {
+  const grown = new array.constructor(capacity);
+  grown.set(array);
+  return grown;
+}
+
+// Tokenize like the exporter (lower case, accents removed, letters and digits)
+function searchTokens(value) {
+  return value.normalize('NFKD').replace(/[\u0300-\u036f]/g, '').toLowerCase().match(/[\p{L}\p{N}]+/gu) || [];
+}
+
+// Rows whose title or content contain every query word (the last one as a
+// prefix), from the prebuilt index; null when the query has no indexed words
+function matchSearchIndex(index, value) {
+  const tokens = searchTokens(value).filter(token => token.length > 1 && !index.common.has(token));
+  if (tokens.length === 0) return null;
+  
+  let result = null;
+  tokens.forEach((token, position) => {
+    const prefix = position === tokens.length - 1;
+    const rows = new Uint8Array(index.docs);
+    // Terms are sorted: find the first term >= token, then scan while it matches
+    let low = 0;
+    let high = index.terms.length;
+    while (low < high) {
+      const middle = (low + high) >> 1;
+      if (index.terms[middle] < token) low = middle + 1; else high = middle;
+    }
+    for (let t = low; t < index.terms.length; t++) {
+      const term = index.terms[t];
+      if (prefix ? !term.startsWith(token) : term !== token) break;
+      let row = 0;
+      index.postings[t].forEach(delta => {
+        row += delta;
+        rows[row] = 1;
+      });
+    }
+    if (result === null) {
+      result = rows;
+    } else {
+      for (let i = 0; i < rows.length; i++) result[i] &= rows[i];
+    }
+  });
+  return result;
+}
+
+// Load the company's search index once, the first time the filter is used
+function loadSearchIndex(store) {
+  if (!store.searchFile) return Promise.resolve(null);
+  if (!store.searchIndex) {
+    store.searchIndex = fetchSearchIndex(store.searchFile);
+  }
+  return store.searchIndex;
+}
+
+function fetchSearchIndex(file) {
+  return fetch(dataFileUrl(file))
+    .then(response => {
+      if (!response.ok) {
+        throw new Error(`Network response was not ok: ${response.status}`);
+      }
+      return response.json();
+    })
+    .then(data => {
+      data.common = new Set(data.common);
+      return data;
+    })
+    .catch(error => {
+      console.error('Error loading search index:', error);
+      return null;
+    });
+}
+
+// Recompute the filtered and sorted row order, then redraw the visible rows
+function updateMentionView() {
+  const store = mentionStore;
+  if (!store) return;
+  
+  const text = store.filterText;
+  const sentiment = store.filterSentiment;
+  const indexed = store.searchRows;
+  const view = new Uint32Array(store.length);
+  let count = 0;
+  for (let i = 0; i < store.length; i++) {
+    if (sentiment >= 0 && store.sentiment[i] !== sentiment) continue;
+    // Article text matches come from the search index; title/source substrings always count
+    if (text && !(indexed && indexed[i]) && !store.search[i].includes(text)) continue;
+    view[count++] = i;
   }
   
-  // Create table
-  const table = document.createElement('table');
-  table.className = 'table table-striped';
-  
-  // Create table header
-  const thead = document.createElement('thead');
-  thead.innerHTML = `
-    <tr>
-      <th>Date</th>
-      <th>Title</th>
-      <th>Source</th>
-      <th>Sentiment</th>
-      <th>Score</th>
-      <th>Link</th>
-    </tr>
+  const key = store.sortKey;
+  const dir = store.sortDir;
+  const column = store[key];
+  const compare = typeof column[0] === 'string'
+    ? (a, b) => dir * column[a].localeCompare(column[b])
+    : (a, b) => dir * ((column[a] || 0) - (column[b] || 0));  // Unscored rows (NaN) sort as 0
+  store.view = view.subarray(0, count).sort(compare);
+  
+  const counter = document.getElementById('mentions-count');
+  if (counter) {
+    counter.textContent = `${count} of ${store.length} mentions`;
+  }
+  scheduleRedraw('mentions');
+}
+
+// Build the table skeleton (controls, header, scroll viewport) once per company
+function renderMentionsTableShell(tableContainer, mentionsIndex) {
+  tableContainer.innerHTML = `
+    <div class="d-flex flex-wrap gap-2 align-items-center mb-2">
+      <input id="mentions-filter" type="search" class="form-control form-control-sm mentions-filter"
+             placeholder="${mentionsIndex.search ? 'Search articles' : 'Filter by title or source'}">
+      <select id="mentions-sentiment" class="form-select form-select-sm mentions-filter">
+        <option value="-1">All sentiments</option>
+        <option value="2">Positive</option>
+        <option value="1">Neutral</option>
+        <option value="0">Negative</option>
+      </select>
+      <span id="mentions-count" class="text-muted small"></span>
+    </div>
+    <table class="table mentions-table mb-0">
+      ${MENTION_COLUMNS_HTML}
+      <thead>
+        <tr>
+          <th data-sort="time">Date</th>
+          <th data-sort="title">Title</th>
+          <th data-sort="source">Source</th>
+          <th data-sort="sentiment">Sentiment</th>
+          <th data-sort="score">Score</th>
+          <th>Link</th>
+        </tr>
+      </thead>
+    </table>
+    <div id="mentions-viewport" class="mentions-viewport">
+      <div id="mentions-spacer" class="mentions-spacer">
+        <table id="mentions-rows" class="table table-striped mentions-table mentions-rows">
+          ${MENTION_COLUMNS_HTML}
+          <tbody></tbody>
+        </table>
+      </div>
+    </div>
   `;
-  table.appendChild(thead);
   
-  // Create table body
-  const tbody = document.createElement('tbody');
-  
-  mentions.forEach(mention => {
+  let filterTimer = null;
+  document.getElementById('mentions-filter').addEventListener('input', function() {
+    const value = this.value.trim().toLowerCase();
+    clearTimeout(filterTimer);
+    filterTimer = setTimeout(() => {
+      const store = mentionStore;
+      loadSearchIndex(store).then(index => {
+        if (store !== mentionStore) return;
+        store.filterText = value;
+        store.searchRows = index && value ? matchSearchIndex(index, value) : null;
+        updateMentionView();
+      });
+    }, 150);
+  });
+  document.getElementById('mentions-sentiment').addEventListener('change', function() {
+    mentionStore.filterSentiment = parseInt(this.value, 10);
+    updateMentionView();
+  });
+  tableContainer.querySelectorAll('th[data-sort]').forEach(th => {
+    th.addEventListener('click', function() {
+      const key = this.dataset.sort;
+      mentionStore.sortDir = mentionStore.sortKey === key ? -mentionStore.sortDir : (key === 'time' ? -1 : 1);
+      mentionStore.sortKey = key;
+      updateMentionView();
+    });
+  });
+  document.getElementById('mentions-viewport').addEventListener('scroll', () => scheduleRedraw('mentions'), { passive: true });
+}
+
+// Render only the rows inside the viewport (plus a few above and below)
+function renderMentionRows() {
+  const viewport = document.getElementById('mentions-viewport');
+  if (!viewport || !mentionStore) return;
+  
+  const store = mentionStore;
+  const total = store.view.length;
+  document.getElementById('mentions-spacer').style.height = `${total * mentionRowHeight}px`;
+  
+  // Start on an even row so the striping does not flip while scrolling
+  let first = Math.max(0, Math.floor(viewport.scrollTop / mentionRowHeight) - MENTION_OVERSCAN);
+  first -= first % 2;
+  const last = Math.min(total, first + Math.ceil(viewport.clientHeight / mentionRowHeight) + 2 * MENTION_OVERSCAN);
+  
+  const rows = [];
+  for (let position = first; position < last; position++) {
+    const i = store.view[position];
     const row = document.createElement('tr');
-    
-    // Add sentiment-based styling
-    if (mention.sentiment === 'POSITIVE') {
-      row.className = 'table-success';
-    } else if (mention.sentiment === 'NEGATIVE') {
-      row.className = 'table-danger';
+    const rowClass = SENTIMENT_ROW_CLASSES[store.sentiment[i]];
+    if (rowClass) {
+      row.className = rowClass;
     }
     
-    row.innerHTML = `
-      <td>${mention.published_at}</td>
-      <td>${mention.title}</td>
-      <td>${mention.source}</td>
-      <td>${mention.sentiment.charAt(0) + mention.sentiment.slice(1).toLowerCase()}</td>
-      <td>${mention.sentiment_score.toFixed(2)}</td>
-      <td><a href="${mention.url}" target="_blank">View</a></td>
-    `;
+    const link = document.createElement('a');
+    link.href = store.url[i];
+    link.target = '_blank';
+    link.rel = 'noopener';
+    link.textContent = 'View';
     
-    tbody.appendChild(row);
-  });
+    const cells = [
+      store.date[i].replace('T', ' ').slice(0, 16),
+      store.title[i],
+      store.source[i],
+      SENTIMENT_LABELS[store.sentiment[i]],
+      Number.isNaN(store.score[i]) ? '–' : store.score[i].toFixed(2),
+      link
+    ];
+    cells.forEach(value => {
+      const cell = document.createElement('td');
+      if (typeof value === 'string') {
+        cell.textContent = value;
+        cell.title = value;
+      } else {
+        cell.appendChild(value);
+      }
+      row.appendChild(cell);
+    });
+    rows.push(row);
+  }
+  
+  const table = document.getElementById('mentions-rows');
+  table.tBodies[0].replaceChildren(...rows);
+  table.style.transform = `translateY(${first * mentionRowHeight}px)`;
+  
+  // Use the real row height (it depends on the theme's font size)
+  if (rows.length && rows[0].offsetHeight && rows[0].offsetHeight !== mentionRowHeight) {
+    mentionRowHeight = rows[0].offsetHeight;
+    scheduleRedraw('mentions');
+  }
+}
+
+// Populate the mentions table from the company's paged mention files
+function populateMentionsTable(mentionsIndex) {
+  const tableContainer = document.getElementById('mentions-table');
+  const token = ++mentionLoadToken;
+  
+  if (!mentionsIndex || mentionsIndex.total === 0) {
+    mentionStore = null;
+    tableContainer.innerHTML = '<p>No mentions available.</p>';
+    return Promise.resolve();
+  }
   
-  table.appendChild(tbody);
-  tableContainer.innerHTML = '';
-  tableContainer.appendChild(table);
-}
\ No newline at end of file
+  mentionStore = createMentionStore(mentionsIndex.total);
+  mentionStore.searchFile = mentionsIndex.search || null;
+  renderMentionsTableShell(tableContainer, mentionsIndex);
+  
+  // Pages are loaded one after another; the table is usable after the first.
+  // A newer call (company switch) abandons the remaining pages.
+  return mentionsIndex.pages.reduce((chain, page) => chain.then(() => {
+    if (token !== mentionLoadToken) return;
+    return fetch(dataFileUrl(page))
+      .then(response => {
+        if (!response.ok) {
+          throw new Error(`Network response was not ok: ${response.status}`);
+        }
+        return response.json();
+      })
+      .then(data => {
+        if (token !== mentionLoadToken) return;
+        appendMentionPage(mentionStore, data);
+        updateMentionView();
+      });
+  }), Promise.resolve())
+    .catch(error => console.error('Error loading mentions:', error));
+}
+
+// Coalesce redraw requests into at most one per animation frame
+const pendingRedraws = new Set();
+
+function scheduleRedraw(part) {
+  if (pendingRedraws.size === 0) {
+    requestAnimationFrame(flushRedraws);
+  }
+  pendingRedraws.add(part);
+}
+
+function flushRedraws() {
+  const parts = new Set(pendingRedraws);
+  pendingRedraws.clear();
+  
+  if (parts.has('charts')) {
+    ['sentiment-chart', 'timeline-chart'].forEach(id => {
+      const chart = document.getElementById(id);
+      if (chart && chart.data) {
+        Plotly.Plots.resize(chart).catch(() => {});
+      }
+    });
+  }
+  if (parts.has('mentions')) {
+    renderMentionRows();
+  }
+}
@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+"""
+Benchmark article text extraction over a corpus of saved HTML pages.
+
+Compares the previous BeautifulSoup full-tree approach (if bs4 is installed)
+with extraction.extract_main_text. Without --corpus a synthetic corpus is
+generated with the same page builder the offline pipeline benchmark uses.
+
+The batch is also run through extraction.extract_many with a process pool of
+--workers processes to show how parse throughput scales with cores.
+
+Usage:
+    python benchmarks/bench_extraction.py --corpus path/to/saved_pages/
+    python benchmarks/bench_extraction.py --pages 200 --page-kb 150 --workers 8
+"""
+
+import argparse
+import glob
+import os
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+import extraction  # noqa: E402
+from extraction import DEFAULT_MAX_CHARS, extract_main_text  # noqa: E402
+from fake_services import build_article_html  # noqa: E402
+
+
+def legacy_extract(html):
+    """The BeautifulSoup extraction that fetch_article_content used before."""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, 'lxml')
+    for script in soup(["script", "style", "nav", "footer", "header"]):
+        script.decompose()
+    text = soup.get_text(separator=' ', strip=True)
+    return ' '.join(text.split())
+
+
+def load_corpus(args):
+    if args.corpus:
+        pages = []
+        for path in sorted(glob.glob(os.path.join(args.corpus, "**", "*.htm*"), recursive=True)):
+            with open(path, "rb") as f:
+                pages.append(f.read())
+        return pages
+    return [build_article_html("Acme Corp", i, args.page_kb * 1024) for i in range(args.pages)]
+
+
+def run(name, extract, pages, repeat):
+    best = None
+    chars = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        chars = sum(len(extract(page)) for page in pages)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    total_mb = sum(len(page) for page in pages) / (1024 * 1024)
+    print(f"  {name:<14} {best:8.3f} s  {len(pages) / best:8.1f} pages/s  "
+          f"{total_mb / best:7.1f} MB/s  avg {chars / len(pages):8.0f} chars/page")
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark HTML text extraction")
+    parser.add_argument("--corpus", help="Directory of saved .html pages")
+    parser.add_argument("--pages", type=int, default=100, help="Synthetic pages when no corpus is given")
+    parser.add_argument("--page-kb", type=int, default=100, help="Synthetic page size in KB")
+    parser.add_argument("--max-chars", type=int, default=DEFAULT_MAX_CHARS, help="Characters to extract per page")
+    parser.add_argument("--repeat", type=int, default=3, help="Repetitions (best time is reported)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Processes for the pooled run")
+    args = parser.parse_args()
+
+    pages = load_corpus(args)
+    if not pages:
+        print("No pages found")
+        return
+    print(f"{len(pages)} pages, {sum(len(p) for p in pages) / (1024 * 1024):.1f} MB")
+
+    results = {}
+    try:
+        results["bs4 full tree"] = run("bs4 full tree", legacy_extract, pages, args.repeat)
+    except ImportError:
+        print("  bs4 not installed, skipping the legacy extractor")
+    results["main text"] = run("main text", lambda page: extract_main_text(page, args.max_chars), pages, args.repeat)
+
+    if args.workers > 1:
+        extraction.PARSE_WORKERS = args.workers
+        extraction.PARSE_POOL_MIN_PAGES = 1
+        batch = [(page, None) for page in pages]
+        extraction.extract_many(batch[:args.workers], args.max_chars)  # start the workers
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            extraction.extract_many(batch, args.max_chars)
+        elapsed = (time.perf_counter() - start) / args.repeat
+        print(f"  {'pool x' + str(args.workers):<14} {elapsed:8.3f} s  {len(pages) / elapsed:8.1f} pages/s")
+
+    if "bs4 full tree" in results:
+        print(f"Speedup: {results['bs4 full tree'] / results['main text']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+"""
+Microbenchmark for the overhead of logger.log_function_call.
+
+Times db.get_db undecorated, wrapped with the previous decorator implementation
+(per-call inspect + os.path work, two INFO lines), and with the current one in
+both "production" and "verbose" modes. Handlers are pointed at os.devnull so
+the numbers measure formatting and bookkeeping rather than terminal speed.
+
+Usage:
+    python benchmarks/bench_logging.py [--calls 20000]
+"""
+
+import argparse
+import logging
+import os
+import sys
+import timeit
+from functools import wraps
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import logger as app_logger  # noqa: E402
+import db  # noqa: E402
+
+
+def legacy_log_function_call(func):
+    """The decorator as it was before the low-overhead logging mode."""
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        func_name = func.__name__
+        try:
+            import inspect
+            file_path = inspect.getfile(func)
+            project_root = os.path.dirname(os.path.abspath(app_logger.__file__))
+            if file_path.startswith(project_root):
+                rel_path = os.path.relpath(file_path, project_root)
+            else:
+                rel_path = file_path
+        except Exception:
+            rel_path = 'unknown'
+        app_logger.logger.info(f"Starting {func_name} in {rel_path}")
+        try:
+            result = func(*args, **kwargs)
+            app_logger.logger.info(f"Completed {func_name} in {rel_path} successfully")
+            return result
+        except Exception as e:
+            app_logger.logger.error(f"Error in {func_name} ({rel_path}): {str(e)}")
+            raise
+    return wrapper
+
+
+def time_calls(func, calls):
+    """Return the mean time per call in microseconds."""
+    return timeit.timeit(func, number=calls) / calls * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark log_function_call overhead")
+    parser.add_argument("--calls", type=int, default=20000, help="Number of calls per variant")
+    args = parser.parse_args()
+
+    # Send all output to /dev/null with the real formatter
+    devnull = open(os.devnull, 'w')
+    handler = logging.StreamHandler(devnull)
+    handler.setFormatter(app_logger.formatter)
+    original_handlers = app_logger.logger.handlers[:]
+    app_logger.logger.handlers = [handler]
+
+    raw_get_db = db.get_db.__wrapped__
+    results = {"undecorated": time_calls(raw_get_db, args.calls)}
+
+    results["legacy decorator"] = time_calls(legacy_log_function_call(raw_get_db), args.calls)
+
+    original_call_level = app_logger.CALL_LOG_LEVEL
+    try:
+        app_logger.CALL_LOG_LEVEL = logging.DEBUG
+        results["current (production)"] = time_calls(app_logger.log_function_call(raw_get_db), args.calls)
+
+        app_logger.CALL_LOG_LEVEL = logging.INFO
+        results["current (verbose)"] = time_calls(app_logger.log_function_call(raw_get_db), args.calls)
+    finally:
+        app_logger.CALL_LOG_LEVEL = original_call_level
+        app_logger.logger.handlers = original_handlers
+        devnull.close()
+
+    baseline = results["undecorated"]
+    print(f"db.get_db, {args.calls} calls")
+    for name, per_call in results.items():
+        print(f"  {name:<22} {per_call:8.2f} us/call  (+{per_call - baseline:.2f} us overhead)")
+
+
+if __name__ == "__main__":
+    main()
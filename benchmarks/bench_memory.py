@@ -0,0 +1,170 @@
+#!/usr/bin/env python
+"""
+Memory benchmark for the in-memory mention pipeline.
+
+Builds synthetic NewsAPI results for --companies x --articles mentions
+(content of about --content-kb KB each, as extracted pages are capped),
+turns them into mentions like a batched run does (all companies are fetched
+before any is processed), then runs runner.process_company for every company
+against a throwaway SQLite database. Sentiment analysis is replaced by a
+local stub, so no network or API keys are needed.
+
+Reports peak RSS, the RSS held by the fetched mentions, the allocation
+overhead of the mention objects themselves (tracemalloc) and wall time. Each
+run is appended to benchmarks/results/memory.jsonl and compared with the
+previous run at the same scale.
+
+Usage:
+    python benchmarks/bench_memory.py --companies 50 --articles 200
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, PROJECT_ROOT)
+sys.path.insert(0, BENCH_DIR)
+
+from bench_pipeline import git_revision, load_previous, peak_rss_mb  # noqa: E402
+from fake_services import SENTENCES  # noqa: E402
+
+DEFAULT_RESULTS = os.path.join(BENCH_DIR, "results", "memory.jsonl")
+
+
+def current_rss_mb():
+    """Current resident set size in MB (Linux only, None elsewhere)."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return round(pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024), 1)
+
+
+def synthetic_results(company, count, content_bytes, rng):
+    """NewsAPI-style articles and their extracted texts for one company."""
+    now = datetime.utcnow()
+    articles, contents = [], {}
+    for i in range(count):
+        url = f"https://news.example.com/{company.replace(' ', '-').lower()}/{i}"
+        parts, size = [], 0
+        while size < content_bytes:
+            sentence = rng.choice(SENTENCES).format(company=company) + f" ({rng.randrange(10 ** 6)})"
+            parts.append(sentence)
+            size += len(sentence) + 1
+        contents[url] = " ".join(parts)
+        articles.append({
+            "source": {"id": None, "name": f"Source {i % 7}"},
+            "title": f"{company} news {i}",
+            "description": f"Short description about {company}.",
+            "url": url,
+            "publishedAt": (now - timedelta(minutes=i)).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "content": f"{company} snippet {i} [+1000 chars]",
+        })
+    return articles, contents
+
+
+def run_benchmark(args):
+    with tempfile.TemporaryDirectory() as workdir:
+        os.environ.update({
+            "NEWSAPI_KEY": "offline-benchmark",
+            "OPENAI_API_KEY": "offline-benchmark",
+            "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'memory.db')}",
+        })
+        os.environ.setdefault("LOG_LEVEL", args.log_level)
+        os.chdir(workdir)
+
+        import api_client
+        import db
+        import runner
+
+        # Stub out the OpenAI call; everything else runs as in production
+        api_client.analyze_sentiment = lambda text, pattern=None, title=None: {
+            "label": "NEUTRAL", "score": round((len(text) % 200) / 100 - 1, 2)
+        }
+
+        db.init_db()
+        company_ids = [db.add_company(f"MemCo {i}", [f"MC{i}"]).id for i in range(args.companies)]
+        client = api_client.NewsClient()
+        rng = random.Random(0)
+        baseline_rss = current_rss_mb()
+
+        start = time.perf_counter()
+        prefetched = {}
+        record_bytes = 0
+        for i, company_id in enumerate(company_ids):
+            articles, contents = synthetic_results(f"MemCo {i}", args.articles, args.content_kb * 1024, rng)
+            # Trace only the mention objects, not the texts they reference
+            tracemalloc.start()
+            before = tracemalloc.get_traced_memory()[0]
+            prefetched[company_id] = client.build_mentions(articles, contents)
+            record_bytes += tracemalloc.get_traced_memory()[0] - before
+            tracemalloc.stop()
+            del articles, contents
+        fetched_rss = current_rss_mb()
+
+        stored = 0
+        for company_id in company_ids:
+            result = runner.process_company(company_id, args.articles, mentions=prefetched.pop(company_id),
+                                            news_client=client)
+            stored += result.get("mentions_added", 0)
+        elapsed = time.perf_counter() - start
+
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "scale": {"companies": args.companies, "articles": args.articles, "content_kb": args.content_kb},
+        "wall_seconds": round(elapsed, 3),
+        "mentions_stored": stored,
+        "mentions_rss_mb": round(fetched_rss - baseline_rss, 1) if fetched_rss and baseline_rss else None,
+        "record_bytes_per_mention": round(record_bytes / max(1, args.companies * args.articles)),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory benchmark for the mention pipeline")
+    parser.add_argument("--companies", type=int, default=20, help="Number of companies")
+    parser.add_argument("--articles", type=int, default=200, help="Mentions per company")
+    parser.add_argument("--content-kb", type=int, default=3, help="Extracted text per mention in KB")
+    parser.add_argument("--log-level", default="WARNING", help="LOG_LEVEL for the run (default: WARNING)")
+    parser.add_argument("--results", default=DEFAULT_RESULTS, help="JSON-lines file to append results to")
+    parser.add_argument("--no-save", action="store_true", help="Do not store the result")
+    args = parser.parse_args()
+
+    results_file = os.path.abspath(args.results)
+    result = run_benchmark(args)
+    previous = load_previous(results_file, result["scale"])
+
+    print(f"Scale: {args.companies} companies x {args.articles} mentions ({args.content_kb} KB each)")
+    print(f"  wall time        {result['wall_seconds']:.2f} s")
+    print(f"  mentions stored  {result['mentions_stored']}")
+    print(f"  fetched mentions {result['mentions_rss_mb']} MB RSS")
+    print(f"  record overhead  {result['record_bytes_per_mention']} bytes per mention (excluding text)")
+    print(f"  peak RSS         {result['peak_rss_mb']} MB")
+    if previous:
+        print(f"Compared with {previous.get('revision') or 'previous run'} ({previous['timestamp']}):")
+        print(f"  peak RSS  {previous['peak_rss_mb']} MB -> {result['peak_rss_mb']} MB")
+        if previous.get("record_bytes_per_mention"):
+            print(f"  record overhead {previous['record_bytes_per_mention']} -> {result['record_bytes_per_mention']} bytes per mention")
+        print(f"  wall time {previous['wall_seconds']:.2f} s -> {result['wall_seconds']:.2f} s")
+
+    if not args.no_save:
+        os.makedirs(os.path.dirname(results_file), exist_ok=True)
+        with open(results_file, "a") as f:
+            f.write(json.dumps(result) + "\n")
+        print(f"Result appended to {results_file}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+#!/usr/bin/env python
+"""
+Offline end-to-end benchmark for runner.run_all_companies.
+
+Starts the local stand-ins from fake_services.py (NewsAPI, article pages,
+OpenAI chat completions), points the pipeline at them with a throwaway SQLite
+database, and runs it at the requested scale (companies x articles).
+
+Reports wall time, articles/second, per-stage latency percentiles (from the
+metrics module) and peak RSS. Each run is appended to
+benchmarks/results/pipeline.jsonl and compared with the previous run at the
+same scale.
+
+Usage:
+    python benchmarks/bench_pipeline.py --companies 5 --articles 20
+    python benchmarks/bench_pipeline.py --page-kb 200 --page-latency-ms 100 --llm-latency-ms 500
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, PROJECT_ROOT)
+sys.path.insert(0, BENCH_DIR)
+
+from fake_services import FakeServiceConfig, FakeServices  # noqa: E402
+
+DEFAULT_RESULTS = os.path.join(BENCH_DIR, "results", "pipeline.jsonl")
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB (None where unsupported)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS reports bytes
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return None
+
+
+def load_previous(results_file, scale):
+    """Return the most recent stored result with the same scale, if any."""
+    if not os.path.exists(results_file):
+        return None
+    previous = None
+    with open(results_file) as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if entry.get("scale") == scale:
+                previous = entry
+    return previous
+
+
+def run_benchmark(args):
+    config = FakeServiceConfig(
+        page_bytes=args.page_kb * 1024,
+        page_latency=args.page_latency_ms / 1000,
+        newsapi_latency=args.newsapi_latency_ms / 1000,
+        llm_latency=args.llm_latency_ms / 1000,
+    )
+    config.pdf_every = args.pdf_every
+    config.syndication = args.syndication
+    config.passing_every = args.passing_every
+
+    with FakeServices(config) as services, tempfile.TemporaryDirectory() as workdir:
+        # Configure the pipeline before any project module is imported
+        os.environ.update(services.environment())
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+        os.environ.setdefault("LOG_LEVEL", args.log_level)
+        os.chdir(workdir)
+
+        import db
+        import metrics
+        import runner
+
+        db.init_db()
+        for i in range(args.companies):
+            db.add_company(f"BenchCo {i}", [f"BCO{i}"])
+
+        metrics.reset()
+        start = time.perf_counter()
+        summary = runner.run_all_companies(article_limit=args.articles)
+        elapsed = time.perf_counter() - start
+        snapshot = metrics.snapshot()
+
+    articles = snapshot["counters"].get("articles_scraped", 0)
+    stages = {
+        name: {key: stats[key] for key in ("count", "p50", "p95", "p99")}
+        for name, stats in snapshot["latency_seconds"].items()
+    }
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "scale": {
+            "companies": args.companies,
+            "articles": args.articles,
+            "page_kb": args.page_kb,
+            "page_latency_ms": args.page_latency_ms,
+            "newsapi_latency_ms": args.newsapi_latency_ms,
+            "llm_latency_ms": args.llm_latency_ms,
+            "pdf_every": args.pdf_every,
+            "syndication": args.syndication,
+            "passing_every": args.passing_every,
+        },
+        "wall_seconds": round(elapsed, 3),
+        "articles_processed": articles,
+        "articles_per_second": round(articles / elapsed, 2) if elapsed else 0.0,
+        "mentions_stored": summary.get("total_new_mentions", 0),
+        "sentiment_calls": snapshot["counters"].get("sentiment_calls", 0),
+        "mentions_irrelevant": snapshot["counters"].get("mentions_irrelevant", 0),
+        "peak_rss_mb": peak_rss_mb(),
+        "stages": stages,
+    }
+
+
+def print_result(result, previous):
+    print(f"Scale: {result['scale']['companies']} companies x {result['scale']['articles']} articles")
+    print(f"  wall time        {result['wall_seconds']:.2f} s")
+    print(f"  throughput       {result['articles_per_second']:.2f} articles/s")
+    print(f"  mentions stored  {result['mentions_stored']}")
+    print(f"  sentiment calls  {result['sentiment_calls']}")
+    print(f"  irrelevant       {result.get('mentions_irrelevant', 0)} mentions dropped")
+    print(f"  peak RSS         {result['peak_rss_mb']} MB")
+    print("  stage latency (s)      count      p50      p95      p99")
+    for name, stats in sorted(result["stages"].items()):
+        print(f"    {name:<20} {stats['count']:>7} {stats['p50']:>8.4f} {stats['p95']:>8.4f} {stats['p99']:>8.4f}")
+
+    if previous:
+        ratio = result["wall_seconds"] / previous["wall_seconds"] if previous["wall_seconds"] else 0
+        print(f"Compared with {previous.get('revision') or 'previous run'} ({previous['timestamp']}):")
+        print(f"  wall time {previous['wall_seconds']:.2f} s -> {result['wall_seconds']:.2f} s ({ratio:.2f}x)")
+        if previous.get("peak_rss_mb") and result.get("peak_rss_mb"):
+            print(f"  peak RSS  {previous['peak_rss_mb']} MB -> {result['peak_rss_mb']} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline pipeline benchmark")
+    parser.add_argument("--companies", type=int, default=3, help="Number of companies")
+    parser.add_argument("--articles", type=int, default=10, help="Articles per company")
+    parser.add_argument("--page-kb", type=int, default=50, help="Size of each article page in KB")
+    parser.add_argument("--page-latency-ms", type=float, default=50, help="Article page response latency")
+    parser.add_argument("--newsapi-latency-ms", type=float, default=100, help="NewsAPI response latency")
+    parser.add_argument("--llm-latency-ms", type=float, default=300, help="Chat completion response latency")
+    parser.add_argument("--pdf-every", type=int, default=0, help="Serve every n-th article as a PDF")
+    parser.add_argument("--syndication", type=int, default=1, help="Serve each story under this many article URLs")
+    parser.add_argument("--passing-every", type=int, default=0, help="Every n-th article names its company only in passing")
+    parser.add_argument("--log-level", default="WARNING", help="LOG_LEVEL for the run (default: WARNING)")
+    parser.add_argument("--results", default=DEFAULT_RESULTS, help="JSON-lines file to append results to")
+    parser.add_argument("--no-save", action="store_true", help="Do not store the result")
+    args = parser.parse_args()
+
+    results_file = os.path.abspath(args.results)
+    result = run_benchmark(args)
+    previous = load_previous(results_file, result["scale"])
+    print_result(result, previous)
+
+    if not args.no_save:
+        os.makedirs(os.path.dirname(results_file), exist_ok=True)
+        with open(results_file, "a") as f:
+            f.write(json.dumps(result) + "\n")
+        print(f"Result appended to {results_file}")
+
+
+if __name__ == "__main__":
+    main()
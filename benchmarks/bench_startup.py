@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+"""
+Cold-start benchmark for the command line entry points.
+
+Each scenario runs in a fresh interpreter with `python -X importtime`, in a
+scratch directory with a throwaway SQLite database and no API keys. Reports
+wall time (best of --repeat), total import time and the slowest top-level
+imports. Results are appended to benchmarks/results/startup.jsonl and
+compared with the previous run.
+
+Usage:
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --repeat 10 --top 8
+"""
+
+import argparse
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from bench_pipeline import git_revision, load_previous  # noqa: E402
+
+DEFAULT_RESULTS = os.path.join(BENCH_DIR, "results", "startup.jsonl")
+
+RUNNER = os.path.join(PROJECT_ROOT, "runner.py")
+
+SCENARIOS = [
+    ("import runner", ["-c", "import runner"]),
+    ("runner --add", [RUNNER, "--add", "--name", "Bench Corp", "--aliases", "BC"]),
+    ("runner --generate-only", [RUNNER, "--generate-only"]),
+    ("import api_client", ["-c", "import api_client"]),
+]
+
+IMPORT_LINE = re.compile(r"^import time:\s+(\d+)\s*\|\s*(\d+)\s*\|( *)(\S+)")
+
+
+def parse_importtime(stderr):
+    """Return (total seconds, [(module, cumulative seconds)]) for top-level imports."""
+    top_level = []
+    for line in stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        # One space of indentation marks a module imported directly by the script
+        if match and len(match.group(3)) == 1:
+            top_level.append((match.group(4), int(match.group(2)) / 1e6))
+    return sum(seconds for _, seconds in top_level), top_level
+
+
+def run_scenario(args_list, workdir, repeat):
+    env = dict(os.environ)
+    env.pop("NEWSAPI_KEY", None)
+    env.pop("OPENAI_API_KEY", None)
+    env["PYTHONPATH"] = PROJECT_ROOT
+    env["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'startup.db')}"
+    env["LOG_LEVEL"] = "WARNING"
+
+    best_wall = None
+    best_imports = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime"] + args_list,
+            cwd=workdir, env=env, capture_output=True, text=True
+        )
+        wall = time.perf_counter() - start
+        total, top_level = parse_importtime(proc.stderr)
+        if best_wall is None or wall < best_wall:
+            best_wall = wall
+        if best_imports is None or total < best_imports[0]:
+            best_imports = (total, top_level)
+    return best_wall, best_imports
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold-start and import-time benchmark")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per scenario (best is reported)")
+    parser.add_argument("--top", type=int, default=5, help="Slowest top-level imports to show")
+    parser.add_argument("--results", default=DEFAULT_RESULTS, help="JSON-lines file to append results to")
+    parser.add_argument("--no-save", action="store_true", help="Do not store the result")
+    args = parser.parse_args()
+
+    results_file = os.path.abspath(args.results)
+    scenarios = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for name, args_list in SCENARIOS:
+            wall, (imports, top_level) = run_scenario(args_list, workdir, args.repeat)
+            slowest = sorted(top_level, key=lambda item: item[1], reverse=True)[:args.top]
+            scenarios[name] = {
+                "wall_seconds": round(wall, 3),
+                "import_seconds": round(imports, 3),
+                "slowest_imports": [[module, round(seconds, 3)] for module, seconds in slowest],
+            }
+
+    result = {
+        "timestamp": datetime.now().isoformat(),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "scale": {"scenarios": [name for name, _ in SCENARIOS]},
+        "scenarios": scenarios,
+    }
+    previous = load_previous(results_file, result["scale"])
+
+    print("Scenario                   wall (s)  imports (s)  slowest imports")
+    for name, stats in scenarios.items():
+        slowest = ", ".join(f"{module} {seconds:.3f}" for module, seconds in stats["slowest_imports"])
+        print(f"  {name:<24} {stats['wall_seconds']:>8.3f} {stats['import_seconds']:>12.3f}  {slowest}")
+
+    if previous:
+        print(f"Compared with {previous.get('revision') or 'previous run'} ({previous['timestamp']}):")
+        for name, stats in scenarios.items():
+            before = previous["scenarios"].get(name)
+            if before and before["wall_seconds"]:
+                ratio = stats["wall_seconds"] / before["wall_seconds"]
+                print(f"  {name:<24} {before['wall_seconds']:.3f} s -> {stats['wall_seconds']:.3f} s ({ratio:.2f}x)")
+
+    if not args.no_save:
+        os.makedirs(os.path.dirname(results_file), exist_ok=True)
+        with open(results_file, "a") as f:
+            f.write(json.dumps(result) + "\n")
+        print(f"Result appended to {results_file}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+"""
+Local stand-ins for the external services used by the pipeline.
+
+A single threaded HTTP server provides:
+    GET  /v2/everything         NewsAPI "everything" endpoint
+    GET  /article/<company>/<n> HTML article pages of configurable size and latency
+    POST /v1/chat/completions   OpenAI-compatible chat completion endpoint
+
+Used by the offline benchmarks so the pipeline can be measured without API keys.
+"""
+
+import json
+import random
+import re
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, quote, unquote, urlparse
+
+SENTENCES = [
+    "{company} reported quarterly results that beat analyst expectations.",
+    "Shares of {company} fell after regulators announced an investigation.",
+    "Analysts remain divided on the long-term outlook for the sector.",
+    "The company said it would expand production capacity next year.",
+    "Critics raised concerns about supply chain risk and rising costs.",
+    "{company} unveiled a new product line at its annual event.",
+    "Market conditions were described as challenging but improving.",
+    "Investors welcomed the announcement of a record dividend.",
+]
+
+BOILERPLATE = """
+<header><div class="logo">Daily Business Wire</div></header>
+<nav><ul>{links}</ul></nav>
+<script>window.dataLayer = window.dataLayer || []; function track() {{ return {payload!r}; }}</script>
+<style>.article {{ font-family: serif; }} .nav li {{ display: inline; }}</style>
+"""
+
+FOOTER = """
+<aside class="related"><h3>Related</h3><ul>{links}</ul></aside>
+<footer><p>Copyright Daily Business Wire. All rights reserved.</p></footer>
+"""
+
+
+# Company named once, near the end, by articles that are about something else
+PASSING_SENTENCE = "Rivals such as {company} were not part of the deal."
+PASSING_SUBJECT = "Initech"
+
+
+def build_article_html(company, index, size_bytes, seed=0, passing=False):
+    """Build a synthetic article page of roughly size_bytes bytes.
+
+    With passing=True the article is about another firm and names the
+    company only once, in its last paragraph.
+    """
+    rng = random.Random(f"{company}-{index}-{seed}")
+    links = "".join(f'<li><a href="/section/{i}">Section {i}</a></li>' for i in range(20))
+    head = BOILERPLATE.format(links=links, payload="x" * 200)
+    subject = PASSING_SUBJECT if passing else company
+    paragraphs = []
+    size = len(head) + 300
+    while size < size_bytes:
+        text = " ".join(rng.choice(SENTENCES).format(company=subject) for _ in range(5))
+        paragraph = f"<p>{text}</p>\n"
+        paragraphs.append(paragraph)
+        size += len(paragraph)
+    if passing:
+        paragraphs.append(f"<p>{PASSING_SENTENCE.format(company=company)}</p>\n")
+    return (
+        f"<!DOCTYPE html><html><head><title>{subject} news {index}</title></head><body>"
+        f"{head}<article class=\"article\"><h1>{subject} news {index}</h1>{''.join(paragraphs)}</article>"
+        f"{FOOTER.format(links=links)}</body></html>"
+    ).encode("utf-8")
+
+
+class FakeServiceConfig:
+    """Tunable behaviour of the fake services."""
+
+    def __init__(self, page_bytes=50000, page_latency=0.05, newsapi_latency=0.1, llm_latency=0.3):
+        self.page_bytes = page_bytes
+        self.page_latency = page_latency
+        self.newsapi_latency = newsapi_latency
+        self.llm_latency = llm_latency
+        self.total_results = 10000  # Matching articles reported for every query
+        self.pdf_every = 0         # Serve every n-th article as a PDF (0: never)
+        self.syndication = 1       # Outlets (distinct URLs) republishing each story of a term
+        self.passing_every = 0     # Every n-th result only names its term in passing (0: never)
+
+
+class FakeServiceHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def config(self):
+        return self.server.config
+
+    def send_body(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except ConnectionError:
+            pass
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        if parsed.path == "/v2/everything":
+            self.handle_everything(parse_qs(parsed.query))
+        elif parsed.path.startswith("/article/"):
+            self.handle_article(parsed.path, parse_qs(parsed.query))
+        else:
+            self.send_body(404, b"not found", "text/plain")
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        if urlparse(self.path).path.endswith("/chat/completions"):
+            self.handle_chat(payload)
+        else:
+            self.send_body(404, b"not found", "text/plain")
+
+    def handle_everything(self, query):
+        time.sleep(self.config.newsapi_latency)
+        q = query.get("q", [""])[0]
+        terms = re.findall(r'"([^"]+)"', q) or [q]
+        page_size = int(query.get("pageSize", ["20"])[0])
+        page = int(query.get("page", ["1"])[0])
+        total = self.config.total_results
+        start = (page - 1) * page_size
+        count = max(0, min(page_size, total - start))
+        host = f"http://{self.headers.get('Host')}"
+        now = datetime.utcnow()
+
+        articles = []
+        for i in range(start, start + count):
+            term = terms[i % len(terms)]
+            passing = bool(self.config.passing_every) and i % self.config.passing_every == self.config.passing_every - 1
+            subject = PASSING_SUBJECT if passing else term
+            url = self.article_url(host, term, i, i // len(terms))
+            if passing:
+                url += ("&" if "?" in url else "?") + "passing=1"
+            articles.append({
+                "source": {"id": None, "name": f"Source {i % 7}"},
+                "title": f"{subject} news {i}",
+                "description": f"Short description about {subject}." + (f" Also mentions {term}." if passing else ""),
+                "url": url,
+                "publishedAt": (now - timedelta(minutes=i)).strftime("%Y-%m-%dT%H:%M:%SZ"),
+                "content": f"{subject} snippet {i} [+1000 chars]"
+            })
+        body = json.dumps({"status": "ok", "totalResults": total, "articles": articles}).encode("utf-8")
+        self.send_body(200, body, "application/json")
+
+    def article_url(self, host, term, i, term_rank):
+        """URL of result i (the term_rank-th for its term); with syndication, a term's consecutive results share a story."""
+        syndication = self.config.syndication
+        if syndication <= 1:
+            return f"{host}/article/{quote(term)}/{i}"
+        return f"{host}/article/{quote(term)}/{term_rank // syndication}?outlet={i}"
+
+    def handle_article(self, path, query):
+        time.sleep(self.config.page_latency)
+        _, _, company, index = path.split("/", 3)
+        if self.config.pdf_every and index.isdigit() and int(index) % self.config.pdf_every == 0:
+            self.send_body(200, b"%PDF-1.4\n" + b"0" * self.config.page_bytes, "application/pdf")
+            return
+        body = build_article_html(unquote(company), index, self.config.page_bytes,
+                                  passing=query.get("passing") == ["1"])
+        self.send_body(200, body, "text/html; charset=utf-8")
+
+    def handle_chat(self, payload):
+        time.sleep(self.config.llm_latency)
+        text = payload.get("messages", [{}])[-1].get("content", "")
+        score = round((len(text) % 200) / 100 - 1, 2)
+        label = "POSITIVE" if score > 0.2 else "NEGATIVE" if score < -0.2 else "NEUTRAL"
+        body = json.dumps({
+            "id": "chatcmpl-bench",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": payload.get("model", "gpt-4o-mini"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": json.dumps({"label": label, "score": score})},
+                "finish_reason": "stop"
+            }],
+            "usage": {"prompt_tokens": len(text) // 4, "completion_tokens": 10, "total_tokens": len(text) // 4 + 10}
+        }).encode("utf-8")
+        self.send_body(200, body, "application/json")
+
+
+class QuietHTTPServer(ThreadingHTTPServer):
+    """Ignore clients that hang up early (e.g. size-capped article downloads)."""
+
+    def handle_error(self, request, client_address):
+        if isinstance(sys.exc_info()[1], (ConnectionError, TimeoutError)):
+            return
+        super().handle_error(request, client_address)
+
+
+class FakeServices:
+    """Run the fake services in a background thread; usable as a context manager."""
+
+    def __init__(self, config=None, host="127.0.0.1", port=0):
+        self.server = QuietHTTPServer((host, port), FakeServiceHandler)
+        self.server.daemon_threads = True
+        self.server.config = config or FakeServiceConfig()
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def environment(self):
+        """Environment variables pointing the pipeline at these services."""
+        return {
+            "NEWSAPI_KEY": "offline-benchmark",
+            "OPENAI_API_KEY": "offline-benchmark",
+            "NEWSAPI_URL": f"{self.base_url}/v2/everything",
+            "OPENAI_BASE_URL": f"{self.base_url}/v1",
+            "REQUEST_DELAY_MIN": "0",
+            "REQUEST_DELAY_MAX": "0",
+        }
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
@@ -1,9 +1,16 @@
-from sqlalchemy import create_engine, Column, Integer, String, Text, Float, ForeignKey, DateTime
+from sqlalchemy import create_engine, Column, Integer, String, Text, Float, ForeignKey, DateTime, LargeBinary, Index, UniqueConstraint, and_, insert, or_, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship, sessionmaker, scoped_session
+from sqlalchemy.orm import deferred, relationship, sessionmaker, scoped_session, undefer
+import json
+import os
 from datetime import datetime
 from datetime import timedelta
 from logger import get_logger, log_function_call, log_info, log_error, log_warning
+from dedup import DEDUP_THRESHOLD, band_hashes, pack_signature, similarity, unpack_signature
+import search_index
+from archive import ARCHIVE_AFTER_DAYS, ARCHIVE_CODEC, VACUUM_FREE_RATIO, compress, decompress
+import anomaly
 
 # Get logger
 logger = get_logger()
@@ -12,7 +19,10 @@ logger = get_logger()
 Base = declarative_base()
 
 # Database URL
-DATABASE_URL = "sqlite:///company_tracker.db"
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///company_tracker.db")
+
+# URLs dropped by the relevance filter are remembered this long (well past the fetch overlap window)
+DROPPED_URLS_KEEP_DAYS = int(os.getenv("DROPPED_URLS_KEEP_DAYS", "7"))
 
 # Create engine and session
 engine = create_engine(
@@ -41,9 +51,10 @@ class Mention(Base):
     id = Column(Integer, primary_key=True)
     company_id = Column(Integer, ForeignKey("companies.id"), nullable=False)
     title = Column(String(255), nullable=False)
-    content = Column(Text, nullable=True)
+    # Loaded only when accessed; NULL once the body is moved to mention_archive (read full_content)
+    content = deferred(Column(Text, nullable=True))
     sentiment = Column(String(20), nullable=True)  # POSITIVE, NEGATIVE, NEUTRAL
-    sentiment_score = Column(Float, nullable=True)
+    sentiment_score = Column(Float, nullable=True)  # NULL if the mention could not be scored
     url = Column(String(255), nullable=False)
     source = Column(String(100), nullable=True)
     published_at = Column(DateTime, nullable=True)
@@ -51,13 +62,144 @@ class Mention(Base):
     
     company = relationship("Company", back_populates="mentions")
     
+    @property
+    def full_content(self):
+        """Article text, decompressed from mention_archive if it was archived."""
+        if self.content is not None:
+            return self.content
+        # get_mentions loads archived bodies with the mentions
+        archived = getattr(self, "_archived_content", None)
+        if archived is None:
+            archived = get_archived_contents([self.id]).get(self.id, '')
+        return archived
+    
     def __repr__(self):
         return f"<Mention(id={self.id}, title='{self.title[:20]}...', sentiment='{self.sentiment}')>"
 
+class MentionArchive(Base):
+    __tablename__ = "mention_archive"
+    
+    mention_id = Column(Integer, ForeignKey("mentions.id"), primary_key=True)
+    codec = Column(String(10), nullable=False)    # See archive.py
+    body = Column(LargeBinary, nullable=False)    # Compressed article text
+    archived_at = Column(DateTime, default=datetime.now)
+    # Estimated bytes archiving left unused in the mentions table; reset by VACUUM
+    freed_bytes = Column(Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f"<MentionArchive(mention_id={self.mention_id}, codec='{self.codec}')>"
+
+class FetchWatermark(Base):
+    __tablename__ = "fetch_watermarks"
+    
+    company_id = Column(Integer, ForeignKey("companies.id"), primary_key=True)
+    latest_published_at = Column(DateTime, nullable=True)  # Newest article seen so far
+    last_success_at = Column(DateTime, nullable=True)      # Last successful fetch for the company
+    
+    def __repr__(self):
+        return f"<FetchWatermark(company_id={self.company_id}, latest_published_at='{self.latest_published_at}')>"
+
+class DroppedUrl(Base):
+    __tablename__ = "dropped_urls"
+    
+    # Fetched articles the relevance filter dropped, so later runs do not fetch them again
+    company_id = Column(Integer, ForeignKey("companies.id"), primary_key=True)
+    url = Column(String(255), primary_key=True)
+    published_at = Column(DateTime, nullable=True)
+    dropped_at = Column(DateTime, default=datetime.now)
+    
+    def __repr__(self):
+        return f"<DroppedUrl(company_id={self.company_id}, url='{self.url}')>"
+
+class MentionSignature(Base):
+    __tablename__ = "mention_signatures"
+    
+    mention_id = Column(Integer, ForeignKey("mentions.id"), primary_key=True)
+    cluster_key = Column(String(255), nullable=False, index=True)  # URL of the cluster's representative
+    signature = Column(LargeBinary, nullable=False)                # Packed MinHash signature
+    
+    def __repr__(self):
+        return f"<MentionSignature(mention_id={self.mention_id}, cluster_key='{self.cluster_key}')>"
+
+class LshBucket(Base):
+    __tablename__ = "lsh_buckets"
+    
+    id = Column(Integer, primary_key=True)
+    band = Column(Integer, nullable=False)
+    bucket = Column(Integer, nullable=False)
+    mention_id = Column(Integer, ForeignKey("mentions.id"), nullable=False)
+    
+    __table_args__ = (Index("ix_lsh_buckets_band_bucket", "band", "bucket"),)
+    
+    def __repr__(self):
+        return f"<LshBucket(band={self.band}, bucket={self.bucket}, mention_id={self.mention_id})>"
+
+class PipelineRun(Base):
+    __tablename__ = "pipeline_runs"
+    
+    id = Column(Integer, primary_key=True)
+    status = Column(String(20), nullable=False, default="running")  # running, completed, partial, abandoned
+    article_limit = Column(Integer, nullable=True)
+    started_at = Column(DateTime, default=datetime.now)
+    finished_at = Column(DateTime, nullable=True)
+    failed = Column(Text, nullable=True)  # JSON list of the companies a partial run did not store
+    
+    def __repr__(self):
+        return f"<PipelineRun(id={self.id}, status='{self.status}')>"
+
+class RunItem(Base):
+    __tablename__ = "run_items"
+    
+    id = Column(Integer, primary_key=True)
+    run_id = Column(Integer, ForeignKey("pipeline_runs.id"), nullable=False)
+    company_id = Column(Integer, ForeignKey("companies.id"), nullable=False)
+    key = Column(String(255), nullable=False)   # Article URL, or "" for the company itself
+    stage = Column(String(20), nullable=False)  # fetched, extracted, scored, stored
+    data = Column(Text, nullable=True)          # JSON payload needed to resume from this stage
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+    
+    # Idempotency key: recording a stage again replaces the previous record
+    __table_args__ = (UniqueConstraint("run_id", "company_id", "key", name="uq_run_items_key"),)
+    
+    def __repr__(self):
+        return f"<RunItem(run_id={self.run_id}, company_id={self.company_id}, key='{self.key}', stage='{self.stage}')>"
+
+class SentimentDetector(Base):
+    __tablename__ = "sentiment_detectors"
+    
+    company_id = Column(Integer, ForeignKey("companies.id"), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)        # Mentions seen
+    mean = Column(Float, nullable=False, default=0.0)         # EWMA of the sentiment score
+    variance = Column(Float, nullable=False, default=0.0)     # EW variance of the sentiment score
+    cusum_pos = Column(Float, nullable=False, default=0.0)    # CUSUM sums, see anomaly.py
+    cusum_neg = Column(Float, nullable=False, default=0.0)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+    
+    def __repr__(self):
+        return f"<SentimentDetector(company_id={self.company_id}, count={self.count}, mean={self.mean:.3f})>"
+
+class SentimentAnomaly(Base):
+    __tablename__ = "sentiment_anomalies"
+    
+    id = Column(Integer, primary_key=True)
+    company_id = Column(Integer, ForeignKey("companies.id"), nullable=False, index=True)
+    mention_id = Column(Integer, ForeignKey("mentions.id"), nullable=True)  # Mention that triggered it
+    kind = Column(String(10), nullable=False)       # spike, shift
+    direction = Column(String(10), nullable=False)  # up, down
+    score = Column(Float, nullable=False)           # The mention's sentiment score
+    mean = Column(Float, nullable=False)            # Running mean before the mention
+    zscore = Column(Float, nullable=False)
+    published_at = Column(DateTime, nullable=True)
+    detected_at = Column(DateTime, default=datetime.now)
+    
+    def __repr__(self):
+        return f"<SentimentAnomaly(company_id={self.company_id}, kind='{self.kind}', direction='{self.direction}')>"
+
 @log_function_call
 def init_db():
     """Initialize the database, creating all tables."""
     Base.metadata.create_all(bind=engine)
+    search_index.ensure_index(engine, archived_rows=_archived_index_rows)
     log_info("Database initialized successfully.")
 
 @log_function_call
@@ -122,61 +264,330 @@ def get_company_aliases(company_id):
         return []
     return [alias.strip() for alias in company.aliases.split(',') if alias.strip()]
 
+def get_all_company_aliases():
+    """Get the name and aliases of every company in one query.
+    
+    Returns:
+        List of (company_id, name, aliases) tuples
+    """
+    db = get_db()
+    return [
+        (company_id, name, [alias.strip() for alias in (aliases or '').split(',') if alias.strip()])
+        for company_id, name, aliases in db.query(Company.id, Company.name, Company.aliases).order_by(Company.id)
+    ]
+
 def add_mentions(company_id, mentions):
-    """Add mentions for a company."""
+    """Add mentions for a company.
+    
+    Args:
+        company_id: The company ID
+        mentions: MentionRecords; mentions whose URL is already stored update the stored row
+    
+    Returns:
+        (number of new mentions inserted, sentiment anomalies their scores
+        triggered as JSON-ready dicts like get_anomalies returns)
+    """
     db = get_db()
     count = 0
+    anomalies = []
     try:
         # Check if company exists
         company = db.query(Company).filter(Company.id == company_id).first()
         if not company:
             log_warning(f"Cannot add mentions: Company with ID {company_id} not found")
-            return 0
+            return 0, []
         
+        # Look up duplicates by URL for the whole batch at once
+        urls = {mention.url for mention in mentions}
+        existing = {
+            row.url: row for row in db.query(Mention).options(undefer(Mention.content)).filter(
+                Mention.company_id == company_id,
+                Mention.url.in_(urls)
+            )
+        } if urls else {}
+        # Archived bodies are still in the search index, so updates compare against them
+        archived = get_archived_contents([row.id for row in existing.values() if row.content is None], db)
+        
+        new_mentions = {}
+        reindexed = {}  # Mention ID -> (row, text as currently indexed)
+        restored = set()  # Archived mentions that get a fresh body
         for mention in mentions:
-            # Check for duplicate by URL
-            existing = db.query(Mention).filter(
+            row = existing.get(mention.url)
+            if row:
+                # Update existing mention (and its search index entry if the text changes)
+                current = row.content if row.content is not None else archived.get(row.id, '')
+                title = mention.title or row.title
+                content = mention.content if mention.content is not None else current
+                if title != row.title or content != current:
+                    reindexed.setdefault(row.id, (row, {"id": row.id, "title": row.title, "content": current}))
+                row.title = title
+                if mention.content is not None:
+                    row.content = mention.content
+                    if row.id in archived:
+                        restored.add(row.id)
+                if mention.sentiment is not None:
+                    row.sentiment = mention.sentiment
+                    row.sentiment_score = mention.sentiment_score
+                row.source = mention.source or row.source
+                if mention.published_at:
+                    row.published_at = mention.published_at
+            else:
+                # The same URL twice in one batch is stored once
+                new_mentions.setdefault(mention.url, mention)
+        
+        if restored:
+            db.query(MentionArchive).filter(MentionArchive.mention_id.in_(restored)).delete(synchronize_session=False)
+        
+        if reindexed:
+            search_index.unindex_rows(db, [indexed for _, indexed in reindexed.values()])
+            search_index.index_rows(db, [
+                {"id": row.id, "title": row.title,
+                 "content": row.content if row.content is not None else archived.get(row.id, '')}
+                for row, _ in reindexed.values()
+            ])
+        
+        if new_mentions:
+            # Insert new mentions without building ORM objects
+            values = {
+                url: {
+                    "company_id": company_id,
+                    "title": mention.title or 'No title',
+                    "content": mention.content or '',
+                    "sentiment": mention.sentiment or 'NEUTRAL',
+                    "sentiment_score": mention.sentiment_score,  # NULL, not 0.0, if it was never scored
+                    "url": mention.url,
+                    "source": mention.source or 'Unknown',
+                    "published_at": mention.published_at
+                }
+                for url, mention in new_mentions.items()
+            }
+            db.execute(insert(Mention), list(values.values()))
+            count = len(new_mentions)
+            
+            # Index the new mentions' text for search and their signatures for near-duplicate lookups
+            ids = dict(db.query(Mention.url, Mention.id).filter(
                 Mention.company_id == company_id,
-                Mention.url == mention.get('url', '')
-            ).first()
+                Mention.url.in_(list(new_mentions))
+            ))
+            indexed = []
+            for url, mention_id in ids.items():
+                mention = new_mentions[url]
+                indexed.append({"id": mention_id, "title": values[url]["title"], "content": values[url]["content"]})
+                if mention.signature:
+                    add_signature(db, mention_id, mention.signature, mention.cluster_key or url)
+            search_index.index_rows(db, indexed)
             
-            if existing:
-                # Update existing mention
-                existing.title = mention.get('title', existing.title)
-                existing.content = mention.get('content', existing.content)
-                existing.sentiment = mention.get('sentiment', existing.sentiment)
-                existing.sentiment_score = mention.get('sentiment_score', existing.sentiment_score)
-                existing.source = mention.get('source', existing.source)
-                if 'published_at' in mention and mention['published_at']:
-                    existing.published_at = mention['published_at']
-            else:
-                # Create new mention
-                new_mention = Mention(
-                    company_id=company_id,
-                    title=mention.get('title', 'No title'),
-                    content=mention.get('content', ''),
-                    sentiment=mention.get('sentiment', 'NEUTRAL'),
-                    sentiment_score=mention.get('sentiment_score', 0.0),
-                    url=mention.get('url', ''),
-                    source=mention.get('source', 'Unknown'),
-                    published_at=mention.get('published_at')
-                )
-                db.add(new_mention)
-                count += 1
+            # Syndicated copies repeat their story's score, so each story counts once per company
+            clusters = {url: mention.cluster_key or url for url, mention in new_mentions.items()}
+            counted = stored_clusters(db, company_id, set(clusters.values()), list(ids.values()))
+            scored = []
+            for url, mention in new_mentions.items():
+                # Unscored mentions (NULL score) are not an observation
+                if mention.sentiment_score is None or clusters[url] in counted:
+                    continue
+                counted.add(clusters[url])
+                scored.append((mention.published_at, ids[url], mention.sentiment_score))
+            
+            # Update the company's anomaly detector in the same transaction as the insert
+            urls_by_id = {mention_id: url for url, mention_id in ids.items()}
+            for event in update_detector(db, company_id, scored, list(ids.values())):
+                url = urls_by_id[event["mention_id"]]
+                anomalies.append(_anomaly_dict(event, values[url]["title"], url))
         
         db.commit()
         log_info(f"Added {count} new mentions for company ID {company_id}")
-        return count
+        return count, anomalies
     except Exception as e:
         db.rollback()
         log_error(f"Error adding mentions: {e}", exc_info=True)
-        return 0
+        return 0, []
+
+def update_detector(db, company_id, scored, new_ids):
+    """Feed new mentions to a company's sentiment anomaly detector (caller commits).
+    
+    The detector is updated once per mention, oldest first, and its events
+    are stored in sentiment_anomalies. A company without detector state yet
+    (new, or stored before anomaly detection existed) is first warmed up by
+    replaying its stored mentions once, without reporting events for them.
+    
+    Args:
+        db: Database session
+        company_id: The company ID
+        scored: (published_at, mention_id, sentiment_score) of the new mentions to count
+        new_ids: IDs of all mentions inserted with them (left out of the warm-up replay)
+    
+    Returns:
+        The anomalies detected, as dicts of SentimentAnomaly fields
+    """
+    row = db.query(SentimentDetector).filter(SentimentDetector.company_id == company_id).first()
+    if row:
+        state = anomaly.DetectorState(row.count, row.mean, row.variance, row.cusum_pos, row.cusum_neg)
+    else:
+        state = anomaly.DetectorState()
+        history = db.query(Mention.sentiment_score).outerjoin(
+            MentionSignature, MentionSignature.mention_id == Mention.id
+        ).filter(
+            Mention.company_id == company_id,
+            Mention.sentiment_score.isnot(None),
+            or_(MentionSignature.cluster_key.is_(None), MentionSignature.cluster_key == Mention.url)
+        )
+        if new_ids:
+            history = history.filter(Mention.id.notin_(new_ids))
+        for (score,) in history.order_by(Mention.published_at, Mention.id).yield_per(1000):
+            anomaly.update(state, score)
+        row = SentimentDetector(company_id=company_id)
+        db.add(row)
+    
+    # Undated mentions last
+    events = []
+    now = datetime.now()
+    for published_at, mention_id, score in sorted(scored, key=lambda item: (item[0] is None, item[0] or datetime.min, item[1])):
+        for event in anomaly.update(state, score):
+            events.append(dict(event, company_id=company_id, mention_id=mention_id, score=score,
+                               published_at=published_at, detected_at=now))
+    if events:
+        db.execute(insert(SentimentAnomaly), events)
+        log_warning(f"Detected {len(events)} sentiment anomalies for company ID {company_id}")
+    
+    row.count = state.count
+    row.mean = state.mean
+    row.variance = state.variance
+    row.cusum_pos = state.cusum_pos
+    row.cusum_neg = state.cusum_neg
+    return events
+
+def stored_clusters(db, company_id, keys, new_ids):
+    """Cluster keys among `keys` that a company's previously stored mentions already count for.
+    
+    Args:
+        db: Database session
+        company_id: The company ID
+        keys: Cluster keys (representative URLs) of new mentions
+        new_ids: IDs of the new mentions, which are not counted
+    
+    Returns:
+        Set of cluster keys
+    """
+    if not keys:
+        return set()
+    rows = db.query(MentionSignature.cluster_key, Mention.url).select_from(Mention).outerjoin(
+        MentionSignature, MentionSignature.mention_id == Mention.id
+    ).filter(
+        Mention.company_id == company_id,
+        Mention.id.notin_(new_ids),
+        or_(MentionSignature.cluster_key.in_(keys), Mention.url.in_(keys))
+    )
+    return {key for row in rows for key in row if key in keys}
+
+def _anomaly_dict(event, title, url):
+    """JSON-ready form of an anomaly (a dict of SentimentAnomaly fields) and its mention."""
+    return {
+        "company_id": event["company_id"],
+        "mention_id": event["mention_id"],
+        "kind": event["kind"],
+        "direction": event["direction"],
+        "score": event["score"],
+        "mean": event["mean"],
+        "zscore": event["zscore"],
+        "published_at": event["published_at"].isoformat() if event["published_at"] else None,
+        "detected_at": event["detected_at"].isoformat() if event["detected_at"] else None,
+        "title": title,
+        "url": url
+    }
+
+def get_anomalies(company_id=None, since=None, limit=None):
+    """Get detected sentiment anomalies, newest first.
+    
+    Args:
+        company_id: Optional company filter
+        since: Optional earliest detected_at (datetime)
+        limit: Optional maximum number of anomalies
+    
+    Returns:
+        List of JSON-ready dicts with the anomaly's fields (dates as ISO
+        strings) and the triggering mention's title and url
+    """
+    db = get_db()
+    query = db.query(SentimentAnomaly, Mention.title, Mention.url).outerjoin(
+        Mention, Mention.id == SentimentAnomaly.mention_id
+    )
+    if company_id is not None:
+        query = query.filter(SentimentAnomaly.company_id == company_id)
+    if since is not None:
+        query = query.filter(SentimentAnomaly.detected_at >= since)
+    query = query.order_by(SentimentAnomaly.detected_at.desc(), SentimentAnomaly.id.desc())
+    if limit:
+        query = query.limit(limit)
+    
+    columns = [column.name for column in SentimentAnomaly.__table__.columns]
+    return [
+        _anomaly_dict({name: getattr(event, name) for name in columns}, title, url)
+        for event, title, url in query
+    ]
+
+def add_signature(db, mention_id, signature, cluster_key):
+    """Store a mention's MinHash signature and its LSH buckets (caller commits)."""
+    db.execute(insert(MentionSignature), [
+        {"mention_id": mention_id, "cluster_key": cluster_key, "signature": pack_signature(signature)}
+    ])
+    db.execute(insert(LshBucket), [
+        {"band": band, "bucket": bucket, "mention_id": mention_id}
+        for band, bucket in enumerate(band_hashes(signature))
+    ])
+
+def find_near_duplicate(signature, bands, company_id):
+    """Find a stored, scored mention of a company whose text is a near-duplicate of a signature.
+    
+    Only the company's own mentions are candidates: sentiment is scored per
+    company, so another company's copy of the story has a different score.
+    
+    Args:
+        signature: MinHash signature of the new text
+        bands: Its LSH band buckets
+        company_id: The company the new mention belongs to
+    
+    Returns:
+        Dict with cluster_key, sentiment and sentiment_score of the closest match, or None
+    """
+    db = get_db()
+    conditions = [and_(LshBucket.band == band, LshBucket.bucket == bucket) for band, bucket in enumerate(bands)]
+    candidate_ids = [row.mention_id for row in db.query(LshBucket.mention_id).join(
+        Mention, Mention.id == LshBucket.mention_id
+    ).filter(Mention.company_id == company_id, or_(*conditions)).distinct()]
+    if not candidate_ids:
+        return None
+    
+    best, best_similarity = None, DEDUP_THRESHOLD
+    candidates = db.query(MentionSignature, Mention).join(
+        Mention, Mention.id == MentionSignature.mention_id
+    ).filter(MentionSignature.mention_id.in_(candidate_ids), Mention.company_id == company_id).all()
+    for stored, mention in candidates:
+        if not mention.sentiment:
+            continue
+        score = similarity(signature, unpack_signature(stored.signature))
+        if score >= best_similarity:
+            best, best_similarity = (stored, mention), score
+    
+    if best is None:
+        return None
+    stored, mention = best
+    return {
+        "cluster_key": stored.cluster_key,
+        "sentiment": mention.sentiment,
+        "sentiment_score": mention.sentiment_score
+    }
 
 @log_function_call
 def get_mentions(company_id, sentiment=None):
-    """Get mentions for a company."""
+    """Get mentions for a company.
+    
+    Archived bodies are loaded in the same query; read the text with
+    Mention.full_content (content is None once a body is archived).
+    """
     db = get_db()
-    query = db.query(Mention).filter(Mention.company_id == company_id)
+    query = db.query(Mention, MentionArchive.codec, MentionArchive.body).options(undefer(Mention.content)).outerjoin(
+        MentionArchive, MentionArchive.mention_id == Mention.id
+    ).filter(Mention.company_id == company_id)
     
     if sentiment:
         query = query.filter(Mention.sentiment == sentiment.upper())
@@ -184,36 +595,114 @@ def get_mentions(company_id, sentiment=None):
     # Order by published date (newest first)
     query = query.order_by(Mention.published_at.desc())
     
-    mentions = query.all()
+    mentions = []
+    for mention, codec, body in query:
+        if mention.content is None and body is not None:
+            mention._archived_content = decompress(body, codec)
+        mentions.append(mention)
     log_info(f"Retrieved {len(mentions)} mentions for company ID {company_id}")
     return mentions
 
+def search_mentions(query, company_id=None, since=None, until=None, limit=20):
+    """Full-text search over mention titles and content, best matches first.
+    
+    Args:
+        query: Words to search for ("quoted phrase", prefix*)
+        company_id: Optional company filter
+        since: Optional earliest published date
+        until: Optional latest published date
+        limit: Maximum number of results
+        
+    Returns:
+        List of result dicts (see search_index.search)
+    """
+    db = get_db()
+    results = search_index.search(db, query, company_id=company_id, since=since, until=until, limit=limit,
+                                  load_archived=get_archived_contents)
+    log_info(f"Search for '{query}' returned {len(results)} mentions")
+    return results
+
+# Order of exported mention pages (newest first); the search export follows it too
+MENTION_PAGE_ORDER = (Mention.published_at.desc(), Mention.id.desc())
+
+def iter_mention_pages(company_id, page_size):
+    """Yield a company's mentions, newest first, in lists of page_size rows.
+
+    Rows carry only the columns shown in the dashboard table (no content), and
+    are streamed from the database instead of loaded all at once.
+
+    Args:
+        company_id: The company ID
+        page_size: Rows per yielded list
+    """
+    db = get_db()
+    query = db.query(
+        Mention.published_at, Mention.title, Mention.source,
+        Mention.sentiment, Mention.sentiment_score, Mention.url
+    ).filter(Mention.company_id == company_id).order_by(*MENTION_PAGE_ORDER)
+
+    page = []
+    for row in query.yield_per(page_size):
+        page.append(row)
+        if len(page) == page_size:
+            yield page
+            page = []
+    if page:
+        yield page
+
+def iter_mention_texts(company_id, batch_size=500):
+    """Yield (title, content) of a company's mentions in exported page order (archived bodies included)."""
+    db = get_db()
+    query = db.query(Mention.title, Mention.content, MentionArchive.codec, MentionArchive.body).outerjoin(
+        MentionArchive, MentionArchive.mention_id == Mention.id
+    ).filter(Mention.company_id == company_id).order_by(*MENTION_PAGE_ORDER)
+    for title, content, codec, body in query.yield_per(batch_size):
+        if content is None and body is not None:
+            content = decompress(body, codec)
+        yield title, content
+
 @log_function_call
 def get_sentiment_stats(company_id):
-    """Get sentiment statistics for a company."""
+    """Get sentiment statistics for a company.
+    
+    Syndicated copies of a story (same near-duplicate cluster) count once;
+    the number of copies left out is reported as DUPLICATES.
+    """
     db = get_db()
-    mentions = db.query(Mention).filter(Mention.company_id == company_id).all()
+    # Only the columns needed here, not full mention objects with their content
+    rows = db.query(Mention.sentiment, Mention.sentiment_score, MentionSignature.cluster_key).outerjoin(
+        MentionSignature, MentionSignature.mention_id == Mention.id
+    ).filter(Mention.company_id == company_id).all()
     
     stats = {
         "POSITIVE": 0,
         "NEGATIVE": 0,
         "NEUTRAL": 0,
-        "TOTAL": len(mentions),
+        "TOTAL": 0,
+        "DUPLICATES": 0,
         "AVG_SCORE": 0.0
     }
     
     total_score = 0.0
     score_count = 0
+    seen_clusters = set()
     
-    for mention in mentions:
-        if mention.sentiment in stats:
-            stats[mention.sentiment] += 1
+    for sentiment, sentiment_score, cluster_key in rows:
+        if cluster_key:
+            if cluster_key in seen_clusters:
+                stats["DUPLICATES"] += 1
+                continue
+            seen_clusters.add(cluster_key)
+        stats["TOTAL"] += 1
+        
+        if sentiment in stats:
+            stats[sentiment] += 1
         else:
             stats["NEUTRAL"] += 1
             
         # Track score for average calculation
-        if mention.sentiment_score is not None:
-            total_score += mention.sentiment_score
+        if sentiment_score is not None:
+            total_score += sentiment_score
             score_count += 1
     
     # Calculate average sentiment score
@@ -232,10 +721,13 @@ def get_sentiment_timeline_data(company_id, days=None):
         days: Optional number of days to limit results
         
     Returns:
-        List of mentions with date and sentiment information
+        List of rows with published_at, sentiment_score and sentiment
     """
     db = get_db()
-    query = db.query(Mention).filter(Mention.company_id == company_id)
+    # Only the timeline columns, not full mention objects with their content
+    query = db.query(Mention.published_at, Mention.sentiment_score, Mention.sentiment).filter(
+        Mention.company_id == company_id
+    )
     
     if days:
         cutoff_date = datetime.now() - timedelta(days=days)
@@ -246,6 +738,322 @@ def get_sentiment_timeline_data(company_id, days=None):
     
     return mentions
 
+def get_archived_contents(mention_ids, db=None):
+    """Decompress archived bodies.
+    
+    Args:
+        mention_ids: IDs of mentions whose body may be archived
+        db: Optional session to use
+        
+    Returns:
+        Dict of mention ID -> article text, for the mentions that are archived
+    """
+    if not mention_ids:
+        return {}
+    db = db or get_db()
+    rows = db.query(MentionArchive.mention_id, MentionArchive.codec, MentionArchive.body).filter(
+        MentionArchive.mention_id.in_(list(mention_ids))
+    )
+    return {mention_id: decompress(body, codec) for mention_id, codec, body in rows}
+
+def _archived_index_rows(connection):
+    """Search index rows (id, title, content) of the archived mentions, bodies decompressed."""
+    rows = connection.execute(
+        select(Mention.id, Mention.title, MentionArchive.codec, MentionArchive.body).join(
+            MentionArchive, MentionArchive.mention_id == Mention.id
+        ).where(Mention.content.is_(None))
+    ).all()
+    for mention_id, title, codec, body in rows:
+        yield {"id": mention_id, "title": title, "content": decompress(body, codec)}
+
+def archive_old_mentions(older_than_days=ARCHIVE_AFTER_DAYS, batch_size=500):
+    """Move the bodies of old mentions into the compressed mention_archive table.
+    
+    The mentions keep their metadata (and their search index entries); only
+    content is set to NULL.
+    
+    Args:
+        older_than_days: Archive mentions published (or stored) before this many days ago; 0 disables
+        batch_size: Mentions archived per transaction
+        
+    Returns:
+        Number of mentions archived
+    """
+    if older_than_days <= 0:
+        return 0
+    cutoff = datetime.now() - timedelta(days=older_than_days)
+    db = get_db()
+    archived = raw_bytes = stored_bytes = 0
+    try:
+        while True:
+            rows = db.query(Mention.id, Mention.content).filter(
+                Mention.content.isnot(None),
+                Mention.content != '',
+                or_(Mention.published_at < cutoff, and_(Mention.published_at.is_(None), Mention.created_at < cutoff))
+            ).limit(batch_size).all()
+            if not rows:
+                break
+            
+            now = datetime.now()
+            entries = []
+            for mention_id, content in rows:
+                body = compress(content)
+                size = len(content.encode("utf-8"))
+                entries.append({"mention_id": mention_id, "codec": ARCHIVE_CODEC, "body": body, "archived_at": now,
+                                "freed_bytes": max(size - len(body), 0)})
+                raw_bytes += size
+                stored_bytes += len(body)
+            _upsert(db, MentionArchive, ["mention_id"], entries, ["codec", "body", "archived_at", "freed_bytes"])
+            db.query(Mention).filter(Mention.id.in_([row.id for row in rows])).update(
+                {"content": None}, synchronize_session=False
+            )
+            db.commit()
+            archived += len(rows)
+    except Exception as e:
+        db.rollback()
+        log_error(f"Error archiving mention bodies: {e}", exc_info=True)
+    
+    if archived:
+        log_info(f"Archived {archived} mention bodies older than {older_than_days} days "
+                 f"({raw_bytes / 1024:.0f} KB -> {stored_bytes / 1024:.0f} KB)")
+    return archived
+
+def compact_database(force_vacuum=False):
+    """Refresh planner statistics and reclaim free space in the SQLite file.
+    
+    Runs ANALYZE and merges the search index segments every time; VACUUM
+    (which rewrites the whole file) only runs once VACUUM_FREE_RATIO of the
+    file is reclaimable, or when forced. Reclaimable space is the free pages
+    plus the bytes archive_old_mentions freed since the last VACUUM: those
+    mostly stay inside partly filled pages, which the freelist does not
+    count. (Unused bytes per page, as dbstat reports them, are not used:
+    every B-tree page keeps some slack, even right after a VACUUM.)
+    
+    Returns:
+        True if the database was vacuumed
+    """
+    if engine.dialect.name != "sqlite":
+        return False
+    # VACUUM cannot run while this process holds an open transaction
+    db_session.remove()
+    vacuumed = False
+    with engine.connect() as connection:
+        connection = connection.execution_options(isolation_level="AUTOCOMMIT")
+        connection.exec_driver_sql("ANALYZE")
+        search_index.optimize(connection)
+        page_size = connection.exec_driver_sql("PRAGMA page_size").scalar() or 0
+        total = (connection.exec_driver_sql("PRAGMA page_count").scalar() or 0) * page_size
+        reclaimable = (connection.exec_driver_sql("PRAGMA freelist_count").scalar() or 0) * page_size
+        reclaimable += connection.exec_driver_sql("SELECT sum(freed_bytes) FROM mention_archive").scalar() or 0
+        if force_vacuum or (total and reclaimable / total >= VACUUM_FREE_RATIO):
+            connection.exec_driver_sql("VACUUM")
+            connection.exec_driver_sql("UPDATE mention_archive SET freed_bytes = 0 WHERE freed_bytes > 0")
+            vacuumed = True
+            log_info(f"Vacuumed database ({reclaimable / 1024:.0f} of {total / 1024:.0f} KB were reclaimable)")
+    return vacuumed
+
+def get_watermark(company_id):
+    """Get the fetch watermark for a company (None if it was never fetched)."""
+    db = get_db()
+    return db.query(FetchWatermark).filter(FetchWatermark.company_id == company_id).first()
+
+def update_watermark(company_id, mentions, run_at=None):
+    """Advance a company's watermark after a successful fetch.
+    
+    Args:
+        company_id: The company ID
+        mentions: MentionRecords fetched in this run
+        run_at: Time of the successful run (default: now)
+    """
+    db = get_db()
+    try:
+        watermark = db.query(FetchWatermark).filter(FetchWatermark.company_id == company_id).first()
+        if not watermark:
+            watermark = FetchWatermark(company_id=company_id)
+            db.add(watermark)
+        
+        published = [m.published_at for m in mentions if m.published_at]
+        if published:
+            latest = max(published)
+            if not watermark.latest_published_at or latest > watermark.latest_published_at:
+                watermark.latest_published_at = latest
+        watermark.last_success_at = run_at or datetime.now()
+        
+        db.commit()
+        return watermark
+    except Exception as e:
+        db.rollback()
+        log_error(f"Error updating watermark for company ID {company_id}: {e}", exc_info=True)
+        return None
+
+def get_recent_urls(company_id, since):
+    """Get URLs of a company's mentions published at or after `since`, stored or dropped as irrelevant."""
+    db = get_db()
+    rows = db.query(Mention.url).filter(
+        Mention.company_id == company_id,
+        Mention.published_at >= since
+    ).all()
+    dropped = db.query(DroppedUrl.url).filter(
+        DroppedUrl.company_id == company_id,
+        DroppedUrl.published_at >= since
+    ).all()
+    return {row.url for row in rows} | {row.url for row in dropped}
+
+def add_dropped_urls(company_id, mentions):
+    """Remember fetched mentions the relevance filter dropped, so they are not fetched again.
+    
+    Args:
+        company_id: The company ID
+        mentions: The dropped MentionRecords
+    """
+    if not mentions:
+        return
+    db = get_db()
+    now = datetime.now()
+    try:
+        rows = {mention.url: {"company_id": company_id, "url": mention.url, "published_at": mention.published_at,
+                              "dropped_at": now} for mention in mentions}
+        _upsert(db, DroppedUrl, ["company_id", "url"], list(rows.values()), ["published_at", "dropped_at"])
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        log_error(f"Error saving dropped URLs for company ID {company_id}: {e}", exc_info=True)
+
+def prune_dropped_urls(older_than_days=DROPPED_URLS_KEEP_DAYS):
+    """Forget dropped URLs that are too old to be fetched again (see add_dropped_urls).
+    
+    Returns:
+        Number of URLs removed
+    """
+    db = get_db()
+    cutoff = datetime.now() - timedelta(days=older_than_days)
+    try:
+        removed = db.query(DroppedUrl).filter(DroppedUrl.dropped_at < cutoff).delete(synchronize_session=False)
+        db.commit()
+        return removed
+    except Exception as e:
+        db.rollback()
+        log_error(f"Error pruning dropped URLs: {e}", exc_info=True)
+        return 0
+
+def start_run(article_limit=None):
+    """Open a new pipeline run, abandoning any unfinished one.
+    
+    Returns:
+        The new PipelineRun
+    """
+    db = get_db()
+    try:
+        unfinished = [run.id for run in db.query(PipelineRun.id).filter(PipelineRun.status == "running")]
+        if unfinished:
+            db.query(RunItem).filter(RunItem.run_id.in_(unfinished)).delete(synchronize_session=False)
+            db.query(PipelineRun).filter(PipelineRun.id.in_(unfinished)).update(
+                {"status": "abandoned", "finished_at": datetime.now()}, synchronize_session=False
+            )
+            log_info(f"Abandoned unfinished pipeline runs {unfinished}")
+        run = PipelineRun(status="running", article_limit=article_limit)
+        db.add(run)
+        db.commit()
+        return run
+    except Exception as e:
+        db.rollback()
+        log_error(f"Error starting pipeline run: {e}", exc_info=True)
+        raise
+
+def get_unfinished_run():
+    """Get the latest pipeline run that did not complete (None if there is none)."""
+    db = get_db()
+    return db.query(PipelineRun).filter(PipelineRun.status == "running").order_by(PipelineRun.id.desc()).first()
+
+def get_run_items(run_id):
+    """Get the journal of a pipeline run as (company_id, key, stage, data) rows."""
+    db = get_db()
+    return db.query(RunItem.company_id, RunItem.key, RunItem.stage, RunItem.data).filter(
+        RunItem.run_id == run_id
+    ).order_by(RunItem.id).all()
+
+def _upsert(db, model, keys, rows, columns):
+    """Insert rows, overwriting `columns` of existing rows with the same `keys`.
+    
+    SQLite gets a single INSERT ... ON CONFLICT DO UPDATE; other databases
+    delete the conflicting rows and insert again in the same transaction.
+    """
+    if db.get_bind().dialect.name == "sqlite":
+        statement = sqlite_insert(model)
+        db.execute(statement.on_conflict_do_update(
+            index_elements=keys,
+            set_={column: statement.excluded[column] for column in columns}
+        ), rows)
+        return
+    for row in rows:
+        db.query(model).filter(*[getattr(model, key) == row[key] for key in keys]).delete(synchronize_session=False)
+    db.execute(insert(model), rows)
+
+def save_run_items(run_id, company_id, items):
+    """Record stage completions of a pipeline run.
+    
+    Args:
+        run_id: The pipeline run ID
+        company_id: The company ID
+        items: (key, stage, data) tuples; a key recorded before is overwritten
+        
+    Returns:
+        True if the records were saved
+    """
+    if not items:
+        return True
+    db = get_db()
+    now = datetime.now()
+    try:
+        _upsert(db, RunItem, ["run_id", "company_id", "key"], [
+            {"run_id": run_id, "company_id": company_id, "key": key, "stage": stage, "data": data, "updated_at": now}
+            for key, stage, data in items
+        ], ["stage", "data", "updated_at"])
+        db.commit()
+        return True
+    except Exception as e:
+        db.rollback()
+        log_error(f"Error saving run journal for company ID {company_id}: {e}", exc_info=True)
+        return False
+
+def mark_run_items(run_id, company_id, stage):
+    """Move all of a company's journal records in a run to `stage`.
+    
+    Returns:
+        True if the records were updated
+    """
+    db = get_db()
+    try:
+        db.query(RunItem).filter(RunItem.run_id == run_id, RunItem.company_id == company_id).update(
+            {"stage": stage, "updated_at": datetime.now()}, synchronize_session=False
+        )
+        db.commit()
+        return True
+    except Exception as e:
+        db.rollback()
+        log_error(f"Error updating run journal for company ID {company_id}: {e}", exc_info=True)
+        return False
+
+def finish_run(run_id, status="completed", failed=None):
+    """Close a pipeline run and drop its journal records.
+    
+    Args:
+        run_id: The pipeline run ID
+        status: completed, or partial if some companies were not stored
+        failed: Optional names of the companies that were not stored
+    """
+    db = get_db()
+    try:
+        db.query(RunItem).filter(RunItem.run_id == run_id).delete(synchronize_session=False)
+        db.query(PipelineRun).filter(PipelineRun.id == run_id).update(
+            {"status": status, "finished_at": datetime.now(), "failed": json.dumps(failed) if failed else None},
+            synchronize_session=False
+        )
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        log_error(f"Error finishing pipeline run {run_id}: {e}", exc_info=True)
+
 if __name__ == "__main__":
     # Initialize database when run directly
     init_db()
\ No newline at end of file
@@ -0,0 +1,154 @@
+"""
+Near-duplicate detection for syndicated articles.
+MinHash signatures with LSH bands find copies of a story, so only one copy is scored.
+"""
+
+import os
+import random
+from array import array
+import re
+import struct
+import zlib
+
+import metrics
+
+# Set DEDUP_ENABLED=0 to score every mention separately
+DEDUP_ENABLED = os.getenv("DEDUP_ENABLED", "1") != "0"
+
+# Estimated Jaccard similarity at which two texts count as the same story
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.7"))
+
+# Texts shorter than this (e.g. NewsAPI snippets used as fallback) are not clustered
+DEDUP_MIN_WORDS = int(os.getenv("DEDUP_MIN_WORDS", "40"))
+
+# Signature layout: BANDS bands of ROWS hashes each
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+
+# Words per shingle
+SHINGLE_SIZE = 5
+
+_PRIME = (1 << 61) - 1
+_MASK = 0xFFFFFFFF
+
+# Fixed seed: signatures stored in the database must stay comparable across runs
+_rng = random.Random(20240601)
+PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+
+WORD_RE = re.compile(r"\w+")
+
+def shingle_hashes(text):
+    """32-bit hashes of the text's word shingles (empty if the text is too short)."""
+    words = WORD_RE.findall(text.lower())
+    if len(words) < max(DEDUP_MIN_WORDS, SHINGLE_SIZE):
+        return set()
+    return {
+        zlib.crc32(" ".join(words[i:i + SHINGLE_SIZE]).encode("utf-8"))
+        for i in range(len(words) - SHINGLE_SIZE + 1)
+    }
+
+def minhash(text):
+    """MinHash signature (array of NUM_PERM 32-bit ints) of a text, or None if it is too short."""
+    hashes = shingle_hashes(text or "")
+    if not hashes:
+        return None
+    return array("I", [min(((a * h + b) % _PRIME) & _MASK for h in hashes) for a, b in PERMUTATIONS])
+
+def band_hashes(signature):
+    """Bucket of each LSH band of a signature."""
+    return [
+        zlib.crc32(pack_signature(signature[band * ROWS:(band + 1) * ROWS]))
+        for band in range(BANDS)
+    ]
+
+def similarity(signature, other):
+    """Estimated Jaccard similarity of two signatures."""
+    return sum(1 for a, b in zip(signature, other) if a == b) / len(signature)
+
+def pack_signature(signature):
+    return struct.pack(f"<{len(signature)}I", *signature)
+
+def unpack_signature(blob):
+    return array("I", struct.unpack(f"<{len(blob) // 4}I", blob))
+
+def cluster_mentions(mentions, find_existing=None, company_id=None):
+    """Group near-duplicate mentions so each story is scored only once.
+
+    Copies of a story scored in an earlier run take over its sentiment right
+    away; the others get it from propagate_sentiment().
+
+    Args:
+        mentions: MentionRecords with extracted content, all of one company
+        find_existing: Optional callable(signature, bands, company_id) returning
+            a stored match of that company as a dict with cluster_key,
+            sentiment and sentiment_score
+        company_id: The company the mentions belong to
+
+    Returns:
+        Tuple of (mentions that need sentiment analysis, duplicates)
+    """
+    if not DEDUP_ENABLED:
+        return list(mentions), []
+
+    to_score, duplicates = [], []
+    buckets = {}  # (band, bucket) -> representatives in this batch
+    for mention in mentions:
+        signature = minhash(mention.content)
+        if signature is None:
+            to_score.append(mention)
+            continue
+        mention.signature = signature
+        bands = band_hashes(signature)
+
+        # Copy of a story already stored and scored
+        match = find_existing(signature, bands, company_id) if find_existing else None
+        if match:
+            mention.cluster_key = match['cluster_key']
+            mention.set_sentiment(match['sentiment'], match['sentiment_score'])
+            duplicates.append(mention)
+            metrics.increment("near_duplicates_stored")
+            continue
+
+        # Copy of another mention in this batch
+        best, best_similarity = None, DEDUP_THRESHOLD
+        for key in enumerate(bands):
+            for candidate in buckets.get(key, ()):
+                score = similarity(signature, candidate.signature)
+                if score >= best_similarity:
+                    best, best_similarity = candidate, score
+        if best is not None:
+            mention.cluster_key = best.cluster_key
+            duplicates.append(mention)
+            metrics.increment("near_duplicates_batch")
+            continue
+
+        # New story: this mention represents its cluster
+        mention.cluster_key = mention.url
+        for key in enumerate(bands):
+            buckets.setdefault(key, []).append(mention)
+        to_score.append(mention)
+
+    return to_score, duplicates
+
+def propagate_sentiment(scored, duplicates):
+    """Copy the representatives' sentiment to their in-batch duplicates.
+
+    Args:
+        scored: Representatives after sentiment analysis
+        duplicates: Second element returned by cluster_mentions()
+
+    Returns:
+        The duplicates, all carrying a sentiment (with no score if their
+        representative was not scored)
+    """
+    by_key = {mention.cluster_key: mention for mention in scored if mention.cluster_key}
+    for mention in duplicates:
+        if mention.sentiment is not None:
+            continue
+        representative = by_key.get(mention.cluster_key)
+        if representative is None:
+            mention.set_sentiment('NEUTRAL', None)
+        else:
+            mention.set_sentiment(representative.sentiment, representative.sentiment_score)
+    return duplicates
@@ -0,0 +1,257 @@
+"""
+Main-content extraction for scraped article pages.
+Pages are fed incrementally to lxml's pull parser, skipping boilerplate blocks.
+"""
+
+import atexit
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from lxml import etree
+
+import metrics
+from logger import log_warning
+
+# Maximum characters of text to collect (matches api_client.MAX_CONTENT_LENGTH)
+DEFAULT_MAX_CHARS = 3000
+
+# Bytes fed to the parser per step
+CHUNK_SIZE = 16 * 1024
+
+# Parallel parsing: worker processes (0 = one per core) and the minimum batch
+# size worth shipping to the pool
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", "0")) or (os.cpu_count() or 1)
+PARSE_POOL_MIN_PAGES = int(os.getenv("PARSE_POOL_MIN_PAGES", "8"))
+
+# Elements whose whole subtree is ignored
+SKIP_TAGS = {
+    "script", "style", "noscript", "template", "svg", "nav", "header", "footer",
+    "aside", "form", "button", "select", "iframe", "figure"
+}
+
+# Elements whose text is collected as a block
+BLOCK_TAGS = {"p", "h1", "h2", "h3", "h4", "h5", "h6", "li", "blockquote", "pre", "dd", "td"}
+
+# class/id hints for boilerplate and for main content containers
+NEGATIVE_HINTS = re.compile(
+    r"comment|meta|footer|footnote|foot|masthead|menu|nav|navbar|sidebar|sponsor|"
+    r"share|social|promo|related|advert|\bad\b|ads|banner|cookie|popup|newsletter|subscribe|breadcrumb",
+    re.IGNORECASE
+)
+POSITIVE_HINTS = re.compile(r"article|body|content|entry|main|post|story|text", re.IGNORECASE)
+
+# Blocks shorter than this (after whitespace normalisation) are ignored
+MIN_BLOCK_CHARS = 25
+
+# Blocks where more than this fraction of the text is link text are ignored
+MAX_LINK_DENSITY = 0.5
+
+# Below this much main-content text, fall back to all non-boilerplate text
+MIN_MAIN_CHARS = 200
+
+def _hints(element):
+    return f"{element.get('class', '')} {element.get('id', '')}".strip()
+
+def _is_boilerplate(element):
+    tag = element.tag if isinstance(element.tag, str) else ""
+    if tag in SKIP_TAGS:
+        return True
+    if element.get("role") in ("navigation", "banner", "contentinfo", "complementary"):
+        return True
+    hints = _hints(element)
+    return bool(hints) and bool(NEGATIVE_HINTS.search(hints)) and not POSITIVE_HINTS.search(hints)
+
+def _is_main_container(element):
+    if element.tag in ("article", "main"):
+        return True
+    if element.get("itemprop") == "articleBody" or element.get("role") == "main":
+        return True
+    hints = _hints(element)
+    return bool(hints) and bool(POSITIVE_HINTS.search(hints)) and not NEGATIVE_HINTS.search(hints)
+
+def _block_text(element):
+    text = " ".join(" ".join(element.itertext()).split())
+    if len(text) < MIN_BLOCK_CHARS:
+        return ""
+    link_chars = sum(len(" ".join(" ".join(link.itertext()).split())) for link in element.iter("a"))
+    if link_chars > MAX_LINK_DENSITY * len(text):
+        return ""
+    return text
+
+class _BlockCollector:
+    """Consumes pull-parser events and collects main-content text blocks."""
+
+    def __init__(self):
+        self.skip_depth = 0
+        self.main_depth = 0
+        self.main_blocks, self.other_blocks = [], []
+        self.main_chars = self.other_chars = 0
+        # Elements that opened a skipped or main region, so their end event can close it
+        self.skipped, self.mains = set(), set()
+
+    def handle(self, events, max_chars):
+        """Process events; returns True once enough text has been collected."""
+        for event, element in events:
+            if not isinstance(element.tag, str):
+                continue
+
+            if event == "start":
+                if self.skip_depth or _is_boilerplate(element):
+                    self.skip_depth += 1
+                    self.skipped.add(element)
+                elif _is_main_container(element):
+                    self.main_depth += 1
+                    self.mains.add(element)
+                continue
+
+            # End event
+            if element in self.skipped:
+                self.skipped.discard(element)
+                self.skip_depth -= 1
+                element.clear(keep_tail=True)
+                continue
+
+            if element.tag in BLOCK_TAGS and not self.skip_depth:
+                text = _block_text(element)
+                if text:
+                    if self.main_depth:
+                        self.main_blocks.append(text)
+                        self.main_chars += len(text) + 1
+                    else:
+                        self.other_blocks.append(text)
+                        self.other_chars += len(text) + 1
+                # Free the subtree; nested blocks have already been collected
+                element.clear(keep_tail=True)
+                if text and self.has_enough(max_chars):
+                    return True
+
+            if element in self.mains:
+                self.mains.discard(element)
+                self.main_depth -= 1
+
+        return False
+
+    def has_enough(self, max_chars):
+        return self.main_chars >= max_chars or (not self.main_blocks and self.other_chars >= max_chars * 3)
+
+def extract_main_text(html, max_chars=DEFAULT_MAX_CHARS, encoding=None):
+    """Extract the main article text from an HTML page.
+
+    Args:
+        html: Page content as bytes (or str)
+        max_chars: Stop parsing once this many characters of main text are collected
+        encoding: Optional character encoding declared by the server
+
+    Returns:
+        Whitespace-normalised main text (may slightly exceed max_chars by one block)
+    """
+    if not html:
+        return ""
+    if isinstance(html, str):
+        html = html.encode("utf-8")
+        encoding = "utf-8"
+
+    parser = etree.HTMLPullParser(events=("start", "end"), encoding=encoding, recover=True)
+    collector = _BlockCollector()
+    view = memoryview(html)
+
+    for offset in range(0, len(view), CHUNK_SIZE):
+        parser.feed(bytes(view[offset:offset + CHUNK_SIZE]))
+        if collector.handle(parser.read_events(), max_chars):
+            break
+    else:
+        try:
+            parser.close()
+        except etree.XMLSyntaxError:
+            pass
+        collector.handle(parser.read_events(), max_chars)
+
+    if collector.main_chars >= MIN_MAIN_CHARS:
+        return " ".join(collector.main_blocks)
+    if collector.main_blocks or collector.other_blocks:
+        return " ".join(collector.main_blocks + collector.other_blocks)
+
+    # No usable blocks (e.g. text directly in <div>s): take all non-boilerplate text
+    return _fallback_text(html, encoding, max_chars)
+
+def _fallback_text(html, encoding, max_chars):
+    from lxml import html as lxml_html
+
+    try:
+        parser = lxml_html.HTMLParser(encoding=encoding, recover=True)
+        root = lxml_html.document_fromstring(html, parser=parser)
+    except (etree.ParserError, ValueError):
+        return ""
+
+    for element in list(root.iter()):
+        if isinstance(element.tag, str) and element.tag in SKIP_TAGS and element.getparent() is not None:
+            element.drop_tree()
+
+    text = " ".join(" ".join(root.itertext()).split())
+    return text[:max_chars * 3]
+
+def _extract_timed(job):
+    """Worker entry point: extract one page and report how long it took.
+
+    Returns:
+        (text, seconds, error): error describes a parser failure (text is then
+        ""), so the parent process can log and count it
+    """
+    html, encoding, max_chars = job
+    start = time.perf_counter()
+    error = None
+    try:
+        text = extract_main_text(html, max_chars=max_chars, encoding=encoding)
+    except Exception as e:
+        text = ""
+        error = f"{type(e).__name__}: {e}"
+    return text, time.perf_counter() - start, error
+
+_pool = None
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=PARSE_WORKERS)
+        atexit.register(_pool.shutdown)
+    return _pool
+
+def extract_many(pages, max_chars=DEFAULT_MAX_CHARS, urls=None):
+    """Extract main text from many downloaded pages, in parallel when worthwhile.
+
+    Pages that fail to parse yield "" and are logged and counted as
+    extraction_errors.
+
+    Args:
+        pages: List of (html_bytes, encoding) tuples; None entries yield ""
+        max_chars: Characters of main text to collect per page
+        urls: Optional URLs of the pages, for the log
+
+    Returns:
+        List of extracted texts in the same order as pages
+    """
+    jobs = [(page[0], page[1], max_chars) for page in pages if page and page[0]]
+
+    if PARSE_WORKERS > 1 and len(jobs) >= PARSE_POOL_MIN_PAGES:
+        # Raw response bytes are sent as-is (no decoding in the parent); chunking
+        # amortises the inter-process round trips over several pages
+        chunksize = max(1, len(jobs) // (PARSE_WORKERS * 4))
+        results = list(_get_pool().map(_extract_timed, jobs, chunksize=chunksize))
+    else:
+        results = [_extract_timed(job) for job in jobs]
+
+    texts = iter(results)
+    extracted = []
+    for i, page in enumerate(pages):
+        if page and page[0]:
+            text, seconds, error = next(texts)
+            metrics.observe("article_parse", seconds)
+            if error:
+                metrics.increment("extraction_errors")
+                log_warning(f"Could not extract article text from {urls[i] if urls else f'page {i}'}: {error}")
+            extracted.append(text)
+        else:
+            extracted.append("")
+    return extracted
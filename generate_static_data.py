@@ -1,7 +1,12 @@
+import argparse
+import glob
 import json
 import os
+import posixpath
+import shutil
+import tempfile
 from datetime import datetime
-from db import get_companies, get_company, get_mentions, get_sentiment_stats, get_sentiment_timeline_data, init_db
+from db import get_anomalies, get_companies, get_company, get_sentiment_stats, get_sentiment_timeline_data, init_db, iter_mention_pages, iter_mention_texts
 import traceback
 from logger import get_logger, log_info, log_error
 
@@ -12,14 +17,79 @@ logger = get_logger()
 data_dir = os.path.join(os.path.dirname(__file__), 'assets', 'data')
 os.makedirs(data_dir, exist_ok=True)
 
+# Mentions per exported page file (the dashboard renders the first page while loading the rest)
+MENTIONS_PAGE_SIZE = int(os.getenv("MENTIONS_PAGE_SIZE", "1000"))
+
+# Columns of the exported mention pages, one array per column
+MENTION_COLUMNS = ['published_at', 'title', 'source', 'sentiment', 'sentiment_score', 'url']
+
+# Most recent sentiment anomalies exported per company
+ANOMALIES_EXPORT_LIMIT = int(os.getenv("ANOMALIES_EXPORT_LIMIT", "50"))
+
+# Also export a per-company search index for the dashboard (or pass --search-index)
+EXPORT_SEARCH_INDEX = os.getenv("EXPORT_SEARCH_INDEX", "0") == "1"
+
+# Each export generation is written to its own directory under assets/data (see write_manifest)
+GENERATIONS_DIR = 'generations'
+
+# Generations kept: the current one and the previous one, which a dashboard may still be loading
+GENERATIONS_KEPT = int(os.getenv("EXPORT_GENERATIONS_KEPT", "2"))
+
 def json_serial(obj):
     """JSON serializer for objects not serializable by default json code"""
     if isinstance(obj, datetime):
         return obj.isoformat()
     raise TypeError(f"Type {type(obj)} not serializable")
 
-def generate_company_list():
-    """Generate a JSON file with the list of all companies"""
+def write_text_atomic(path, text):
+    """Write text to path via a temp file, fsync and atomic rename."""
+    _write_atomic(path, lambda f: f.write(text))
+
+def write_json_atomic(path, data, **kwargs):
+    """Write JSON to path via a temp file, fsync and atomic rename.
+
+    Readers (or a concurrent Pages deploy) never see a partially written file:
+    they get either the previous version or the complete new one.
+    """
+    _write_atomic(path, lambda f: json.dump(data, f, **kwargs))
+
+def _write_atomic(path, write):
+    directory = os.path.dirname(path) or '.'
+    fd, tmp_path = tempfile.mkstemp(prefix='.' + os.path.basename(path) + '.', suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'w') as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        # mkstemp creates the file readable by its owner only; published files
+        # must stay readable by a web server running as another user
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+    
+    # Persist the rename itself (not supported on every platform)
+    try:
+        dir_fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(dir_fd)
+    except OSError:
+        pass
+    finally:
+        os.close(dir_fd)
+
+def generate_company_list(directory=''):
+    """Generate a JSON file with the list of all companies
+    
+    Args:
+        directory: Directory under assets/data to write companies.json to
+    """
     try:
         # Initialize DB before accessing
         init_db()
@@ -31,8 +101,7 @@ def generate_company_list():
             'aliases': company.aliases.split(',') if company.aliases else []
         } for company in companies]
         
-        with open(os.path.join(data_dir, 'companies.json'), 'w') as f:
-            json.dump(company_list, f, default=json_serial)
+        write_json_atomic(os.path.join(data_dir, directory, 'companies.json'), company_list, default=json_serial)
         
         log_info(f"Generated companies.json with {len(company_list)} companies")
         return company_list
@@ -41,8 +110,15 @@ def generate_company_list():
         traceback.print_exc()
         return []
 
-def generate_company_data(company_id):
-    """Generate JSON data for a specific company"""
+def generate_company_data(company_id, search_index=EXPORT_SEARCH_INDEX, generation=None, directory=''):
+    """Generate JSON data for a specific company
+    
+    Args:
+        company_id: The company ID
+        search_index: Also write the company's search index file
+        generation: Export generation the file belongs to (see write_manifest)
+        directory: Directory under assets/data to write the company's files to
+    """
     try:
         company = get_company(company_id)
         if not company:
@@ -52,26 +128,22 @@ def generate_company_data(company_id):
         # Get company stats
         stats = get_sentiment_stats(company_id)
         
-        # Get company mentions
-        mentions = get_mentions(company_id)
-        mentions_data = [{
-            'id': mention.id,
-            'title': mention.title,
-            'content': mention.content,
-            'sentiment': mention.sentiment,
-            'sentiment_score': mention.sentiment_score,
-            'url': mention.url,
-            'source': mention.source,
-            'published_at': mention.published_at
-        } for mention in mentions]
+        # Write company mentions as paged files; the company file only indexes them
+        mentions_index = write_mention_pages(company_id, directory)
+        if search_index:
+            search_file = posixpath.join(directory, f'company_{company_id}_search.json')
+            write_search_index(company_id, search_file)
+            mentions_index['search'] = search_file
         
-        # Get timeline data
+        # Get timeline data, reduced to plot-ready series (downsampled points, rolling average, trend)
+        from timeseries import summarize_timeline  # Imported here so numpy loads only when exporting
         timeline_mentions = get_sentiment_timeline_data(company_id)
-        timeline_data = [{
-            'date': mention.published_at,
-            'score': mention.sentiment_score,
-            'sentiment': mention.sentiment
-        } for mention in timeline_mentions if mention.published_at and mention.sentiment_score]
+        # Unscored mentions have a NULL score; a real 0.0 score is a neutral data point
+        timeline = summarize_timeline([
+            (mention.published_at, mention.sentiment_score, mention.sentiment)
+            for mention in timeline_mentions
+            if mention.published_at and mention.sentiment_score is not None
+        ])
         
         # Create company data object
         company_data = {
@@ -81,13 +153,17 @@ def generate_company_data(company_id):
                 'aliases': company.aliases.split(',') if company.aliases else []
             },
             'stats': stats,
-            'mentions': mentions_data,
-            'timeline': timeline_data
+            'mentions_index': mentions_index,
+            'timeline': timeline['points'],
+            'timeline_points_total': timeline['points_total'],
+            'timeline_rolling': timeline['rolling'],
+            'timeline_trend': timeline['trend'],
+            'anomalies': get_anomalies(company_id, limit=ANOMALIES_EXPORT_LIMIT),
+            'generation': generation
         }
         
         # Save to file
-        with open(os.path.join(data_dir, f'company_{company_id}.json'), 'w') as f:
-            json.dump(company_data, f, default=json_serial)
+        write_json_atomic(os.path.join(data_dir, directory, f'company_{company_id}.json'), company_data, default=json_serial)
         
         log_info(f"Generated data for company: {company.name} (ID: {company_id})")
         return company_data
@@ -96,39 +172,141 @@ def generate_company_data(company_id):
         traceback.print_exc()
         return None
 
-def generate_all_data():
-    """Generate all JSON data files"""
+def write_mention_pages(company_id, directory=''):
+    """Write a company's mentions, newest first, as column-store page files.
+    
+    Each page (company_<id>_mentions_<n>.json) holds up to MENTIONS_PAGE_SIZE
+    mentions as one array per column, which is smaller than a list of objects
+    and maps directly onto the dashboard's typed arrays.
+    
+    Args:
+        company_id: The company ID
+        directory: Directory under assets/data to write the pages to
+        
+    Returns:
+        Dict with the mention total, page size, columns and page paths
+        (relative to assets/data)
+    """
+    pages = []
+    total = 0
+    for number, rows in enumerate(iter_mention_pages(company_id, MENTIONS_PAGE_SIZE)):
+        page = {column: [getattr(row, column) for row in rows] for column in MENTION_COLUMNS}
+        name = posixpath.join(directory, f'company_{company_id}_mentions_{number}.json')
+        write_json_atomic(os.path.join(data_dir, name), page, default=json_serial, separators=(',', ':'))
+        pages.append(name)
+        total += len(rows)
+    
+    return {
+        'total': total,
+        'page_size': MENTIONS_PAGE_SIZE,
+        'columns': MENTION_COLUMNS,
+        'pages': pages
+    }
+
+def write_search_index(company_id, name):
+    """Write the company's prebuilt search index (rows follow the mention pages)."""
+    from search_index import build_export_index
+    index = build_export_index(iter_mention_texts(company_id))
+    write_json_atomic(os.path.join(data_dir, name), index, separators=(',', ':'))
+    log_info(f"Generated {name} with {len(index['terms'])} terms over {index['docs']} mentions")
+
+def remove_old_generations(keep=GENERATIONS_KEPT):
+    """Delete all but the newest `keep` export generations, and the data files
+    that exports before generation directories wrote to assets/data itself."""
+    generations = sorted(glob.glob(os.path.join(data_dir, GENERATIONS_DIR, '*')))
+    stale = generations[:-max(keep, 1)]  # Never the current generation
+    for pattern in ('companies.json', 'dashboard_data.json', 'company_*.json'):
+        stale += glob.glob(os.path.join(data_dir, pattern))
+    for path in stale:
+        try:
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            else:
+                os.remove(path)
+        except OSError as e:
+            log_error(f"Could not remove stale export data {path}: {str(e)}")
+
+def generate_all_data(search_index=EXPORT_SEARCH_INDEX):
+    """Generate all JSON data files
+    
+    Args:
+        search_index: Also write per-company search index files
+    """
     # Initialize DB before accessing
     init_db()
+    generation = datetime.now().strftime('%Y%m%dT%H%M%S%f')
+    directory = posixpath.join(GENERATIONS_DIR, generation)
+    os.makedirs(os.path.join(data_dir, directory), exist_ok=True)
     
     # Generate company list
-    companies = generate_company_list()
+    companies = generate_company_list(directory)
     
     # Generate data for each company
     all_company_data = []
     for company in companies:
-        company_data = generate_company_data(company['id'])
+        company_data = generate_company_data(company['id'], search_index=search_index, generation=generation,
+                                             directory=directory)
         if company_data:
             all_company_data.append(company_data)
     
     # Generate a combined data file with the first company's data as default
     if all_company_data:
         default_company_data = all_company_data[0]
-        with open(os.path.join(data_dir, 'dashboard_data.json'), 'w') as f:
-            json.dump(default_company_data, f, default=json_serial)
+        write_json_atomic(os.path.join(data_dir, directory, 'dashboard_data.json'), default_company_data, default=json_serial)
         log_info(f"Generated dashboard_data.json with default company: {default_company_data['company']['name']}")
     else:
         log_error("No company data was generated. Dashboard data will not be updated.")
         
     # Generate a timestamp file to track when the data was last updated
+    generated_at = datetime.now().isoformat()
     timestamp_data = {
-        "last_updated": datetime.now().isoformat(),
+        "last_updated": generated_at,
         "companies_processed": len(companies),
         "success": len(all_company_data)
     }
-    with open(os.path.join(data_dir, 'last_update.json'), 'w') as f:
-        json.dump(timestamp_data, f)
+    write_json_atomic(os.path.join(data_dir, 'last_update.json'), timestamp_data)
+    
+    # Switch the manifest last so it only ever points at a complete generation
+    files = [posixpath.join(directory, 'companies.json')]
+    for data in all_company_data:
+        files.append(posixpath.join(directory, f"company_{data['company']['id']}.json"))
+        files += data['mentions_index']['pages']
+        if data['mentions_index'].get('search'):
+            files.append(data['mentions_index']['search'])
+    if all_company_data:
+        files.append(posixpath.join(directory, 'dashboard_data.json'))
+    write_manifest(generation, directory, files)
+    
+    # Generations no dashboard can still be reading (and files of deleted companies with them)
+    remove_old_generations()
+
+def write_manifest(generation, directory, files):
+    """Write manifest.json describing the files of the current export generation.
+    
+    Every generation is written to its own directory and never changed
+    afterwards, and company files list their mention pages with that
+    directory. The dashboard reads the manifest first (uncached) and loads
+    everything from the generation it names, so it never mixes files of two
+    exports.
+    """
+    entries = {}
+    for name in files:
+        path = os.path.join(data_dir, name)
+        if os.path.exists(path):
+            entries[name] = {"size": os.path.getsize(path)}
+    
+    manifest = {
+        "generation": generation,
+        "path": directory + '/',
+        "files": entries
+    }
+    write_json_atomic(os.path.join(data_dir, 'manifest.json'), manifest)
+    log_info(f"Generated manifest.json for generation {generation} ({len(entries)} files)")
 
 if __name__ == "__main__":
-    generate_all_data()
+    parser = argparse.ArgumentParser(description="Generate the static dashboard data")
+    parser.add_argument("--search-index", action="store_true", help="Also export per-company search indexes")
+    args = parser.parse_args()
+    
+    generate_all_data(search_index=args.search_index or EXPORT_SEARCH_INDEX)
     print("Static data generation complete!")
\ No newline at end of file
@@ -0,0 +1,131 @@
+"""
+Run journal for resumable pipeline runs.
+Records how far each company and article of a run got, so `runner.py --all --resume` can continue it.
+"""
+
+import json
+import os
+from datetime import datetime, timedelta
+
+import db
+import metrics
+from logger import log_info
+from records import MentionRecord
+
+COMPANY_KEY = ""
+
+# An unfinished run older than this is abandoned instead of resumed
+RESUME_MAX_AGE_HOURS = float(os.getenv("RESUME_MAX_AGE_HOURS", "12"))
+
+def record_to_dict(mention):
+    """JSON-serializable fields of a MentionRecord needed to resume it."""
+    return {
+        "title": mention.title,
+        "content": mention.content,
+        "url": mention.url,
+        "source": mention.source,
+        "published_at": mention.published_at.isoformat() if mention.published_at else None,
+        "sentiment": mention.sentiment,
+        "sentiment_score": mention.sentiment_score,
+    }
+
+def record_from_dict(data):
+    mention = MentionRecord(
+        title=data["title"],
+        content=data["content"],
+        url=data["url"],
+        source=data["source"],
+        published_at=datetime.fromisoformat(data["published_at"]) if data["published_at"] else None,
+    )
+    if data.get("sentiment") is not None:
+        mention.set_sentiment(data["sentiment"], data["sentiment_score"])
+    return mention
+
+class RunJournal:
+    """Stage completions of one pipeline run, backed by the run_items table."""
+
+    def __init__(self, run_id, items=()):
+        self.run_id = run_id
+        self.resumed = bool(items)
+        self.status = "running"
+        self.write_errors = 0  # Checkpoints that could not be saved (their stage is redone on resume)
+        self._companies = {}  # company_id -> (stage, result) of the company record
+        self._articles = {}   # company_id -> {url: mention data}, in fetch order
+        for company_id, key, stage, data in items:
+            if key == COMPANY_KEY:
+                self._companies[company_id] = (stage, json.loads(data) if data else None)
+            else:
+                self._articles.setdefault(company_id, {})[key] = json.loads(data)
+
+    @classmethod
+    def open(cls, article_limit=None, resume=False):
+        """Reopen the last unfinished run if resume is set, otherwise start a new one."""
+        if resume:
+            run = db.get_unfinished_run()
+            if run and run.started_at and datetime.now() - run.started_at > timedelta(hours=RESUME_MAX_AGE_HOURS):
+                # start_run abandons it: its journaled articles are too old to store now
+                log_info(f"Pipeline run {run.id} started more than {RESUME_MAX_AGE_HOURS:g} hours ago, not resuming it")
+            elif run:
+                journal = cls(run.id, db.get_run_items(run.id))
+                log_info(f"Resuming pipeline run {run.id}: {len(journal.stored_companies())} companies "
+                         f"stored, {len(journal._articles)} with fetched articles")
+                return journal
+            else:
+                log_info("No unfinished pipeline run to resume, starting a new one")
+        return cls(db.start_run(article_limit).id)
+
+    def stored_companies(self):
+        return [company_id for company_id, (stage, _) in self._companies.items() if stage == "stored"]
+
+    def stored_result(self, company_id):
+        """Result of a company already stored in this run (None if it is not)."""
+        stage, result = self._companies.get(company_id, (None, None))
+        return result if stage == "stored" else None
+
+    def has_fetched(self, company_id):
+        return company_id in self._companies
+
+    def mentions(self, company_id):
+        """Journaled mentions of a fetched company, with their scores if any (None if not fetched)."""
+        if not self.has_fetched(company_id):
+            return None
+        return [record_from_dict(data) for data in self._articles.get(company_id, {}).values()]
+
+    def record_fetched(self, company_id, mentions):
+        """Checkpoint a company's fetched and extracted mentions."""
+        articles = {mention.url: record_to_dict(mention) for mention in mentions}
+        items = [(url, "extracted", json.dumps(data)) for url, data in articles.items()]
+        items.append((COMPANY_KEY, "fetched", None))
+        self._save(company_id, items)
+        self._companies[company_id] = ("fetched", None)
+        self._articles[company_id] = articles
+
+    def record_scored(self, company_id, mention):
+        """Checkpoint one mention's sentiment."""
+        data = record_to_dict(mention)
+        self._save(company_id, [(mention.url, "scored", json.dumps(data))])
+        self._articles.setdefault(company_id, {})[mention.url] = data
+
+    def record_stored(self, company_id, result):
+        """Checkpoint a company as stored, with the result reported for it."""
+        if not db.mark_run_items(self.run_id, company_id, "stored"):
+            self._write_failed()
+        self._save(company_id, [(COMPANY_KEY, "stored", json.dumps(result, default=str))])
+        self._companies[company_id] = ("stored", result)
+
+    def finish(self, failed=()):
+        """Close the run and drop its journal.
+        
+        Args:
+            failed: Names of the companies that were not stored (the run is then partial)
+        """
+        self.status = "partial" if failed else "completed"
+        db.finish_run(self.run_id, self.status, list(failed))
+
+    def _save(self, company_id, items):
+        if not db.save_run_items(self.run_id, company_id, items):
+            self._write_failed()
+
+    def _write_failed(self):
+        self.write_errors += 1
+        metrics.increment("journal_write_errors")
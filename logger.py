@@ -1,51 +1,118 @@
+import atexit
+import json
 import logging
 import os
+import queue
 import sys
+import threading
 from datetime import datetime
-from functools import wraps
+from functools import lru_cache, wraps
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 
 # Create logs directory if it doesn't exist
 logs_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'logs')
 os.makedirs(logs_dir, exist_ok=True)
 
-# Configure the main logger
-log_file = os.path.join(logs_dir, f'app_{datetime.now().strftime("%Y%m%d")}.log')
+# Project root, used to show paths relative to the repository
+project_root = os.path.dirname(os.path.abspath(__file__))
+
+# Logging mode: "production" logs function entry/exit at DEBUG, "verbose" at INFO
+LOG_MODE = os.getenv("LOG_MODE", "production").lower()
+LOG_LEVEL = getattr(logging, os.getenv("LOG_LEVEL", "INFO").upper(), logging.INFO)
+CALL_LOG_LEVEL = logging.INFO if LOG_MODE == "verbose" else logging.DEBUG
+
+# Handler configuration
+LOG_ASYNC = os.getenv("LOG_ASYNC", "1") != "0"          # Write logs from a background thread
+LOG_JSON = os.getenv("LOG_JSON", "0") == "1"            # Also write structured JSON lines
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024)))  # Rotate files above this size
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "5"))              # Size-rotated backups to keep per day
+
+@lru_cache(maxsize=None)
+def relative_path(pathname):
+    """Return pathname relative to the project root (cached per path)."""
+    if pathname and pathname.startswith(project_root):
+        return os.path.relpath(pathname, project_root)
+    return pathname or 'unknown'
 
 # Create a custom formatter that includes timestamp, level, module information, and filename
 class CustomFormatter(logging.Formatter):
+    default_time_format = "%Y-%m-%d %H:%M:%S"
+    default_msec_format = None
+    
     def format(self, record):
-        # Add the timestamp in a readable format
-        record.timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        # Reuse the record creation time instead of calling datetime.now() again
+        record.timestamp = self.formatTime(record)
         
-        # Extract filename from pathname if available
-        if hasattr(record, 'pathname') and record.pathname:
-            # Get the absolute path of the project root directory
-            project_root = os.path.dirname(os.path.abspath(__file__))
-            
-            # Calculate relative path if the pathname starts with project root
-            if record.pathname.startswith(project_root):
-                record.rel_pathname = os.path.relpath(record.pathname, project_root)
-            else:
-                record.rel_pathname = record.pathname
-                
-            record.filename = os.path.basename(record.pathname)
-        else:
-            record.filename = 'unknown'
-            record.rel_pathname = 'unknown'
+        # Relative path lookups are cached, pathname/filename are already set by logging
+        record.rel_pathname = relative_path(record.pathname)
             
         return super().format(record)
 
+# Formatter for structured JSON-lines output
+class JsonLinesFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created).isoformat(),
+            "level": record.levelname,
+            "path": relative_path(record.pathname),
+            "module": record.module,
+            "function": record.funcName,
+            "message": record.getMessage()
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+# File handler that starts a new dated file every day and rotates by size within a day
+class DailyRotatingFileHandler(RotatingFileHandler):
+    """Write to logs/<prefix>_YYYYMMDD<suffix>, rolling over at midnight and at maxBytes."""
+    
+    def __init__(self, directory, prefix='app', suffix='.log', maxBytes=0, backupCount=0):
+        self.directory = directory
+        self.prefix = prefix
+        self.suffix = suffix
+        self.current_date = datetime.now().strftime("%Y%m%d")
+        self.rollover_date = None  # Date of the record that triggered a rollover
+        super().__init__(self.path_for(self.current_date), maxBytes=maxBytes, backupCount=backupCount, delay=True)
+    
+    def path_for(self, date):
+        return os.path.join(self.directory, f'{self.prefix}_{date}{self.suffix}')
+    
+    def shouldRollover(self, record):
+        # The record's own time decides its file, not when the listener writes it
+        record_date = datetime.fromtimestamp(record.created).strftime("%Y%m%d")
+        if record_date != self.current_date:
+            self.rollover_date = record_date
+            return True
+        return super().shouldRollover(record)
+    
+    def doRollover(self):
+        today = self.rollover_date or self.current_date
+        self.rollover_date = None
+        if today == self.current_date:
+            # Same day, the file is over maxBytes
+            super().doRollover()
+            return
+        
+        # New day: switch to a new dated file
+        if self.stream:
+            self.stream.close()
+            self.stream = None
+        self.current_date = today
+        self.baseFilename = os.path.abspath(self.path_for(today))
+
 # Configure the logger
 logger = logging.getLogger('company_tracker')
-logger.setLevel(logging.INFO)
+logger.setLevel(LOG_LEVEL)
 
 # Create file handler
-file_handler = logging.FileHandler(log_file)
-file_handler.setLevel(logging.INFO)
+file_handler = DailyRotatingFileHandler(logs_dir, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT)
+file_handler.setLevel(LOG_LEVEL)
+log_file = file_handler.baseFilename
 
 # Create console handler
 console_handler = logging.StreamHandler(sys.stdout)
-console_handler.setLevel(logging.INFO)
+console_handler.setLevel(LOG_LEVEL)
 
 # Create formatter
 formatter = CustomFormatter('%(timestamp)s [%(levelname)s] [%(rel_pathname)s] %(module)s.%(funcName)s: %(message)s')
@@ -54,48 +121,64 @@ formatter = CustomFormatter('%(timestamp)s [%(levelname)s] [%(rel_pathname)s] %(
 file_handler.setFormatter(formatter)
 console_handler.setFormatter(formatter)
 
-# Add handlers to logger
-logger.addHandler(file_handler)
-logger.addHandler(console_handler)
+handlers = [file_handler, console_handler]
+
+# Optional structured output next to the text log
+json_handler = None
+if LOG_JSON:
+    json_handler = DailyRotatingFileHandler(logs_dir, suffix='.jsonl', maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT)
+    json_handler.setLevel(LOG_LEVEL)
+    json_handler.setFormatter(JsonLinesFormatter())
+    handlers.append(json_handler)
+
+# Queue listener that can be flushed: a flush marker (an Event) is queued
+# behind the pending records and set once the listener reaches it
+class FlushableQueueListener(QueueListener):
+    def handle(self, record):
+        if isinstance(record, threading.Event):
+            record.set()
+            return
+        super().handle(record)
+
+# Add handlers to logger. In async mode the logging call only enqueues the
+# record; a background listener thread does the formatting and I/O.
+queue_listener = None
+if LOG_ASYNC:
+    log_queue = queue.SimpleQueue()
+    queue_listener = FlushableQueueListener(log_queue, *handlers, respect_handler_level=True)
+    queue_listener.start()
+    logger.addHandler(QueueHandler(log_queue))
+else:
+    for handler in handlers:
+        logger.addHandler(handler)
 
 # Decorator for logging function calls
 def log_function_call(func):
+    func_name = func.__name__
+    
+    # Resolve the source path once, at decoration time
+    code = getattr(func, '__code__', None)
+    rel_path = relative_path(code.co_filename) if code else 'unknown'
+    
     @wraps(func)
     def wrapper(*args, **kwargs):
-        func_name = func.__name__
-        module_name = func.__module__
-        
-        # Get the file name and path from the module
-        try:
-            import inspect
-            file_path = inspect.getfile(func)
-            file_name = os.path.basename(file_path)
-            
-            # Get relative path from project root
-            project_root = os.path.dirname(os.path.abspath(__file__))
-            if file_path.startswith(project_root):
-                rel_path = os.path.relpath(file_path, project_root)
-            else:
-                rel_path = file_path
-        except:
-            file_name = 'unknown'
-            rel_path = 'unknown'
-        
-        # Log function entry
-        logger.info(f"Starting {func_name} in {rel_path}")
+        # Entry/exit lines are skipped cheaply when their level is disabled
+        trace = logger.isEnabledFor(CALL_LOG_LEVEL)
+        if trace:
+            logger.log(CALL_LOG_LEVEL, "Starting %s in %s", func_name, rel_path)
         
         try:
             # Call the original function
             result = func(*args, **kwargs)
-            
-            # Log function exit
-            logger.info(f"Completed {func_name} in {rel_path} successfully")
-            
-            return result
         except Exception as e:
             # Log the exception
             logger.error(f"Error in {func_name} ({rel_path}): {str(e)}")
             raise
+        
+        if trace:
+            logger.log(CALL_LOG_LEVEL, "Completed %s in %s successfully", func_name, rel_path)
+        
+        return result
     
     return wrapper
 
@@ -109,7 +192,7 @@ def log_startup(app_name=None):
         logger.info(f"=== {app_name} Started ===")
     else:
         logger.info("=== Application Started ===")
-    logger.info(f"Log file: {log_file}")
+    logger.info(f"Log file: {file_handler.baseFilename} (mode: {LOG_MODE})")
 
 # Log application shutdown
 def log_shutdown(app_name=None):
@@ -117,6 +200,23 @@ def log_shutdown(app_name=None):
         logger.info(f"=== {app_name} Shutdown ===")
     else:
         logger.info("=== Application Shutdown ===")
+    flush_logs()
+
+# Wait until the records queued so far have been written
+def flush_logs(timeout=5.0):
+    if queue_listener:
+        flushed = threading.Event()
+        log_queue.put(flushed)
+        flushed.wait(timeout)
+
+# Stop the background listener, writing out anything still queued
+def stop_logging():
+    global queue_listener
+    if queue_listener:
+        listener, queue_listener = queue_listener, None
+        listener.stop()
+
+atexit.register(stop_logging)
 
 # Log a general message
 def log_info(message):
@@ -0,0 +1,133 @@
+"""
+Lightweight in-process metrics for the reputation tracking pipeline.
+Counters and latency samples, reported in pipeline_run_report.json or as Prometheus text.
+"""
+
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Latency samples kept per histogram (older samples are dropped, count/sum are exact)
+MAX_SAMPLES = 10000
+
+_lock = threading.Lock()
+_counters = {}
+_histograms = {}
+
+def percentile(ordered, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not ordered:
+        return 0.0
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+class Histogram:
+    """Latency histogram with exact count/sum and percentiles over recent samples."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples = deque(maxlen=MAX_SAMPLES)
+
+    def observe(self, value):
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+        self.samples.append(value)
+
+    def summary(self):
+        ordered = sorted(self.samples)
+        return {
+            "count": self.count,
+            "sum": round(self.total, 6),
+            "mean": round(self.total / self.count, 6) if self.count else 0.0,
+            "p50": round(percentile(ordered, 50), 6),
+            "p95": round(percentile(ordered, 95), 6),
+            "p99": round(percentile(ordered, 99), 6),
+            "max": round(self.max, 6)
+        }
+
+def increment(name, value=1):
+    """Increase counter `name` by `value`."""
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+def observe(name, seconds):
+    """Record a latency sample (in seconds) for stage `name`."""
+    with _lock:
+        histogram = _histograms.get(name)
+        if histogram is None:
+            histogram = _histograms[name] = Histogram()
+        histogram.observe(seconds)
+
+@contextmanager
+def timer(name):
+    """Time the enclosed block as stage `name`; failures are counted as `<name>_errors`."""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        increment(f"{name}_errors")
+        raise
+    finally:
+        observe(name, time.perf_counter() - start)
+
+def record_cache(name, hit):
+    """Count a hit or miss for cache `name`."""
+    increment(f"{name}_cache_hits" if hit else f"{name}_cache_misses")
+
+def reset():
+    """Clear all recorded metrics."""
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+
+def snapshot():
+    """Return counters, latency summaries and cache hit rates as a JSON-friendly dict."""
+    with _lock:
+        counters = dict(_counters)
+        latencies = {name: histogram.summary() for name, histogram in _histograms.items()}
+
+    cache_hit_rates = {}
+    for key in counters:
+        if key.endswith("_cache_hits") or key.endswith("_cache_misses"):
+            cache = key.rsplit("_cache_", 1)[0]
+            hits = counters.get(f"{cache}_cache_hits", 0)
+            misses = counters.get(f"{cache}_cache_misses", 0)
+            cache_hit_rates[cache] = round(hits / (hits + misses), 4) if hits + misses else 0.0
+
+    return {
+        "counters": counters,
+        "latency_seconds": latencies,
+        "cache_hit_rates": cache_hit_rates
+    }
+
+def _metric_name(name):
+    return "company_tracker_" + "".join(c if c.isalnum() else "_" for c in name)
+
+def prometheus_text():
+    """Render the current metrics in the Prometheus text exposition format."""
+    data = snapshot()
+    lines = []
+
+    for name, value in sorted(data["counters"].items()):
+        metric = _metric_name(name) + "_total"
+        lines.append(f"# TYPE {metric} counter")
+        lines.append(f"{metric} {value}")
+
+    for name, summary in sorted(data["latency_seconds"].items()):
+        metric = _metric_name(name) + "_seconds"
+        lines.append(f"# TYPE {metric} summary")
+        for quantile, key in (("0.5", "p50"), ("0.95", "p95"), ("0.99", "p99")):
+            lines.append(f'{metric}{{quantile="{quantile}"}} {summary[key]}')
+        lines.append(f"{metric}_sum {summary['sum']}")
+        lines.append(f"{metric}_count {summary['count']}")
+
+    for name, rate in sorted(data["cache_hit_rates"].items()):
+        metric = _metric_name(name) + "_cache_hit_ratio"
+        lines.append(f"# TYPE {metric} gauge")
+        lines.append(f"{metric} {rate}")
+
+    return "\n".join(lines) + "\n"
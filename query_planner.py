@@ -0,0 +1,130 @@
+"""
+Query planning for NewsAPI.
+Packs several companies' OR-queries into combined requests and tracks the request budget.
+"""
+
+import copy
+import os
+import re
+
+# NewsAPI rejects `q` values longer than this
+MAX_QUERY_LENGTH = int(os.getenv("NEWSAPI_MAX_QUERY_LENGTH", "500"))
+
+# NewsAPI returns at most this many articles per request
+MAX_PAGE_SIZE = 100
+
+# Upper bound on pages requested for a single query
+MAX_PAGES_PER_QUERY = int(os.getenv("NEWSAPI_MAX_PAGES", "5"))
+
+class QuotaBudget:
+    """Counts NewsAPI requests against an optional per-run limit (None = unlimited)."""
+
+    def __init__(self, limit=None):
+        self.limit = limit
+        self.used = 0
+
+    @classmethod
+    def from_env(cls):
+        limit = int(os.getenv("NEWSAPI_REQUEST_BUDGET", "0"))
+        return cls(limit or None)
+
+    @property
+    def remaining(self):
+        if self.limit is None:
+            return None
+        return max(0, self.limit - self.used)
+
+    def exhausted(self):
+        return self.limit is not None and self.used >= self.limit
+
+    def consume(self):
+        """Reserve one request; returns False if the budget is used up."""
+        if self.exhausted():
+            return False
+        self.used += 1
+        return True
+
+class CompanyQuery:
+    """Search terms of one company in a planned request."""
+
+    def __init__(self, key, name, aliases):
+        self.key = key
+        seen = set()
+        self.terms = []
+        for term in [name] + list(aliases or []):
+            term = term.strip().replace('"', '')
+            if term and term.lower() not in seen:
+                seen.add(term.lower())
+                self.terms.append(term)
+        # Whole-word, case-insensitive match on any of the terms
+        self.pattern = re.compile(
+            r"(?<!\w)(?:" + "|".join(re.escape(term) for term in self.terms) + r")(?!\w)",
+            re.IGNORECASE
+        ) if self.terms else None
+
+    def matches(self, article):
+        if not self.pattern:
+            return False
+        for field in ('title', 'description', 'content'):
+            value = article.get(field)
+            if value and self.pattern.search(value):
+                return True
+        return False
+
+def build_query(terms):
+    """Build a NewsAPI OR-query from search terms."""
+    return " OR ".join(f'"{term}"' for term in terms)
+
+def fit_terms(terms, max_length=MAX_QUERY_LENGTH):
+    """Drop trailing terms until the query fits in max_length (the name is always kept)."""
+    terms = list(terms)
+    while len(terms) > 1 and len(build_query(terms)) > max_length:
+        terms.pop()
+    return terms
+
+def plan_batches(companies, max_length=MAX_QUERY_LENGTH):
+    """Greedily pack companies into combined queries.
+
+    Args:
+        companies: List of CompanyQuery
+        max_length: Maximum length of the combined `q` parameter
+
+    Returns:
+        List of batches, each a list of CompanyQuery whose terms fit in one query.
+        The planned CompanyQuery objects are copies with their terms trimmed to
+        fit; the caller's objects are left unchanged.
+    """
+    batches = []
+    current, current_terms = [], []
+    for company in companies:
+        company = copy.copy(company)
+        company.terms = fit_terms(company.terms, max_length)
+        candidate = current_terms + company.terms
+        if current and len(build_query(candidate)) > max_length:
+            batches.append(current)
+            current, candidate = [], list(company.terms)
+        current.append(company)
+        current_terms = candidate
+    if current:
+        batches.append(current)
+    return batches
+
+def demultiplex(articles, batch):
+    """Route articles of a combined query back to the companies they mention.
+
+    Only the title, description and content snippet returned by NewsAPI can be
+    checked, so articles that matched a term in the full text are not routed.
+
+    Returns:
+        Dict of company key -> list of articles (an article can go to several companies)
+    """
+    if len(batch) == 1:
+        # Single-company query: NewsAPI already matched it (possibly in the full text)
+        return {batch[0].key: list(articles)}
+
+    routed = {company.key: [] for company in batch}
+    for article in articles:
+        for company in batch:
+            if company.matches(article):
+                routed[company.key].append(article)
+    return routed
@@ -0,0 +1,38 @@
+"""
+In-memory record of a mention as it moves through the pipeline.
+"""
+
+class MentionRecord:
+    """A fetched article mentioning a company, plus its analysis results."""
+
+    __slots__ = (
+        "title",            # Article headline
+        "content",          # Extracted text (or the NewsAPI snippet as fallback)
+        "url",
+        "source",           # Publisher name
+        "published_at",     # Naive UTC datetime, or None
+        "sentiment",        # POSITIVE, NEGATIVE or NEUTRAL once analyzed
+        "sentiment_score",  # -1.0 to 1.0 once analyzed (None if it could not be scored)
+        "signature",        # MinHash signature of the content (see dedup.py)
+        "cluster_key",      # URL of the near-duplicate cluster's representative
+        "relevance",        # Relevance to the company (see relevance.py)
+    )
+
+    def __init__(self, title, content, url, source="Unknown", published_at=None):
+        self.title = title
+        self.content = content
+        self.url = url
+        self.source = source
+        self.published_at = published_at
+        self.sentiment = None
+        self.sentiment_score = None
+        self.signature = None
+        self.cluster_key = None
+        self.relevance = None
+
+    def set_sentiment(self, label, score):
+        self.sentiment = label
+        self.sentiment_score = score
+
+    def __repr__(self):
+        return f"<MentionRecord(url='{self.url}', sentiment='{self.sentiment}')>"
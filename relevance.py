@@ -0,0 +1,96 @@
+"""
+Relevance prefilter for fetched mentions.
+Drops mentions that only name a company in passing before sentiment analysis.
+"""
+
+import os
+import re
+
+import metrics
+
+# Set RELEVANCE_FILTER=0 to score and store every fetched mention
+RELEVANCE_FILTER = os.getenv("RELEVANCE_FILTER", "1") != "0"
+
+# Mentions scoring below this are dropped (default: a title mention, two
+# mentions in the text, or one in the lead)
+RELEVANCE_MIN_SCORE = float(os.getenv("RELEVANCE_MIN_SCORE", "2"))
+
+RELEVANCE_TITLE_WEIGHT = float(os.getenv("RELEVANCE_TITLE_WEIGHT", "3"))
+RELEVANCE_LEAD_BONUS = float(os.getenv("RELEVANCE_LEAD_BONUS", "1"))
+RELEVANCE_LEAD_CHARS = int(os.getenv("RELEVANCE_LEAD_CHARS", "500"))
+RELEVANCE_MAX_TEXT_HITS = 5
+
+class RelevanceMatcher:
+    """Finds the names and aliases of all tracked companies in one pass over a text."""
+
+    def __init__(self, companies):
+        """
+        Args:
+            companies: List of (key, company_name, aliases) tuples
+        """
+        self.companies = {}  # Lower-cased term -> keys of the companies using it
+        for key, name, aliases in companies:
+            for term in [name] + list(aliases or []):
+                term = term.strip()
+                if term:
+                    self.companies.setdefault(term.lower(), set()).add(key)
+
+        # Longest terms first, so "Acme Corp" wins over "Acme" at the same position
+        terms = sorted(self.companies, key=len, reverse=True)
+        self.pattern = re.compile(
+            r"(?<!\w)(?:" + "|".join(re.escape(term) for term in terms) + r")(?!\w)",
+            re.IGNORECASE
+        ) if terms else None
+
+    def find(self, text):
+        """Count the mentions of each company in a text.
+
+        Returns:
+            Dict of company key -> (number of mentions, offset of the first one)
+        """
+        found = {}
+        if not self.pattern or not text:
+            return found
+        for match in self.pattern.finditer(text):
+            for key in self.companies.get(match.group().lower(), ()):
+                count, first = found.get(key, (0, match.start()))
+                found[key] = (count + 1, first)
+        return found
+
+    def score(self, mention, key):
+        """Relevance of a mention to one company (see the module docstring)."""
+        title_hits = self.find(mention.title).get(key, (0, None))[0]
+        text_hits, first = self.find(mention.content).get(key, (0, None))
+
+        score = RELEVANCE_TITLE_WEIGHT if title_hits else 0.0
+        score += min(text_hits, RELEVANCE_MAX_TEXT_HITS)
+        if first is not None and first < RELEVANCE_LEAD_CHARS:
+            score += RELEVANCE_LEAD_BONUS
+        return score
+
+def filter_mentions(mentions, matcher, key):
+    """Drop mentions that are not relevant enough to a company.
+
+    Sets each mention's relevance score in place.
+
+    Args:
+        mentions: MentionRecords with extracted content
+        matcher: RelevanceMatcher covering the company
+        key: The company's key in the matcher
+
+    Returns:
+        The mentions scoring at least RELEVANCE_MIN_SCORE, most relevant first
+    """
+    if not RELEVANCE_FILTER or matcher is None:
+        return list(mentions)
+
+    kept = []
+    for mention in mentions:
+        mention.relevance = matcher.score(mention, key)
+        if mention.relevance >= RELEVANCE_MIN_SCORE:
+            kept.append(mention)
+    kept.sort(key=lambda mention: mention.relevance, reverse=True)
+
+    metrics.increment("mentions_relevant", len(kept))
+    metrics.increment("mentions_irrelevant", len(mentions) - len(kept))
+    return kept
@@ -7,43 +7,98 @@ This script runs the reputation tracking pipeline for companies.
 import argparse
 import json
 import os
-from datetime import datetime
+import signal
+import threading
+import time
+from datetime import datetime, timedelta
 import db  # Import db instead of database
+import dedup
+import metrics
+import relevance
 from logger import get_logger, log_function_call, log_info, log_error, log_warning, log_startup, log_shutdown
 
 # Get logger
 logger = get_logger()
 
-# Check for API keys and import API client only if keys are available
-try:
-    from api_client import NewsClient, analyze_mentions
+# Combine several companies into one NewsAPI query when processing all companies
+NEWSAPI_BATCH_QUERIES = os.environ.get('NEWSAPI_BATCH_QUERIES', '1') != '0'
+
+# Re-request this much before a company's watermark to catch late-indexed articles
+WATERMARK_OVERLAP_HOURS = float(os.environ.get('WATERMARK_OVERLAP_HOURS', '2'))
+
+# Daemon mode: how often to re-read the company list (and the longest idle sleep)
+DAEMON_REFRESH_SECONDS = float(os.environ.get('DAEMON_REFRESH_SECONDS', '60'))
+
+# Set by load_api_client() the first time a subcommand needs the APIs
+API_AVAILABLE = None
+
+# Matcher over all companies' names and aliases, rebuilt when they change
+_relevance_matcher = None
+_relevance_companies = None
+
+def load_api_client():
+    """Import the API client on first use and check the API keys.
     
-    # Check for required API keys
-    news_api_key = os.environ.get('NEWSAPI_KEY')
-    openai_api_key = os.environ.get('OPENAI_API_KEY')
+    The API client pulls in openai, requests, lxml and dotenv, so it is only
+    imported by subcommands that fetch or analyze news; `--add` and
+    `--generate-only` start without it.
     
+    Returns:
+        True if news fetching and sentiment analysis are available
+    """
+    global API_AVAILABLE, NewsClient, analyze_mentions, QuotaBudget
+    if API_AVAILABLE is not None:
+        return API_AVAILABLE
+    
+    try:
+        from api_client import NewsClient, analyze_mentions
+        from query_planner import QuotaBudget
+    except ImportError as e:
+        log_error(f"API client import failed: {str(e)}")
+        API_AVAILABLE = False
+        return API_AVAILABLE
+    
+    # Check for required API keys (api_client has loaded .env by now)
     API_AVAILABLE = True
-    if not news_api_key:
+    if not os.environ.get('NEWSAPI_KEY'):
         log_warning("NEWSAPI_KEY environment variable not set. News fetching will be skipped.")
         API_AVAILABLE = False
-    if not openai_api_key:
+    if not os.environ.get('OPENAI_API_KEY'):
         log_warning("OPENAI_API_KEY environment variable not set. Sentiment analysis will be skipped.")
         API_AVAILABLE = False
     
     if not API_AVAILABLE:
         log_warning("Running in data generation mode only - no new data will be fetched.")
-except ImportError as e:
-    log_error(f"API client import failed: {str(e)}")
-    API_AVAILABLE = False
+    return API_AVAILABLE
+
+def get_relevance_matcher():
+    """RelevanceMatcher over every tracked company (cached until companies change)."""
+    global _relevance_matcher, _relevance_companies
+    companies = db.get_all_company_aliases()
+    if companies != _relevance_companies:
+        _relevance_matcher = relevance.RelevanceMatcher(companies)
+        _relevance_companies = companies
+    return _relevance_matcher
 
 @log_function_call
-def process_company(company_id, article_limit=15):
+def process_company(company_id, article_limit=15, mentions=None, news_client=None, journal=None):
     """Process a single company.
     
     Args:
         company_id: ID of the company to process
         article_limit: Maximum number of articles to process (default: 15)
+        mentions: Optional mentions already fetched for this company (skips NewsAPI)
+        news_client: Optional NewsClient to reuse (shares its request budget)
+        journal: Optional RunJournal to checkpoint each stage in (and resume from)
     """
+    with metrics.timer("process_company"):
+        result = _process_company(company_id, article_limit, mentions, news_client, journal)
+    # Failed companies are not checkpointed, so a resumed run retries them
+    if journal and result and result.get("status") == "success" and not result.get("resumed"):
+        journal.record_stored(company_id, result)
+    return result
+
+def _process_company(company_id, article_limit, mentions, news_client, journal):
     # Get company data
     company = db.get_company(company_id)
     if not company:
@@ -52,8 +107,18 @@ def process_company(company_id, article_limit=15):
     
     log_info(f"Processing company: {company.name} (ID: {company.id})")
     
+    # Resumed run: skip companies already stored, reuse articles already fetched
+    if journal:
+        stored = journal.stored_result(company_id)
+        if stored:
+            log_info(f"{company.name} was already stored in this run, skipping")
+            return dict(stored, resumed=True)
+        if mentions is None and journal.has_fetched(company_id):
+            mentions = journal.mentions(company_id)
+            log_info(f"Resuming {company.name} with {len(mentions)} journaled mentions")
+    
     # Skip API calls if not available
-    if not API_AVAILABLE:
+    if not load_api_client():
         log_warning(f"Skipping API calls for {company.name} - API not available")
         return {
             "company_name": company.name,
@@ -66,20 +131,14 @@ def process_company(company_id, article_limit=15):
     # Get company aliases
     aliases = db.get_company_aliases(company_id)
     
-    # 1. Fetch mentions
-    news_client = NewsClient()
+    # 1. Fetch mentions (only those newer than the company's watermark)
+    if news_client is None:
+        news_client = NewsClient(budget=QuotaBudget.from_env())
     try:
-        mentions = news_client.fetch_mentions(company.name, aliases, limit=article_limit)
-        log_info(f"Found {len(mentions)} mentions for {company.name}")
-        
-        if not mentions:
-            return {
-                "company_name": company.name,
-                "company_id": company.id,
-                "mentions_added": 0,
-                "status": "success",
-                "message": "No new mentions found."
-            }
+        if mentions is None:
+            since, known_urls = fetch_window(company_id)
+            mentions = news_client.fetch_mentions(company.name, aliases, limit=article_limit,
+                                                  since=since, known_urls=known_urls)
     except Exception as e:
         log_error(f"Error fetching mentions: {str(e)}", exc_info=True)
         return {
@@ -88,11 +147,39 @@ def process_company(company_id, article_limit=15):
             "status": "error",
             "message": f"Error fetching mentions: {str(e)}"
         }
+    log_info(f"Found {len(mentions)} mentions for {company.name}")
+    
+    # Only a completed fetch is journaled: a failed one returned above, so a resumed run fetches again
+    if journal and not journal.has_fetched(company_id):
+        journal.record_fetched(company_id, mentions)
+    
+    # fetch_mentions raises when the request fails, so this is a successful empty poll
+    if not mentions:
+        db.update_watermark(company_id, [])
+        return {
+            "company_name": company.name,
+            "company_id": company.id,
+            "mentions_added": 0,
+            "status": "success",
+            "message": "No new mentions found."
+        }
     
-    # 2. Analyze sentiment
+    # 2. Analyze sentiment (relevant mentions only, once per story; syndicated copies reuse the result)
+    fetched = mentions
     try:
-        enriched_mentions = analyze_mentions(mentions)
-        log_info(f"Completed sentiment analysis for {len(enriched_mentions)} mentions")
+        mentions = relevance.filter_mentions(fetched, get_relevance_matcher(), company_id)
+        if len(mentions) < len(fetched):
+            log_info(f"Dropped {len(fetched) - len(mentions)} of {len(fetched)} mentions that only name {company.name} in passing")
+        to_score, duplicates = dedup.cluster_mentions(mentions, db.find_near_duplicate, company_id)
+        if duplicates:
+            log_info(f"{len(duplicates)} of {len(mentions)} mentions are near-duplicates of other articles")
+        # Mentions scored before a resumed run stopped keep their score
+        pending = [mention for mention in to_score if mention.sentiment is None]
+        if pending:
+            checkpoint = (lambda mention: journal.record_scored(company_id, mention)) if journal else None
+            analyze_mentions(pending, company.name, aliases, checkpoint=checkpoint)
+        dedup.propagate_sentiment(to_score, duplicates)
+        log_info(f"Completed sentiment analysis for {len(mentions)} mentions")
     except Exception as e:
         log_error(f"Error analyzing sentiment: {str(e)}", exc_info=True)
         return {
@@ -104,9 +191,22 @@ def process_company(company_id, article_limit=15):
     
     # 3. Save to database
     try:
-        mentions_added = db.add_mentions(company_id, enriched_mentions)
+        with metrics.timer("db_write"):
+            mentions_added, anomalies = db.add_mentions(company_id, mentions)
+            # Dropped URLs are remembered so the overlap window does not fetch them again
+            kept = {mention.url for mention in mentions}
+            db.add_dropped_urls(company_id, [mention for mention in fetched if mention.url not in kept])
+            db.update_watermark(company_id, fetched)
+        metrics.increment("mentions_stored", mentions_added)
         log_info(f"Added {mentions_added} mentions to the database")
         
+        # Sentiment spikes and shifts detected as the new mentions were stored
+        if anomalies:
+            metrics.increment("sentiment_anomalies", len(anomalies))
+            for event in anomalies:
+                log_warning(f"Sentiment {event['kind']} ({event['direction']}) for {company.name}: "
+                            f"score {event['score']:.2f} vs mean {event['mean']:.2f} - {event['title']}")
+        
         # Ensure database changes are committed
         session = db.get_db()
         try:
@@ -135,27 +235,75 @@ def process_company(company_id, article_limit=15):
         "company_id": company.id,
         "mentions_added": mentions_added,
         "status": "success",
-        "stats": stats
+        "stats": stats,
+        "anomalies": anomalies
     }
 
-def run_all_companies(article_limit=15):
-    """Process all companies in the database."""
-    # Initialize database
-    db.init_db()
+def fetch_window(company_id):
+    """Where to resume fetching for a company.
     
-    # Get all companies
-    companies = db.get_companies()
-    if not companies:
-        log_warning("No companies found in the database.")
-        return {
-            "timestamp": datetime.now().isoformat(),
-            "status": "warning",
-            "message": "No companies found in the database."
-        }
+    Returns:
+        (since, known_urls): the watermark minus WATERMARK_OVERLAP_HOURS (None if
+        the company was never fetched) and the URLs already stored, or dropped
+        as irrelevant, in that overlap
+    """
+    watermark = db.get_watermark(company_id)
+    if not watermark or not watermark.latest_published_at:
+        return None, set()
+    since = watermark.latest_published_at - timedelta(hours=WATERMARK_OVERLAP_HOURS)
+    return since, db.get_recent_urls(company_id, since)
+
+def prefetch_mentions(news_client, companies, article_limit):
+    """Fetch mentions for all companies with batched NewsAPI queries.
+    
+    Returns:
+        Dict of company ID -> mentions. Companies missing from the result are
+        fetched individually by process_company.
+    """
+    try:
+        requests_list = [(company.id, company.name, db.get_company_aliases(company.id)) for company in companies]
+        windows = {company.id: fetch_window(company.id) for company in companies}
+        return news_client.fetch_mentions_batch(
+            requests_list,
+            limit=article_limit,
+            since={key: window[0] for key, window in windows.items()},
+            known_urls={key: window[1] for key, window in windows.items()}
+        )
+    except Exception as e:
+        log_error(f"Error prefetching mentions: {str(e)}", exc_info=True)
+        return {}
+
+def run_companies(companies, article_limit, news_client, journal=None, stop=None):
+    """Process a list of companies, prefetching their mentions in batched queries.
+    
+    Args:
+        companies: Companies to process
+        article_limit: Maximum number of articles per company
+        news_client: NewsClient shared by all companies (None if the API is unavailable)
+        journal: Optional RunJournal; companies it already fetched are not fetched again
+        stop: Optional threading.Event; once set, the remaining companies are skipped
+    
+    Returns:
+        Results of the companies processed, in order (fewer than companies if stopped)
+    """
+    prefetched = {}
+    if NEWSAPI_BATCH_QUERIES and load_api_client():
+        to_fetch = [company for company in companies if not journal or not journal.has_fetched(company.id)]
+        if to_fetch:
+            prefetched = prefetch_mentions(news_client, to_fetch, article_limit)
+            if journal:
+                for company_id, mentions in prefetched.items():
+                    journal.record_fetched(company_id, mentions)
     
     results = []
     for company in companies:
-        result = process_company(company.id, article_limit)
+        # Stop between companies, never in the middle of storing one
+        if stop is not None and stop.is_set():
+            log_info(f"Stop requested, skipping the remaining {len(companies) - len(results)} companies")
+            break
+        # pop: a company's mentions can be freed once it is processed
+        result = process_company(company.id, article_limit, mentions=prefetched.pop(company.id, None),
+                                 news_client=news_client, journal=journal)
         results.append(result)
     
     # Ensure database changes are committed
@@ -169,10 +317,18 @@ def run_all_companies(article_limit=15):
     finally:
         session.close()
     
-    # Generate summary
+    return results
+
+def write_run_report(results, news_client, prometheus_file=None, journal=None):
+    """Summarize processing results and save them to pipeline_run_report.json."""
     successful = sum(1 for r in results if r and r.get("status") == "success")
     skipped = sum(1 for r in results if r and r.get("status") == "skipped")
     total_mentions = sum(r.get("mentions_added", 0) for r in results if r and r.get("status") == "success")
+    anomalies = [
+        dict(event, company_name=r["company_name"])
+        for r in results if r and r.get("status") == "success"
+        for event in r.get("anomalies", [])
+    ]
     
     summary = {
         "timestamp": datetime.now().isoformat(),
@@ -181,16 +337,163 @@ def run_all_companies(article_limit=15):
         "skipped": skipped,
         "failed": len(results) - successful - skipped,
         "total_new_mentions": total_mentions,
-        "details": results
+        "anomalies": anomalies,
+        "newsapi_requests_used": news_client.budget.used if news_client else 0,
+        "run_id": journal.run_id if journal else None,
+        "resumed": journal.resumed if journal else False,
+        "run_status": journal.status if journal else None,
+        "journal_write_errors": journal.write_errors if journal else 0,
+        "details": results,
+        "metrics": metrics.snapshot()
     }
     
     # Save summary to file
-    with open("pipeline_run_report.json", "w") as f:
-        json.dump(summary, f, indent=2)
+    from generate_static_data import write_json_atomic, write_text_atomic
+    write_json_atomic("pipeline_run_report.json", summary, indent=2)
+    if prometheus_file:
+        write_text_atomic(prometheus_file, metrics.prometheus_text())
+        log_info(f"Wrote Prometheus metrics to {prometheus_file}")
+    
+    return summary
+
+def run_maintenance(force_vacuum=False):
+    """Archive old mention bodies and compact the database (see archive.py)."""
+    try:
+        with metrics.timer("db_maintenance"):
+            db.archive_old_mentions()
+            db.prune_dropped_urls()
+            db.compact_database(force_vacuum=force_vacuum)
+    except Exception as e:
+        log_error(f"Error during database maintenance: {str(e)}", exc_info=True)
+
+def run_all_companies(article_limit=15, prometheus_file=None, resume=False):
+    """Process all companies in the database.
+    
+    Every stage is checkpointed in a run journal (see journal.py). The
+    run is closed once every company was processed (as partial if some
+    failed or were skipped, which the next run retries); a run that dies
+    before that can be continued with resume=True.
+    
+    Args:
+        article_limit: Maximum number of articles to process per company
+        prometheus_file: Optional path to also write metrics in Prometheus text format
+        resume: Continue the last unfinished run instead of starting a new one
+    """
+    # Initialize database
+    db.init_db()
+    
+    # Get all companies
+    companies = db.get_companies()
+    if not companies:
+        log_warning("No companies found in the database.")
+        return {
+            "timestamp": datetime.now().isoformat(),
+            "status": "warning",
+            "message": "No companies found in the database."
+        }
+    
+    from journal import RunJournal
+    journal = RunJournal.open(article_limit, resume=resume)
+    
+    news_client = NewsClient(budget=QuotaBudget.from_env()) if load_api_client() else None
+    results = run_companies(companies, article_limit, news_client, journal)
+    stored = set(journal.stored_companies())
+    unfinished = [company.name for company in companies if company.id not in stored]
+    if unfinished:
+        log_warning(f"Pipeline run {journal.run_id} is partial, {len(unfinished)} companies were not stored: "
+                    f"{', '.join(unfinished)}")
+    journal.finish(failed=unfinished)
+    run_maintenance()
+    summary = write_run_report(results, news_client, prometheus_file, journal)
     
-    log_info(f"Pipeline completed. Processed {len(results)} companies, added {total_mentions} new mentions.")
+    log_info(f"Pipeline completed. Processed {len(results)} companies, added {summary['total_new_mentions']} new mentions.")
     return summary
 
+def run_daemon(article_limit=15, prometheus_file=None, max_cycles=None):
+    """Run as a long-lived process, polling each company on its own adaptive schedule.
+    
+    The NewsAPI client (and its HTTP connections), the sentiment analyzer and the
+    database engine stay warm between cycles. Companies added while the daemon
+    runs are picked up on the next refresh. Static data is regenerated after
+    every cycle that stored new mentions.
+    
+    Args:
+        article_limit: Maximum number of articles to process per company and poll
+        prometheus_file: Optional path to also write metrics in Prometheus text format
+        max_cycles: Stop after this many polling cycles (default: run until interrupted)
+    """
+    from scheduler import AdaptiveScheduler
+    from generate_static_data import generate_all_data
+    
+    db.init_db()
+    if not load_api_client():
+        log_error("Daemon mode requires NEWSAPI_KEY and OPENAI_API_KEY")
+        return
+    
+    # Stop cleanly on SIGTERM (e.g. service manager shutdown): the company being
+    # processed is finished and the daemon exits before the next one
+    stop = threading.Event()
+    def handle_sigterm(signum, frame):
+        log_info("SIGTERM received, stopping after the current company")
+        stop.set()
+    signal.signal(signal.SIGTERM, handle_sigterm)
+    
+    scheduler = AdaptiveScheduler()
+    news_client = NewsClient(budget=QuotaBudget.from_env())
+    budget_day = datetime.now().date()
+    last_refresh = None
+    cycles = 0
+    
+    log_info("Daemon started")
+    try:
+        while (max_cycles is None or cycles < max_cycles) and not stop.is_set():
+            now = datetime.now()
+            
+            # Pick up added and removed companies
+            if last_refresh is None or (now - last_refresh).total_seconds() >= DAEMON_REFRESH_SECONDS:
+                company_ids = {company.id for company in db.get_companies()}
+                for company_id in company_ids - set(scheduler.schedules):
+                    scheduler.add(company_id)
+                for company_id in set(scheduler.schedules) - company_ids:
+                    scheduler.remove(company_id)
+                last_refresh = now
+            
+            # The request budget applies per day in daemon mode; maintenance runs daily too
+            if now.date() != budget_day:
+                news_client.budget = QuotaBudget.from_env()
+                budget_day = now.date()
+                run_maintenance()
+            
+            due = scheduler.pop_due(now)
+            if not due:
+                next_due = scheduler.next_due_time()
+                wait = DAEMON_REFRESH_SECONDS if next_due is None else (next_due - now).total_seconds()
+                stop.wait(min(max(wait, 1), DAEMON_REFRESH_SECONDS))
+                continue
+            
+            # Each cycle's report and Prometheus output cover that cycle only
+            cycles += 1
+            metrics.reset()
+            companies = [company for company in (db.get_company(cid) for cid in due) if company]
+            log_info(f"Daemon cycle {cycles}: polling {len(companies)} companies")
+            results = run_companies(companies, article_limit, news_client, stop=stop)
+            
+            for company, result in zip(companies, results):
+                if result and result.get("status") == "success":
+                    avg_score = result.get("stats", {}).get("AVG_SCORE")
+                    next_run = scheduler.record_poll(company.id, result.get("mentions_added", 0), avg_score)
+                    log_info(f"Next poll for {company.name} at {next_run:%Y-%m-%d %H:%M}")
+                else:
+                    scheduler.postpone(company.id)
+            
+            summary = write_run_report(results, news_client, prometheus_file)
+            if summary["total_new_mentions"]:
+                generate_all_data()
+    except KeyboardInterrupt:
+        log_info("Daemon interrupted, shutting down")
+    
+    log_info(f"Daemon stopped after {cycles} cycles")
+
 def add_new_company(name, aliases):
     """Add a new company to track."""
     # Initialize database
@@ -215,11 +518,16 @@ if __name__ == "__main__":
     parser.add_argument("--aliases", type=str, help="Company aliases, comma-separated (for --add)")
     parser.add_argument("--limit", type=int, default=15, help="Limit the number of articles to process (default: 10)")
     parser.add_argument("--generate-only", action="store_true", help="Skip API calls and only generate static data")
+    parser.add_argument("--daemon", action="store_true", help="Keep running and poll each company on an adaptive schedule")
+    parser.add_argument("--max-cycles", type=int, help="Stop the daemon after this many polling cycles")
+    parser.add_argument("--prometheus", type=str, help="Also write run metrics in Prometheus text format to this file")
+    parser.add_argument("--resume", action="store_true", help="With --all, continue the last run that did not finish")
+    parser.add_argument("--compact", action="store_true", help="Archive old mention bodies and VACUUM the database")
     
     args = parser.parse_args()
     
     # If no arguments are provided, default to --all
-    if not any([args.company, args.all, args.add, args.generate_only]):
+    if not any([args.company, args.all, args.add, args.generate_only, args.daemon, args.compact]):
         args.all = True
     
     if args.generate_only:
@@ -233,12 +541,19 @@ if __name__ == "__main__":
             aliases = args.aliases.split(",") if args.aliases else []
             add_new_company(args.name, aliases)
     
+    elif args.compact:
+        db.init_db()
+        run_maintenance(force_vacuum=True)
+    
+    elif args.daemon:
+        run_daemon(args.limit, prometheus_file=args.prometheus, max_cycles=args.max_cycles)
+    
     elif args.company:
         result = process_company(args.company, args.limit)
         log_info(json.dumps(result, indent=2))
     
     elif args.all:
-        run_all_companies(args.limit)
+        run_all_companies(args.limit, prometheus_file=args.prometheus, resume=args.resume)
     
     else:
         # List all companies
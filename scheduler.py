@@ -0,0 +1,131 @@
+"""
+Adaptive per-company polling for the daemon mode of runner.py.
+Busy or volatile companies are polled often, quiet ones rarely.
+"""
+
+import heapq
+import os
+from datetime import datetime, timedelta
+
+# Polling interval bounds
+POLL_MIN_MINUTES = float(os.getenv("POLL_MIN_MINUTES", "15"))
+POLL_MAX_MINUTES = float(os.getenv("POLL_MAX_MINUTES", str(24 * 60)))
+
+# Aim for roughly this many new mentions per poll
+TARGET_MENTIONS_PER_POLL = float(os.getenv("POLL_TARGET_MENTIONS", "5"))
+
+# How strongly sentiment volatility shortens the interval
+VOLATILITY_WEIGHT = float(os.getenv("POLL_VOLATILITY_WEIGHT", "10"))
+
+# Smoothing factor for the rate and volatility averages
+EWMA_ALPHA = 0.3
+
+class CompanySchedule:
+    """Polling state of one company."""
+
+    def __init__(self, company_id, next_run):
+        self.company_id = company_id
+        self.next_run = next_run
+        self.last_run = None
+        self.interval = timedelta(minutes=POLL_MIN_MINUTES)
+        self.mention_rate = None   # New mentions per hour (EWMA)
+        self.volatility = 0.0      # Absolute change of the average score per poll (EWMA)
+        self.last_avg_score = None
+
+    def __repr__(self):
+        return f"<CompanySchedule(company_id={self.company_id}, next_run='{self.next_run}', interval='{self.interval}')>"
+
+class AdaptiveScheduler:
+    """Priority queue of companies keyed by their next poll time."""
+
+    def __init__(self):
+        self.schedules = {}
+        self.queue = []
+
+    def add(self, company_id, when=None):
+        """Start tracking a company (due immediately unless `when` is given)."""
+        if company_id in self.schedules:
+            return
+        schedule = CompanySchedule(company_id, when or datetime.now())
+        self.schedules[company_id] = schedule
+        heapq.heappush(self.queue, (schedule.next_run, company_id))
+
+    def remove(self, company_id):
+        """Stop tracking a company; its queue entry is skipped lazily."""
+        self.schedules.pop(company_id, None)
+
+    def next_due_time(self):
+        """Time at which the next company becomes due (None if nothing is scheduled)."""
+        while self.queue and self.queue[0][1] not in self.schedules:
+            heapq.heappop(self.queue)
+        return self.queue[0][0] if self.queue else None
+
+    def pop_due(self, now=None):
+        """Remove and return the IDs of all companies due at `now`."""
+        now = now or datetime.now()
+        due = []
+        while self.queue and self.queue[0][0] <= now:
+            next_run, company_id = heapq.heappop(self.queue)
+            schedule = self.schedules.get(company_id)
+            if schedule and schedule.next_run == next_run:
+                due.append(company_id)
+        return due
+
+    def record_poll(self, company_id, new_mentions, avg_score=None, now=None):
+        """Update a company's statistics after a poll and schedule its next one.
+
+        Args:
+            company_id: The polled company
+            new_mentions: Number of new mentions stored by this poll
+            avg_score: The company's average sentiment score after the poll
+            now: Time of the poll (default: now)
+
+        Returns:
+            The company's next poll time
+        """
+        schedule = self.schedules.get(company_id)
+        if schedule is None:
+            return None
+        now = now or datetime.now()
+
+        if schedule.last_run:
+            hours = max((now - schedule.last_run).total_seconds() / 3600, 1 / 60)
+            rate = new_mentions / hours
+            if schedule.mention_rate is None:
+                schedule.mention_rate = rate
+            else:
+                schedule.mention_rate = EWMA_ALPHA * rate + (1 - EWMA_ALPHA) * schedule.mention_rate
+
+        if avg_score is not None:
+            if schedule.last_avg_score is not None:
+                change = abs(avg_score - schedule.last_avg_score)
+                schedule.volatility = EWMA_ALPHA * change + (1 - EWMA_ALPHA) * schedule.volatility
+            schedule.last_avg_score = avg_score
+
+        schedule.last_run = now
+        schedule.interval = self.compute_interval(schedule)
+        schedule.next_run = now + schedule.interval
+        heapq.heappush(self.queue, (schedule.next_run, company_id))
+        return schedule.next_run
+
+    def postpone(self, company_id, minutes=POLL_MIN_MINUTES, now=None):
+        """Retry a company after a failed poll without changing its statistics."""
+        schedule = self.schedules.get(company_id)
+        if schedule is None:
+            return None
+        schedule.next_run = (now or datetime.now()) + timedelta(minutes=minutes)
+        heapq.heappush(self.queue, (schedule.next_run, company_id))
+        return schedule.next_run
+
+    @staticmethod
+    def compute_interval(schedule):
+        """Interval that yields about TARGET_MENTIONS_PER_POLL new mentions, shortened by volatility."""
+        if schedule.mention_rate is None:
+            # Not enough history yet: poll again at the minimum interval
+            minutes = POLL_MIN_MINUTES
+        elif schedule.mention_rate <= 0:
+            minutes = POLL_MAX_MINUTES
+        else:
+            minutes = TARGET_MENTIONS_PER_POLL / schedule.mention_rate * 60
+        minutes /= 1 + VOLATILITY_WEIGHT * schedule.volatility
+        return timedelta(minutes=min(max(minutes, POLL_MIN_MINUTES), POLL_MAX_MINUTES))
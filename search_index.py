@@ -0,0 +1,277 @@
+"""
+Full-text search over mention titles and content (SQLite FTS5), and the dashboard's exported index.
+Usage: python search_index.py "profit warning" --company 1 --since 2024-01-01
+"""
+
+import argparse
+import os
+import re
+import unicodedata
+from datetime import datetime
+
+from sqlalchemy import DateTime, Float, Integer, String, bindparam, text
+from sqlalchemy.exc import OperationalError
+
+from logger import log_info, log_warning
+
+# Set SEARCH_INDEX_ENABLED=0 to skip the FTS table (e.g. SQLite builds without FTS5)
+SEARCH_INDEX_ENABLED = os.getenv("SEARCH_INDEX_ENABLED", "1") != "0"
+
+# Weight of title matches relative to content matches in the ranking
+TITLE_WEIGHT = float(os.getenv("SEARCH_TITLE_WEIGHT", "5"))
+
+# Tokens of context in result snippets
+SNIPPET_TOKENS = 16
+
+# Exported terms found in more than this share of a company's mentions are left
+# out of the dashboard index (they match almost everything)
+EXPORT_MAX_TERM_SHARE = float(os.getenv("SEARCH_EXPORT_MAX_TERM_SHARE", "0.5"))
+
+# unicode61 without stemming, so the dashboard can tokenize queries the same way
+CREATE_FTS = (
+    "CREATE VIRTUAL TABLE mentions_fts USING fts5("
+    "title, content, content='mentions', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')"
+)
+
+INDEX_ROWS = "INSERT INTO mentions_fts(rowid, title, content) VALUES (:id, :title, :content)"
+UNINDEX_ROWS = ("INSERT INTO mentions_fts(mentions_fts, rowid, title, content) "
+                "VALUES ('delete', :id, :title, :content)")
+
+TOKEN_RE = re.compile(r"[^\W_]+")
+QUERY_RE = re.compile(r'"([^"]*)"|(\S+)')
+
+# Whether mentions_fts exists in the database (checked once per process)
+_available = None
+
+def tokenize(value):
+    """Lower-cased, accent-free word tokens, as the FTS tokenizer splits them."""
+    value = (value or "").lower()
+    if not value.isascii():
+        value = "".join(c for c in unicodedata.normalize("NFKD", value) if not unicodedata.combining(c))
+    return TOKEN_RE.findall(value)
+
+def ensure_index(engine, archived_rows=None):
+    """Create mentions_fts and index the stored mentions if it does not exist yet.
+
+    Args:
+        engine: Database engine
+        archived_rows: Optional callable(connection) yielding dicts with the id,
+            title and archived body of mentions whose content is NULL
+
+    Returns:
+        True if the search index is available
+    """
+    global _available
+    if not SEARCH_INDEX_ENABLED or engine.dialect.name != "sqlite":
+        _available = False
+        return False
+
+    try:
+        with engine.begin() as connection:
+            exists = connection.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'mentions_fts'")
+            ).first()
+            if not exists:
+                connection.execute(text(CREATE_FTS))
+                connection.execute(text("INSERT INTO mentions_fts(mentions_fts) VALUES ('rebuild')"))
+                # 'rebuild' reads mentions.content, which is NULL for archived bodies
+                if archived_rows:
+                    for row in archived_rows(connection):
+                        connection.execute(text(UNINDEX_ROWS), dict(row, content=None))
+                        connection.execute(text(INDEX_ROWS), row)
+                log_info("Created the mentions_fts search index")
+        _available = True
+    except OperationalError as e:
+        log_warning(f"Full-text search is not available: {e}")
+        _available = False
+    return _available
+
+def is_available(session):
+    """Whether the search index can be used with this session's database."""
+    global _available
+    if _available is None:
+        if not SEARCH_INDEX_ENABLED or session.get_bind().dialect.name != "sqlite":
+            _available = False
+        else:
+            _available = session.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'mentions_fts'")
+            ).first() is not None
+    return _available
+
+def index_rows(session, rows):
+    """Add mentions to the index (caller commits).
+
+    Args:
+        session: Database session
+        rows: Dicts with id, title and content, exactly as stored
+    """
+    if rows and is_available(session):
+        session.execute(text(INDEX_ROWS), rows)
+
+def unindex_rows(session, rows):
+    """Remove mentions from the index (caller commits).
+
+    External-content FTS tables need the values that were indexed, so rows
+    must carry the stored title and content from before any update.
+    """
+    if rows and is_available(session):
+        session.execute(text(UNINDEX_ROWS), rows)
+
+def optimize(connection):
+    """Merge the index's b-tree segments (part of database compaction)."""
+    global _available
+    if _available is None:
+        _available = connection.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'mentions_fts'"
+        ).first() is not None
+    if _available:
+        connection.exec_driver_sql("INSERT INTO mentions_fts(mentions_fts) VALUES ('optimize')")
+
+def match_expression(query):
+    """FTS5 MATCH expression for a user query.
+
+    Words are matched exactly and combined with AND; "quoted text" matches
+    a phrase and a trailing * matches a prefix. Punctuation is ignored, so
+    user input never produces an FTS syntax error.
+
+    Returns:
+        The expression, or None if the query has no searchable words
+    """
+    parts = []
+    for phrase, word in QUERY_RE.findall(query or ""):
+        if phrase:
+            tokens = tokenize(phrase)
+            if tokens:
+                parts.append('"' + " ".join(tokens) + '"')
+            continue
+        tokens = tokenize(word)
+        for i, token in enumerate(tokens):
+            prefix = word.endswith("*") and i == len(tokens) - 1
+            parts.append(f'"{token}"' + ("*" if prefix else ""))
+    return " ".join(parts) or None
+
+def make_snippet(value, tokens, size=SNIPPET_TOKENS):
+    """Snippet around the first query token in a text, like FTS5's snippet() (None if no token occurs)."""
+    words = value.split()
+    wanted = set(tokens)
+    for i, word in enumerate(words):
+        if set(tokenize(word)) & wanted:
+            start = max(0, i - size // 2)
+            shown = [f"[{w}]" if set(tokenize(w)) & wanted else w for w in words[start:start + size]]
+            return ("..." if start else "") + " ".join(shown) + ("..." if start + size < len(words) else "")
+    return None
+
+def search(session, query, company_id=None, since=None, until=None, limit=20, load_archived=None):
+    """Ranked full-text search over mentions.
+
+    Args:
+        session: Database session
+        query: Search text (see match_expression)
+        company_id: Optional company filter
+        since: Optional earliest published_at (datetime)
+        until: Optional latest published_at (datetime)
+        limit: Maximum number of results
+        load_archived: Optional callable(mention_ids) -> dict of ID -> archived body
+
+    Returns:
+        List of dicts with the mention's id, company_id, title, url, source,
+        published_at, sentiment, sentiment_score, a snippet with the matches
+        in [brackets], and rank (lower is better)
+    """
+    expression = match_expression(query)
+    if not expression:
+        return []
+    if not is_available(session):
+        log_warning("Search index is not available, no results returned")
+        return []
+
+    conditions = ["mentions_fts MATCH :expression"]
+    params = [bindparam("expression", expression), bindparam("limit", limit, type_=Integer)]
+    if company_id is not None:
+        conditions.append("m.company_id = :company_id")
+        params.append(bindparam("company_id", company_id, type_=Integer))
+    if since is not None:
+        conditions.append("m.published_at >= :since")
+        params.append(bindparam("since", since, type_=DateTime))
+    if until is not None:
+        conditions.append("m.published_at <= :until")
+        params.append(bindparam("until", until, type_=DateTime))
+
+    statement = text(
+        "SELECT m.id, m.company_id, m.title, m.url, m.source, m.published_at, m.sentiment, "
+        "m.sentiment_score, "
+        f"snippet(mentions_fts, -1, '[', ']', '...', {SNIPPET_TOKENS}) AS snippet, "
+        f"bm25(mentions_fts, {TITLE_WEIGHT}, 1.0) AS rank, "
+        "m.content IS NULL AS archived "
+        "FROM mentions_fts JOIN mentions m ON m.id = mentions_fts.rowid "
+        f"WHERE {' AND '.join(conditions)} "
+        "ORDER BY rank LIMIT :limit"
+    ).bindparams(*params).columns(
+        id=Integer, company_id=Integer, title=String, url=String, source=String,
+        published_at=DateTime, sentiment=String, sentiment_score=Float, snippet=String, rank=Float
+    )
+    results = [dict(row._mapping) for row in session.execute(statement)]
+
+    archived_ids = [result["id"] for result in results if result.pop("archived")]
+    if archived_ids and load_archived:
+        bodies = load_archived(archived_ids)
+        tokens = tokenize(expression)
+        for result in results:
+            if result["id"] in bodies:
+                result["snippet"] = make_snippet(bodies[result["id"]], tokens) or result["snippet"]
+    return results
+
+def build_export_index(texts):
+    """Compact inverted index of a company's mentions for the static dashboard.
+
+    Args:
+        texts: (title, content) pairs in the order of the exported mention pages
+
+    Returns:
+        Dict with docs (row count), terms (sorted), postings (per term, the
+        delta-encoded rows containing it) and common (terms left out because
+        they occur in more than EXPORT_MAX_TERM_SHARE of the rows)
+    """
+    postings = {}
+    docs = 0
+    for row, (title, content) in enumerate(texts):
+        docs += 1
+        for term in set(tokenize(title)) | set(tokenize(content)):
+            if len(term) > 1:
+                postings.setdefault(term, []).append(row)
+
+    max_rows = max(1, int(docs * EXPORT_MAX_TERM_SHARE)) if docs >= 20 else docs
+    terms, encoded, common = [], [], []
+    for term in sorted(postings):
+        rows = postings[term]
+        if len(rows) > max_rows:
+            common.append(term)
+            continue
+        terms.append(term)
+        encoded.append([rows[0]] + [b - a for a, b in zip(rows, rows[1:])])
+    return {"version": 1, "docs": docs, "terms": terms, "postings": encoded, "common": common}
+
+def main():
+    import db
+
+    parser = argparse.ArgumentParser(description="Search stored mentions")
+    parser.add_argument("query", help='Words to search for ("quoted phrase", prefix*)')
+    parser.add_argument("--company", type=int, help="Only mentions of this company ID")
+    parser.add_argument("--since", type=datetime.fromisoformat, help="Published on or after (YYYY-MM-DD)")
+    parser.add_argument("--until", type=datetime.fromisoformat, help="Published on or before (YYYY-MM-DD)")
+    parser.add_argument("--limit", type=int, default=20, help="Maximum number of results (default: 20)")
+    args = parser.parse_args()
+
+    db.init_db()
+    results = db.search_mentions(args.query, company_id=args.company, since=args.since,
+                                 until=args.until, limit=args.limit)
+    for result in results:
+        published = result["published_at"].strftime("%Y-%m-%d") if result["published_at"] else "----------"
+        print(f"{published}  {result['sentiment']:<8}  {result['title']}")
+        print(f"            {result['snippet']}")
+        print(f"            {result['url']}")
+    print(f"{len(results)} results")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+import itertools
+import os
+import sys
+import tempfile
+
+# db.py creates its engine on import, so point it at a scratch database first
+_tmp_dir = tempfile.mkdtemp(prefix="company_tracker_tests_")
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(_tmp_dir, "test.db")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+import db
+
+_company_numbers = itertools.count(1)
+
+
+@pytest.fixture(scope="session", autouse=True)
+def database():
+    db.init_db()
+    yield
+    db.db_session.remove()
+
+
+@pytest.fixture
+def make_company():
+    """Create a company with a unique name and return its ID."""
+    def make(name="Acme"):
+        return db.add_company(f"{name} {next(_company_numbers)}", []).id
+    return make
@@ -0,0 +1,65 @@
+import anomaly
+import db
+from anomaly import ANOMALY_WARMUP, DetectorState
+from records import MentionRecord
+
+
+def warmed_up(count=40):
+    """A detector that has seen scores alternating around 0."""
+    state = DetectorState()
+    for i in range(count):
+        assert anomaly.update(state, 0.1 if i % 2 else -0.1) == []
+    return state
+
+
+def test_no_events_during_warmup():
+    state = DetectorState()
+    for i in range(ANOMALY_WARMUP):
+        assert anomaly.update(state, 1.0 if i % 2 else -1.0) == []
+    assert state.count == ANOMALY_WARMUP
+
+
+def test_single_outlier_is_a_spike():
+    state = warmed_up()
+
+    events = anomaly.update(state, -0.9)
+
+    assert events[0]["kind"] == "spike" and events[0]["direction"] == "down"
+    assert events[0]["zscore"] <= -anomaly.ANOMALY_Z_THRESHOLD
+
+
+def test_sustained_drift_is_a_cusum_shift():
+    state = warmed_up()
+
+    # Each score is well within the spike threshold, but together they add up
+    events = []
+    for _ in range(10):
+        events = anomaly.update(state, 0.2)
+        if events:
+            break
+
+    assert [(event["kind"], event["direction"]) for event in events] == [("shift", "up")]
+    assert abs(events[0]["zscore"]) < anomaly.ANOMALY_Z_THRESHOLD
+    assert state.cusum_pos == state.cusum_neg == 0.0
+
+
+def test_detector_counts_each_story_once_and_skips_unscored(make_company):
+    company_id = make_company()
+    story = MentionRecord("Story", "Text", "https://wire.example/story")
+    story.set_sentiment("POSITIVE", 0.5)
+    copy = MentionRecord("Story", "Text", "https://mirror.example/story")
+    copy.set_sentiment("POSITIVE", 0.5)
+    copy.cluster_key = story.url
+    unscored = MentionRecord("Other", "Text", "https://wire.example/other")
+
+    count, anomalies = db.add_mentions(company_id, [story, copy, unscored])
+
+    # A later copy of a story already stored for the company is not counted either
+    later = MentionRecord("Story", "Text", "https://later.example/story")
+    later.set_sentiment("POSITIVE", 0.5)
+    later.cluster_key = story.url
+    db.add_mentions(company_id, [later])
+
+    detector = db.get_db().query(db.SentimentDetector).filter_by(company_id=company_id).one()
+    assert (count, anomalies) == (3, [])
+    assert detector.count == 1
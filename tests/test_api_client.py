@@ -0,0 +1,66 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import api_client
+import metrics
+
+TOKYO = timezone(timedelta(hours=9))
+NOW = datetime(2026, 10, 19, 20, 0, tzinfo=timezone.utc)  # Already the 20th in Tokyo
+
+
+class TokyoHostDatetime(datetime):
+    """datetime on a host whose local clock is 9 hours ahead of UTC."""
+
+    @classmethod
+    def now(cls, tz=None):
+        return NOW.astimezone(tz) if tz else NOW.astimezone(TOKYO).replace(tzinfo=None)
+
+    @classmethod
+    def utcnow(cls):
+        return NOW.replace(tzinfo=None)
+
+
+def test_date_range_uses_utc_on_any_host(monkeypatch):
+    monkeypatch.setattr(api_client, "datetime", TokyoHostDatetime)
+    since = datetime(2026, 10, 19, 17, 30)  # Watermarks are naive UTC
+
+    assert api_client.date_range(7, since) == ("2026-10-19T17:30:00", None)
+    # A watermark older than the window falls back to whole UTC days
+    assert api_client.date_range(7, since - timedelta(days=8)) == ("2026-10-12", "2026-10-19")
+
+
+class FakeResponse:
+    headers = {"Content-Type": "text/html"}
+    encoding = None
+
+    def __init__(self, body):
+        self.body = body
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_size):
+        for start in range(0, len(self.body), chunk_size):
+            yield self.body[start:start + chunk_size]
+
+
+@pytest.mark.parametrize("size, truncated", [(10, False), (11, True), (25, True)])
+def test_download_counts_only_pages_with_data_past_the_cap(monkeypatch, size, truncated):
+    monkeypatch.setattr(api_client, "MAX_DOWNLOAD_BYTES", 10)
+    monkeypatch.setattr(api_client, "DOWNLOAD_CHUNK_SIZE", 5)
+    monkeypatch.setattr(api_client, "REQUEST_DELAY_MAX", 0)
+    client = api_client.NewsClient()
+    monkeypatch.setattr(client.session, "get", lambda url, **kwargs: FakeResponse(b"x" * size))
+    metrics.reset()
+
+    content, _ = client.download_article("https://news.example/page")
+
+    assert content == b"x" * min(size, 10)
+    assert metrics.snapshot()["counters"].get("articles_truncated", 0) == int(truncated)
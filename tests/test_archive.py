@@ -0,0 +1,40 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+import db
+from records import MentionRecord
+
+BODY = "The zeppelin maker reported record orders for its airships this quarter. " * 20
+
+
+def store_old_mention(company_id, url):
+    mention = MentionRecord("Airship orders", BODY, url, published_at=datetime.now() - timedelta(days=400))
+    mention.set_sentiment("POSITIVE", 0.6)
+    db.add_mentions(company_id, [mention])
+
+
+def test_archived_body_reads_back_through_get_mentions(make_company):
+    company_id = make_company()
+    store_old_mention(company_id, "https://news.example/airships")
+
+    assert db.archive_old_mentions(older_than_days=30) >= 1
+
+    [mention] = db.get_mentions(company_id)
+    assert mention.content is None
+    assert mention.full_content == BODY
+    assert list(db.iter_mention_texts(company_id)) == [("Airship orders", BODY)]
+
+
+def test_rebuilt_search_index_includes_archived_bodies(make_company):
+    company_id = make_company()
+    store_old_mention(company_id, "https://news.example/airships-rebuild")
+    db.archive_old_mentions(older_than_days=30)
+
+    with db.engine.begin() as connection:
+        connection.execute(text("DROP TABLE mentions_fts"))
+    db.init_db()
+
+    results = db.search_mentions("zeppelin", company_id=company_id)
+    assert [result["url"] for result in results] == ["https://news.example/airships-rebuild"]
+    assert "[zeppelin]" in results[0]["snippet"]
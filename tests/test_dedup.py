@@ -0,0 +1,44 @@
+import db
+import dedup
+from records import MentionRecord
+
+STORY = " ".join(
+    f"Shares of the two partners moved sharply on day {i} after the joint venture reported results"
+    for i in range(8)
+)
+
+
+def make_mention(url, content=STORY):
+    return MentionRecord(title="Joint venture results", content=content, url=url, source="Wire")
+
+
+def store_scored(company_id, mention, label, score):
+    to_score, _ = dedup.cluster_mentions([mention], db.find_near_duplicate, company_id)
+    for scored in to_score:
+        scored.set_sentiment(label, score)
+    db.add_mentions(company_id, [mention])
+
+
+def test_stored_copy_of_same_company_reuses_sentiment(make_company):
+    company_id = make_company()
+    store_scored(company_id, make_mention("https://wire.example/a"), "POSITIVE", 0.8)
+
+    copy = make_mention("https://mirror.example/a")
+    to_score, duplicates = dedup.cluster_mentions([copy], db.find_near_duplicate, company_id)
+
+    assert duplicates == [copy] and to_score == []
+    assert copy.cluster_key == "https://wire.example/a"
+    assert (copy.sentiment, copy.sentiment_score) == ("POSITIVE", 0.8)
+
+
+def test_syndicated_story_shared_by_two_companies_is_scored_for_each(make_company):
+    first, second = make_company("First"), make_company("Second")
+    store_scored(first, make_mention("https://wire.example/b"), "NEGATIVE", -0.7)
+
+    copy = make_mention("https://mirror.example/b")
+    to_score, duplicates = dedup.cluster_mentions([copy], db.find_near_duplicate, second)
+
+    # The other company's score and cluster must not leak into this company
+    assert to_score == [copy] and duplicates == []
+    assert copy.sentiment is None
+    assert copy.cluster_key == "https://mirror.example/b"
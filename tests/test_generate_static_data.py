@@ -0,0 +1,36 @@
+import json
+import os
+from datetime import datetime
+
+import db
+import generate_static_data
+from records import MentionRecord
+
+
+def test_each_export_is_a_separate_generation(monkeypatch, tmp_path, make_company):
+    monkeypatch.setattr(generate_static_data, "data_dir", str(tmp_path))
+    make_company()
+    (tmp_path / "company_999.json").write_text("{}")  # Left by an export before generation directories
+
+    for _ in range(3):
+        generate_static_data.generate_all_data()
+
+    manifest = json.loads((tmp_path / "manifest.json").read_text())
+    assert all(name.startswith(manifest["path"]) for name in manifest["files"])
+    assert all((tmp_path / name).exists() for name in manifest["files"])
+    assert len(os.listdir(tmp_path / "generations")) == generate_static_data.GENERATIONS_KEPT
+    assert not (tmp_path / "company_999.json").exists()
+
+
+def test_unscored_mentions_are_left_out_of_the_timeline(monkeypatch, tmp_path, make_company):
+    monkeypatch.setattr(generate_static_data, "data_dir", str(tmp_path))
+    company_id = make_company()
+    scored = MentionRecord("Scored", "Text", "https://news.example/scored", published_at=datetime(2026, 1, 1))
+    scored.set_sentiment("POSITIVE", 0.8)
+    unscored = MentionRecord("Unscored", "Text", "https://news.example/unscored", published_at=datetime(2026, 1, 2))
+    db.add_mentions(company_id, [scored, unscored])
+
+    data = generate_static_data.generate_company_data(company_id)
+
+    assert data["timeline_points_total"] == 1
+    assert data["stats"]["AVG_SCORE"] == 0.8
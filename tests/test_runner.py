@@ -0,0 +1,86 @@
+import itertools
+import json
+from datetime import datetime
+
+import pytest
+
+import db
+import relevance
+import runner
+from records import MentionRecord
+
+_articles = itertools.count(1)
+
+
+class FakeNewsClient:
+    """NewsClient stand-in: one new article per company per fetch, and one company always fails."""
+
+    fetched = []
+    known_urls = {}
+
+    def __init__(self, budget=None):
+        self.budget = budget
+
+    def fetch_mentions(self, company_name, aliases, limit=15, since=None, known_urls=None):
+        FakeNewsClient.fetched.append(company_name)
+        FakeNewsClient.known_urls[company_name] = set(known_urls or ())
+        if company_name.startswith("Broken"):
+            raise RuntimeError("NewsAPI error")
+        number = next(_articles)
+        return [MentionRecord(f"{company_name} news {number}", f"{company_name} reported results.",
+                              f"https://news.example/{number}", published_at=datetime.now())]
+
+
+class FakeBudget:
+    used = 0
+
+    @classmethod
+    def from_env(cls):
+        return cls()
+
+
+def fake_analyze(mentions, company_name, aliases=None, checkpoint=None):
+    for mention in mentions:
+        mention.set_sentiment("POSITIVE", 0.5)
+
+
+@pytest.fixture
+def pipeline(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)  # The run report is written to the working directory
+    monkeypatch.setattr(runner, "load_api_client", lambda: True)
+    monkeypatch.setattr(runner, "NewsClient", FakeNewsClient, raising=False)
+    monkeypatch.setattr(runner, "QuotaBudget", FakeBudget, raising=False)
+    monkeypatch.setattr(runner, "analyze_mentions", fake_analyze, raising=False)
+    monkeypatch.setattr(runner, "NEWSAPI_BATCH_QUERIES", False)
+    monkeypatch.setattr(relevance, "filter_mentions", lambda mentions, matcher, company_id: mentions)
+    FakeNewsClient.fetched = []
+    FakeNewsClient.known_urls = {}
+
+
+def test_failing_company_does_not_block_later_resumed_runs(pipeline, make_company):
+    good = db.get_company(make_company("Good"))
+    broken = db.get_company(make_company("Broken"))
+
+    first = runner.run_all_companies(resume=True)
+    FakeNewsClient.fetched = []
+    second = runner.run_all_companies(resume=True)
+
+    assert first["run_status"] == second["run_status"] == "partial"
+    assert second["run_id"] != first["run_id"] and not second["resumed"]
+    assert good.name in FakeNewsClient.fetched and broken.name in FakeNewsClient.fetched
+    assert len(db.get_mentions(good.id)) == 2
+    assert db.get_unfinished_run() is None
+    assert json.loads(db.get_db().get(db.PipelineRun, first["run_id"]).failed) == [broken.name]
+
+
+def test_mentions_dropped_as_irrelevant_are_not_fetched_again(pipeline, monkeypatch, make_company):
+    company = db.get_company(make_company("Passing"))
+    monkeypatch.setattr(relevance, "filter_mentions", lambda mentions, matcher, company_id: [])
+
+    runner.run_all_companies()
+    dropped_url = db.get_db().query(db.DroppedUrl.url).filter_by(company_id=company.id).scalar()
+    runner.run_all_companies()
+
+    assert dropped_url and db.get_mentions(company.id) == []
+    assert dropped_url in runner.fetch_window(company.id)[1]
+    assert dropped_url in FakeNewsClient.known_urls[company.name]
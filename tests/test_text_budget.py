@@ -0,0 +1,38 @@
+import api_client
+import text_budget
+from text_budget import build_sentiment_input, company_pattern, estimate_tokens
+
+TITLE = "Acme recalls its flagship blender"
+FILLER = "The weather in the region stayed mild for most of the week and traffic was light."
+MENTION = "Acme said the recall covers every blender sold since March."
+
+
+def long_body(sentences=200):
+    body = [FILLER] * sentences
+    body[150] = MENTION  # Far beyond the first few thousand characters
+    return " ".join(body)
+
+
+def test_input_keeps_title_and_fits_budget():
+    text = build_sentiment_input(TITLE, long_body(), company_pattern("Acme"), max_tokens=60)
+
+    assert text.startswith(TITLE)
+    assert MENTION in text
+    assert estimate_tokens(text) <= 60
+
+
+def test_analyze_sentiment_selects_once_from_full_body(monkeypatch):
+    sent = []
+    monkeypatch.setattr(api_client, "get_sentiment_analyzer",
+                        lambda: lambda text: sent.append(text) or {"label": "NEGATIVE", "score": -0.5})
+    calls = []
+    select = text_budget.select_sentences
+    monkeypatch.setattr(text_budget, "select_sentences", lambda *a, **k: calls.append(a) or select(*a, **k))
+    monkeypatch.setattr(api_client, "select_sentences", text_budget.select_sentences)
+
+    body = long_body()
+    result = api_client.analyze_sentiment(body, company_pattern("Acme"), title=TITLE)
+
+    assert result["label"] == "NEGATIVE"
+    assert sent[0].startswith(TITLE) and MENTION in sent[0]
+    assert len(calls) == 1 and calls[0][0] is body
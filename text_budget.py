@@ -0,0 +1,93 @@
+"""
+Token budgeting for sentiment analysis inputs.
+Selects the sentences with the most signal about a company until a token budget is used.
+"""
+
+import os
+import re
+
+from query_planner import CompanyQuery
+
+# Tokens of article text sent per sentiment request (title included)
+SENTIMENT_TOKEN_BUDGET = int(os.getenv("SENTIMENT_TOKEN_BUDGET", "300"))
+
+# Only this many characters of a body are scanned for sentences
+MAX_SCAN_CHARS = int(os.getenv("SENTIMENT_MAX_SCAN_CHARS", "20000"))
+
+# Opening sentences that get a bonus (they usually summarize the story)
+LEAD_SENTENCES = 3
+
+# Shorter fragments (captions, bylines) are skipped
+MIN_SENTENCE_CHARS = 20
+
+# Rough characters per token for English text with GPT tokenizers
+CHARS_PER_TOKEN = 4
+
+SENTENCE_RE = re.compile(r"[^.!?\n]+(?:[.!?]+|$)", re.MULTILINE)
+
+def estimate_tokens(text):
+    """Approximate token count of a text."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+def company_pattern(name, aliases=None):
+    """Whole-word pattern matching a company's name or aliases (None if there are none)."""
+    if not name:
+        return None
+    return CompanyQuery(None, name, aliases).pattern
+
+def select_sentences(text, pattern=None, max_tokens=SENTIMENT_TOKEN_BUDGET):
+    """Pick the highest-signal sentences of a text within a token budget.
+
+    Args:
+        text: Article body
+        pattern: Compiled company pattern from company_pattern()
+        max_tokens: Token budget for the selected sentences
+
+    Returns:
+        The selected sentences in their original order, joined by spaces
+    """
+    if not text or max_tokens <= 0:
+        return ""
+
+    sentences = []
+    mentions = set()
+    for match in SENTENCE_RE.finditer(text, 0, MAX_SCAN_CHARS):
+        sentence = match.group().strip()
+        if len(sentence) < MIN_SENTENCE_CHARS:
+            continue
+        if pattern is not None and pattern.search(sentence):
+            mentions.add(len(sentences))
+        sentences.append(sentence)
+
+    def score(index):
+        if index in mentions:
+            return 3
+        if index - 1 in mentions or index + 1 in mentions:
+            return 2
+        return 1 if index < LEAD_SENTENCES else 0
+
+    chosen = []
+    used = 0
+    for index in sorted(range(len(sentences)), key=lambda i: (-score(i), i)):
+        cost = estimate_tokens(sentences[index]) + 1
+        if used + cost > max_tokens:
+            continue
+        chosen.append(index)
+        used += cost
+    if not chosen and sentences:
+        # Text without sentence breaks: fall back to the start of the best sentence
+        best = min(range(len(sentences)), key=lambda i: (-score(i), i))
+        return sentences[best][:max_tokens * CHARS_PER_TOKEN]
+    return " ".join(sentences[index] for index in sorted(chosen))
+
+def build_sentiment_input(title, content, pattern=None, max_tokens=SENTIMENT_TOKEN_BUDGET):
+    """Title plus the best sentences of the content, within max_tokens.
+
+    The title is always kept (cut only if it alone exceeds the budget), and the
+    result fits the budget, so it is never selected from again.
+    """
+    title = (title or "").strip()
+    if estimate_tokens(title) >= max_tokens:
+        return title[:max_tokens * CHARS_PER_TOKEN]
+    body = select_sentences(content, pattern, max_tokens - estimate_tokens(title) - 1)
+    return f"{title} {body}".strip()
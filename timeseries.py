@@ -0,0 +1,123 @@
+"""
+Precomputed timeline series for the dashboard.
+A trend, a rolling average and LTTB-downsampled points, computed at export time.
+"""
+
+import os
+from datetime import timedelta
+
+import numpy as np
+
+# Maximum points per plotted series
+TIMELINE_MAX_POINTS = int(os.getenv("TIMELINE_MAX_POINTS", "500"))
+
+# Window of the rolling average
+ROLLING_WINDOW_DAYS = float(os.getenv("TIMELINE_ROLLING_DAYS", "7"))
+
+# Half-life of the trend's recency weights (0: all mentions weigh the same)
+TREND_HALF_LIFE_DAYS = float(os.getenv("TIMELINE_TREND_HALF_LIFE_DAYS", "30"))
+
+SECONDS_PER_DAY = 86400.0
+
+def lttb(x, y, threshold):
+    """Indices of the points kept by Largest-Triangle-Three-Buckets downsampling.
+
+    Args:
+        x: Sorted x values (numpy array)
+        y: y values (numpy array)
+        threshold: Number of points to keep
+
+    Returns:
+        Sorted numpy array of indices into x and y
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    # First and last points are always kept; the rest are split into buckets
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    selected = np.empty(threshold, dtype=int)
+    selected[0] = 0
+    selected[-1] = n - 1
+    previous = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        # Average of the next bucket (or the last point) as the third triangle vertex
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        next_x = x[end:next_end].mean() if next_end > end else x[n - 1]
+        next_y = y[end:next_end].mean() if next_end > end else y[n - 1]
+        # Keep the point of this bucket spanning the largest triangle
+        areas = np.abs(
+            (x[previous] - next_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (next_y - y[previous])
+        )
+        previous = start + int(np.argmax(areas))
+        selected[i + 1] = previous
+    return selected
+
+def rolling_mean(x, y, window):
+    """Mean of y over the trailing window (in x units) ending at each point."""
+    cumulative = np.concatenate(([0.0], np.cumsum(y)))
+    starts = np.searchsorted(x, x - window, side="right")
+    ends = np.arange(1, len(x) + 1)
+    return (cumulative[ends] - cumulative[starts]) / (ends - starts)
+
+def weighted_trend(x, y, half_life=TREND_HALF_LIFE_DAYS):
+    """Least-squares line over real time, recent points weighted more.
+
+    Returns:
+        Tuple of (slope, intercept) in y per x unit
+    """
+    if half_life > 0:
+        weights = 0.5 ** ((x[-1] - x) / half_life)
+    else:
+        weights = np.ones_like(x)
+    if np.ptp(x) == 0:
+        return 0.0, float(np.average(y, weights=weights))
+    # polyfit weights multiply the residuals, so pass the square roots
+    slope, intercept = np.polyfit(x, y, 1, w=np.sqrt(weights))
+    return float(slope), float(intercept)
+
+def summarize_timeline(points, max_points=TIMELINE_MAX_POINTS):
+    """Plot-ready timeline series.
+
+    Args:
+        points: (published_at datetime, score, sentiment) tuples sorted by date
+        max_points: Maximum points per series
+
+    Returns:
+        Dict with the downsampled points, rolling average, trend and point count
+    """
+    summary = {"points_total": len(points), "points": [], "rolling": None, "trend": None}
+    if not points:
+        return summary
+
+    origin = points[0][0]
+    days = np.array([(date - origin).total_seconds() / SECONDS_PER_DAY for date, _, _ in points])
+    scores = np.array([score for _, score, _ in points], dtype=float)
+
+    def date_at(day):
+        return origin + timedelta(days=float(day))
+
+    kept = lttb(days, scores, max_points)
+    summary["points"] = [
+        {"date": points[i][0], "score": points[i][1], "sentiment": points[i][2]} for i in kept
+    ]
+
+    rolling = rolling_mean(days, scores, ROLLING_WINDOW_DAYS)
+    kept = lttb(days, rolling, max_points)
+    summary["rolling"] = {
+        "window_days": ROLLING_WINDOW_DAYS,
+        "date": [points[i][0] for i in kept],
+        "score": [round(float(rolling[i]), 4) for i in kept]
+    }
+
+    if len(points) >= 2:
+        slope, intercept = weighted_trend(days, scores)
+        summary["trend"] = {
+            "date": [date_at(days[0]), date_at(days[-1])],
+            "score": [round(float(intercept + slope * days[0]), 4), round(float(intercept + slope * days[-1]), 4)],
+            "slope_per_day": round(slope, 6),
+            "half_life_days": TREND_HALF_LIFE_DAYS
+        }
+    return summary